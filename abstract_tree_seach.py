@@ -1,13 +1,107 @@
+from __future__ import annotations
+
 from abc import ABC, abstractmethod
-from math import sqrt, log
-import random
+from concurrent.futures import Executor
+from itertools import repeat
+from math import log
+import threading
+from typing import List
+
+import numpy as np
 
+from array_tree import ArrayTree
 from fog_of_war.fog_of_war_chess import FOWChess
-from node import Node
+from fog_of_war.rollout_board import RolloutBoard
+from node import Node, TreeNode
+from transposition_table import TranspositionTable
 
 
 class AbstractTreeSearch(ABC):
 
+    def __init__(self,
+                 transposition_table: TranspositionTable | None = None,
+                 array_tree: bool = False,
+                 max_nodes: int | None = None,
+                 virtual_loss: float = 0.0,
+                 rollouts_per_leaf: int = 1,
+                 rollout_executor: Executor | None = None,
+                 rollout_board: bool = False,
+                 rollout_capture_king: bool = False,
+                 rollout_sample_one: bool = False) -> None:
+        """
+        Pass a TranspositionTable to share nodes between positions reached by different
+        move orders (search a DAG instead of a tree). Its hit_rate reports how often that happens.
+
+        With array_tree, new_root stores the tree in an ArrayTree (NumPy arrays, one set of
+        arrays per tree) instead of a Node object per node, holding at most max_nodes nodes.
+        ArrayTree nodes can't be shared, so it can't be used with a transposition table.
+
+        virtual_loss is counted against each node best_child picks until its simulation is
+        backed up, so simulations running at once on a shared tree (see tree_parallel)
+        spread out instead of all descending the same path.
+
+        With rollouts_per_leaf > 1, each new leaf is rolled out that many times and the mean
+        result is backed up once (see batch_rollout). The rollouts run in rollout_executor
+        if one is given, else one after another.
+
+        With rollout_board, rollouts play out a RolloutBoard made from the leaf's game,
+        making moves in place instead of making a new FOWChess for each one.
+        is_terminal_state and terminal_state_value are then given the RolloutBoard,
+        which has FOWChess's current_turn, half_move_counter, is_over and winner.
+
+        rollout_capture_king and rollout_sample_one are the rollout policy's options
+        (see FOWChess.make_random_move): capture the opponent's king as soon as it's attacked,
+        and pick each random move without generating every possible move.
+        """
+        if rollouts_per_leaf < 1:
+            raise ValueError("rollouts_per_leaf must be at least 1")
+        if array_tree and transposition_table is not None:
+            raise ValueError("array_tree can't be used with a transposition table")
+        self.transposition_table: TranspositionTable | None = transposition_table
+        self.array_tree: ArrayTree | None = ArrayTree(max_nodes=max_nodes) if array_tree else None
+        self.virtual_loss: float = virtual_loss
+        self.rollouts_per_leaf: int = rollouts_per_leaf
+        self.rollout_executor: Executor | None = rollout_executor
+        self.rollout_board: bool = rollout_board
+        self.rollout_capture_king: bool = rollout_capture_king
+        self.rollout_sample_one: bool = rollout_sample_one
+        # Held while changing the tree, so it can be shared by simulations on several threads.
+        # Rollouts run without it.
+        self._tree_lock = threading.Lock()
+        # Each thread's simulation path, a list reused between simulations and emptied after each
+        self._local = threading.local()
+
+    def new_root(self, game: FOWChess) -> TreeNode:
+        """Root node for searching from game, in whichever tree store this search uses"""
+        if self.array_tree is not None:
+            return self.array_tree.new_root(game)
+        if self.transposition_table is not None:
+            return self.transposition_table.get_or_create(game, 0, None)
+        return Node(game, 0, None)
+
+    def __getstate__(self) -> dict:
+        """
+        Pickled without its tree, transposition table or executor, enough to run rollouts
+        (e.g. in a ProcessPoolExecutor used as rollout_executor).
+        """
+        state: dict = self.__dict__.copy()
+        del state["_tree_lock"], state["_local"]
+        state.update(transposition_table=None, array_tree=None, rollout_executor=None)
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self._tree_lock = threading.Lock()
+        self._local = threading.local()
+
+    def share_tree(self, tree: ArrayTree, lock) -> None:
+        """
+        Search tree, which other searches (in other threads or processes) are also changing.
+        lock has to be the one they hold while changing it.
+        """
+        self.array_tree = tree
+        self._tree_lock = lock
+
     @abstractmethod
     def is_terminal_state(self, state:FOWChess, depth:int)-> bool: pass
 
@@ -15,12 +109,12 @@ class AbstractTreeSearch(ABC):
     def terminal_state_value(self, state:FOWChess, depth:int) -> int: pass
 
     @abstractmethod
-    def update_node_score(self, node:Node, result:int) -> None: pass
+    def update_node_score(self, node:TreeNode, result:float) -> None: pass
 
-    def populate_node(self, node:Node):
+    def populate_node(self, node:TreeNode):
         node.populate()
 
-    def ucb(self, node:Node, c_const:float=1.41,) -> Node:
+    def ucb(self, node:TreeNode, c_const:float=1.41,) -> TreeNode:
         """
         Find child in children list with the greatest upper confidence bound.
         UCB given by UCB(v,vi) = Q(vi)/N(vi) + c*[ln(N(v))/N(vi)]^1/2
@@ -28,42 +122,113 @@ class AbstractTreeSearch(ABC):
         c is an exploitation constant,
         Q() gives score of a node,
         N() gives visits to a node,
+        Computed for all children at once from their stats arrays, ties go to the first child.
+        Children without visits yet (expanded by another simulation that hasn't backed up)
+        have an infinite UCB. Raises ValueError if node has no children.
         """
-        ucb_values = [_child.score / _child.visits + c_const * sqrt( log(node.visits) / _child.visits)
-                      for _child in node.children]
-        return node.children[ucb_values.index(max(ucb_values))]
-
-    def best_child(self, node: Node) -> Node:
-        if node._unvisited_list:
-            return node._unvisited_list.pop(random.randint(0, len(node._unvisited_list)))
+        visits, scores = node.child_stats()
+        if not len(visits):
+            raise ValueError("node has no children to pick from, its game has no possible moves")
+        with np.errstate(divide="ignore", invalid="ignore"):
+            ucb_values: np.ndarray = scores / visits + c_const * np.sqrt(log(max(node.visits, 1)) / visits)
+        ucb_values[visits == 0] = np.inf
+        return node.child(int(ucb_values.argmax()))
+
+    def best_child(self, node: TreeNode) -> TreeNode:
+        """
+        Expand a random untried move if there are any left,
+        else the child with the greatest upper confidence bound.
+        """
+        if node.has_untried():
+            child: TreeNode = node.expand_untried(self.transposition_table)
         else:
-            return self.ucb(node)
+            child = self.ucb(node)
+        if self.virtual_loss:
+            child.add_virtual_loss(self.virtual_loss)
+        return child
 
-    def rollout(self, node:Node, depth:int)-> int:
+    def rollout(self, node:TreeNode, depth:int)-> int:
         """
         Make random moves until terminal state is found.
         Returns
         """
+        if self.rollout_board:
+            board: RolloutBoard = RolloutBoard.from_fow(node.game)
+            while not self.is_terminal_state(board, depth):
+                # Never popped, so no undo stack
+                board.push_random_move(self.rollout_capture_king, self.rollout_sample_one, record=False)
+                depth+=1
+            return self.terminal_state_value(board, depth)
         game:FOWChess = node.game
         while not self.is_terminal_state(game, depth):
-            game = game.make_random_move()
+            game = game.make_random_move(self.rollout_capture_king, self.rollout_sample_one)
             depth+=1
         return self.terminal_state_value(game, depth)
 
-    def mcts(self, node:Node, depth:int=0)-> int:
-        if self.is_terminal_state(node.game, depth):
-            result:int = self.terminal_state_value(node.game, depth)
-
-        elif not node.visited:
-            self.populate_node(node)
-            result:int = self.rollout(node, depth)
-
+    def batch_rollout(self, node:TreeNode, depth:int) -> float:
+        """
+        Mean result of rollouts_per_leaf rollouts from node.
+        Rollouts run in rollout_executor get a copy of the search and a new Node with node's game.
+        """
+        if self.rollouts_per_leaf == 1:
+            return self.rollout(node, depth)
+        if self.rollout_executor is None:
+            results = [self.rollout(node, depth) for _ in range(self.rollouts_per_leaf)]
         else:
-            result:int = self.mcts(self.best_child(node), depth+1)
+            results = list(self.rollout_executor.map(_detached_rollout,
+                                                     repeat(self, self.rollouts_per_leaf),
+                                                     repeat(node.game),
+                                                     repeat(depth)))
+        return sum(results) / len(results)
 
-        self.update_node_score(node, result)
+    def mcts(self, node:TreeNode, depth:int=0)-> float:
+        """
+        One simulation from node: select down the tree with best_child until reaching
+        a terminal state or an unvisited node (populated and rolled out from),
+        then update the score of every node on the path, deepest first.
+        Iterative, so tree depth isn't limited by the recursion limit.
+        """
+        try:
+            path: List[TreeNode] = self._local.path
+        except AttributeError:
+            path = self._local.path = []
+        is_terminal_state = self.is_terminal_state
+        best_child = self.best_child
+        leaf: TreeNode | None = None  # Unvisited node to roll out from
+        try:
+            with self._tree_lock:
+                while True:
+                    path.append(node)
+                    game: FOWChess = node.game
+                    if is_terminal_state(game, depth):
+                        result:float = self.terminal_state_value(game, depth)
+                        break
+                    if not node.visited:
+                        self.populate_node(node)
+                        leaf = node
+                        break
+                    node = best_child(node)
+                    depth += 1
+
+            if leaf is not None:
+                result = self.batch_rollout(leaf, depth)
+
+            update_node_score = self.update_node_score
+            with self._tree_lock:
+                for i in range(len(path)-1, -1, -1):
+                    if self.virtual_loss and i:  # The first node wasn't picked by best_child
+                        path[i].add_virtual_loss(self.virtual_loss, -1)
+                    update_node_score(path[i], result)
+        finally:
+            # Don't keep the simulation's nodes (and their subtrees) alive until the next one
+            path.clear()
 
         return result
 
     @abstractmethod
-    def simulate(self, game:FOWChess, simulations:int=200)-> Node: pass
+    def simulate(self, game:FOWChess, simulations:int=200)-> TreeNode: pass
+
+
+def _detached_rollout(search: AbstractTreeSearch, game: FOWChess, depth: int) -> int:
+    """Rollout from game with a Node of its own, for running rollouts in an executor"""
+    return search.rollout(Node(game, depth, None), depth)
@@ -0,0 +1,351 @@
+from __future__ import annotations
+
+import random
+from multiprocessing import shared_memory
+from typing import List, Tuple, TYPE_CHECKING
+
+import numpy as np
+
+from fog_of_war import fog_of_war_chess as fow
+
+if TYPE_CHECKING:
+    from transposition_table import TranspositionTable
+
+
+_NO_NODE = -1
+
+# Per node arrays of ArrayTree, as (attribute, dtype, value of an unused slot)
+_ARRAY_SPECS = (("visits", np.int64, 0),
+                ("scores", np.float64, 0),
+                ("parent", np.int32, _NO_NODE),
+                ("first_child", np.int32, _NO_NODE),
+                ("n_children", np.int32, 0),
+                ("n_expanded", np.int32, 0),
+                ("move", np.uint16, 0),
+                ("depth", np.int32, 0),
+                ("visited", np.bool_, False))
+
+
+def _aligned_nbytes(length: int, dtype) -> int:
+    """Bytes for an array, rounded up to keep the next one 8 byte aligned"""
+    return -(-length * np.dtype(dtype).itemsize // 8) * 8
+
+
+class ArrayTree:
+    """
+    Search tree stored as a struct of arrays, nodes are integer ids into the arrays.
+    Saves a Python object (and its __dict__, child lists and int stats) per node,
+    which is where most of a large Node tree's memory and GC time goes.
+
+    A node's children are allocated together when it's populated, in a random order,
+    at ids first_child[i] to first_child[i]+n_children[i]-1.
+    The first n_expanded[i] of them have been expanded (have a game), the rest are untried moves.
+    Child games are only made when expanded.
+    """
+    NO_NODE = _NO_NODE
+
+    def __init__(self, capacity: int = 1024, max_nodes: int | None = None) -> None:
+        """
+        capacity is the number of nodes to preallocate, arrays double in size when full.
+        With max_nodes, the tree never holds more nodes than that.
+        A node whose children don't fit stays unpopulated (a leaf that's only rolled out from).
+        """
+        if max_nodes is not None and max_nodes < 1:
+            raise ValueError("max_nodes must be positive")
+        if max_nodes is not None:
+            capacity = min(capacity, max_nodes)
+        capacity = max(capacity, 1)
+
+        self.max_nodes: int | None = max_nodes
+        self.size: int = 0  # Nodes allocated
+
+        self.visits: np.ndarray
+        self.scores: np.ndarray
+        self.parent: np.ndarray
+        self.first_child: np.ndarray
+        self.n_children: np.ndarray
+        self.n_expanded: np.ndarray
+        self.move: np.ndarray  # packed move reaching the node
+        self.depth: np.ndarray
+        self.visited: np.ndarray
+        for name, dtype, fill in _ARRAY_SPECS:
+            setattr(self, name, np.full(capacity, fill, dtype=dtype))
+
+        self.games: List[fow.FOWChess | None] = [None] * capacity
+
+    def __len__(self) -> int:
+        return self.size
+
+    @property
+    def capacity(self) -> int:
+        """Nodes that fit before the arrays grow"""
+        return len(self.visits)
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes used by the node arrays (not counting the game states)"""
+        return sum(arr.nbytes for arr in self._arrays())
+
+    def memory_report(self) -> dict:
+        """Node count, capacity and bytes used, overall and per node"""
+        return {"nodes": self.size,
+                "capacity": self.capacity,
+                "max_nodes": self.max_nodes,
+                "array_bytes": self.nbytes,
+                "bytes_per_node": self.nbytes / self.capacity,
+                "games_stored": sum(game is not None for game in self.games[:self.size])}
+
+    def new_root(self, game: fow.FOWChess) -> ArrayNode:
+        """Clear the tree and make game its root"""
+        self.size = 0
+        self.games = [None] * self.capacity
+        for name, _, fill in _ARRAY_SPECS:
+            getattr(self, name)[:] = fill
+        root: int = self._allocate(1)
+        self.games[root] = game
+        return ArrayNode(self, root)
+
+    @property
+    def root(self) -> ArrayNode:
+        if not self.size:
+            raise IndexError("tree has no root, use new_root")
+        return ArrayNode(self, 0)
+
+    def game(self, node: int) -> fow.FOWChess:
+        """
+        Game state at node. If it hasn't been made yet, the moves from its nearest ancestor
+        with a game are replayed down to it (iteratively, trees can be deeper than the recursion limit),
+        storing every game made on the way.
+        """
+        game: fow.FOWChess | None = self.games[node]
+        path: List[int] = []  # Nodes without games, from node up
+        while game is None:
+            path.append(node)
+            node = int(self.parent[node])
+            if node == _NO_NODE:
+                raise ValueError("the root has no game, see new_root and SharedArrayTree.set_root_game")
+            game = self.games[node]
+        for child in reversed(path):
+            game = game.make_move(int(self.move[child]))
+            self.games[child] = game
+        return game
+
+    def populate(self, node: int) -> bool:
+        """
+        Allocate children for all of node's possible moves, without making their games.
+        Returns False, leaving node unpopulated, if they'd go past max_nodes.
+        """
+        moves = np.frombuffer(self.game(node).possible_move_codes, dtype=np.uint16)
+        n: int = len(moves)
+        if self.max_nodes is not None and self.size + n > self.max_nodes:
+            return False
+
+        first: int = self._allocate(n)
+        end: int = first + n
+        # Shuffled so the next untried child is always a random one
+        self.move[first:end] = moves[random.sample(range(n), n)]
+        self.parent[first:end] = node
+        self.depth[first:end] = self.depth[node] + 1
+        self.first_child[node] = first
+        self.n_children[node] = n
+        self.visited[node] = True
+        return True
+
+    def expand_next(self, node: int) -> int:
+        """Make the game of node's next untried child and return the child's id"""
+        child: int = int(self.first_child[node] + self.n_expanded[node])
+        self.n_expanded[node] += 1
+        self.game(child)
+        return child
+
+    def _allocate(self, n: int) -> int:
+        """Reserve n consecutive ids, growing the arrays if needed. Returns the first."""
+        first: int = self.size
+        if first + n > self.capacity:
+            self._grow(first + n)
+        self.size += n
+        return first
+
+    def _grow(self, needed: int) -> None:
+        capacity: int = self.capacity
+        while capacity < needed:
+            capacity *= 2
+        if self.max_nodes is not None:
+            capacity = min(capacity, self.max_nodes)
+        extra: int = capacity - self.capacity
+
+        for name, dtype, fill in _ARRAY_SPECS:
+            setattr(self, name, np.concatenate((getattr(self, name), np.full(extra, fill, dtype=dtype))))
+        self.games.extend([None] * extra)
+
+    def _arrays(self) -> tuple:
+        return tuple(getattr(self, name) for name, _, _ in _ARRAY_SPECS)
+
+
+class SharedArrayTree(ArrayTree):
+    """
+    ArrayTree with its arrays (and node count) in shared memory, so several processes
+    can search the same tree. Changes have to be made holding a lock shared by the processes.
+
+    Its size is fixed at max_nodes. Game states aren't shared, each process makes the ones
+    it needs by replaying moves from the root, so processes other than the one that called
+    new_root have to be given the root's game with set_root_game.
+
+    Pickles to a handle that attaches to the same memory. Call close() in every process
+    when done, the memory is freed when the process that made the tree closes it.
+    """
+    def __init__(self, max_nodes: int) -> None:  # pylint: disable=W0231
+        if max_nodes < 1:
+            raise ValueError("max_nodes must be positive")
+        self.max_nodes: int | None = max_nodes
+        self._owner: bool = True
+        self._shm = shared_memory.SharedMemory(create=True, size=self._shared_bytes(max_nodes))
+        self._attach()
+        for name, _, fill in _ARRAY_SPECS:
+            getattr(self, name)[:] = fill
+        self.size = 0
+
+    def __getstate__(self) -> dict:
+        return {"name": self._shm.name, "max_nodes": self.max_nodes}
+
+    def __setstate__(self, state: dict) -> None:
+        self.max_nodes = state["max_nodes"]
+        self._owner = False
+        self._shm = shared_memory.SharedMemory(name=state["name"])
+        self._attach()
+
+    @property
+    def size(self) -> int:
+        return int(self._size[0])
+
+    @size.setter
+    def size(self, size: int) -> None:
+        self._size[0] = size
+
+    def set_root_game(self, game: fow.FOWChess) -> None:
+        """Forget this process's game states and start from game at the root"""
+        self.games = [None] * self.capacity
+        self.games[0] = game
+
+    def close(self) -> None:
+        """Detach from the shared memory, freeing it if this tree made it"""
+        for name, _, _ in _ARRAY_SPECS:
+            delattr(self, name)
+        del self._size
+        self._shm.close()
+        if self._owner:
+            self._shm.unlink()
+
+    @staticmethod
+    def _shared_bytes(capacity: int) -> int:
+        # The node count, then each array
+        return 8 + sum(_aligned_nbytes(capacity, dtype) for _, dtype, _ in _ARRAY_SPECS)
+
+    def _attach(self) -> None:
+        """Make the arrays views of the shared memory"""
+        capacity: int = self.max_nodes
+        buffer = self._shm.buf
+        self._size: np.ndarray = np.ndarray(1, dtype=np.int64, buffer=buffer)
+        offset: int = 8
+        for name, dtype, _ in _ARRAY_SPECS:
+            setattr(self, name, np.ndarray(capacity, dtype=dtype, buffer=buffer, offset=offset))
+            offset += _aligned_nbytes(capacity, dtype)
+        self.games = [None] * capacity
+
+    def _grow(self, needed: int) -> None:
+        raise MemoryError("a SharedArrayTree can't grow past max_nodes")
+
+
+class ArrayNode:
+    """
+    Handle to a node in an ArrayTree, with the same interface as Node.
+    Handles are cheap and made on demand, all state lives in the tree's arrays.
+    """
+    __slots__ = ("tree", "index")
+
+    def __init__(self, tree: ArrayTree, index: int) -> None:
+        self.tree: ArrayTree = tree
+        self.index: int = index
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, ArrayNode):
+            return NotImplemented
+        return self.tree is other.tree and self.index == other.index
+
+    def __hash__(self) -> int:
+        return hash((id(self.tree), self.index))
+
+    def __repr__(self) -> str:
+        return f"ArrayNode({self.index})"
+
+    @property
+    def game(self) -> fow.FOWChess:
+        return self.tree.game(self.index)
+
+    @property
+    def depth(self) -> int:
+        return int(self.tree.depth[self.index])
+
+    @property
+    def move(self) -> int | None:
+        return None if self.tree.parent[self.index] == ArrayTree.NO_NODE else int(self.tree.move[self.index])
+
+    @property
+    def parent(self) -> ArrayNode | None:
+        parent: int = int(self.tree.parent[self.index])
+        return None if parent == ArrayTree.NO_NODE else ArrayNode(self.tree, parent)
+
+    @property
+    def visited(self) -> bool:
+        return bool(self.tree.visited[self.index])
+
+    @property
+    def visits(self) -> int:
+        return int(self.tree.visits[self.index])
+
+    @property
+    def score(self) -> float:
+        return float(self.tree.scores[self.index])
+
+    @property
+    def children(self) -> List[ArrayNode]:
+        """Expanded children"""
+        first: int = int(self.tree.first_child[self.index])
+        return [ArrayNode(self.tree, child)
+                for child in range(first, first + int(self.tree.n_expanded[self.index]))]
+
+    @property
+    def child_moves(self) -> List[int]:
+        """Packed moves reaching the expanded children"""
+        first: int = int(self.tree.first_child[self.index])
+        return self.tree.move[first:first + int(self.tree.n_expanded[self.index])].tolist()
+
+    def child(self, index: int) -> ArrayNode:
+        return ArrayNode(self.tree, int(self.tree.first_child[self.index]) + index)
+
+    def child_stats(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Visits and scores of the expanded children, as views of the tree's arrays"""
+        first: int = int(self.tree.first_child[self.index])
+        end: int = first + int(self.tree.n_expanded[self.index])
+        return self.tree.visits[first:end], self.tree.scores[first:end]
+
+    def populate(self) -> None:
+        self.tree.populate(self.index)
+
+    def has_untried(self) -> bool:
+        return self.tree.n_expanded[self.index] < self.tree.n_children[self.index]
+
+    def expand_untried(self, transposition_table: TranspositionTable | None = None) -> ArrayNode:
+        """Expand a random move that has no child yet"""
+        if transposition_table is not None:
+            raise ValueError("ArrayTree nodes have one parent, they can't be shared by a transposition table")
+        return ArrayNode(self.tree, self.tree.expand_next(self.index))
+
+    def add_virtual_loss(self, loss: float, count: int = 1) -> None:
+        """Count count in progress visits that each lost loss, a negative count removes them"""
+        self.tree.visits[self.index] += count
+        self.tree.scores[self.index] -= loss * count
+
+    def update_score(self, score_change: float) -> None:
+        self.tree.visits[self.index] += 1
+        self.tree.scores[self.index] += score_change
@@ -22,3 +22,5 @@ from fog_of_war.piece import Piece
 from fog_of_war.square import Square
 from fog_of_war.fog_of_war_chess import FOWChess
 from fog_of_war.fow_board import FOWBoard
+from fog_of_war.rollout_board import RolloutBoard
+from fog_of_war.batch_engine import BatchGames, play_out
@@ -0,0 +1,379 @@
+"""
+batch_engine.py
+Plays many fog of war chess games at once, each game's bitboards stored in NumPy uint64 arrays.
+Moves are generated set-wise (see setwise.py) for every game together,
+one is sampled per game and they're all made at once.
+Has the same rules as FOWChess, so play_out can stand in for rollouts with make_random_move.
+"""
+from __future__ import annotations
+
+from typing import List, Sequence, Tuple
+
+import numpy as np
+
+from fog_of_war import setwise as sw
+from fog_of_war.bitboard import Bitboard
+from fog_of_war.chess_bitboards import ChessBitboards
+from fog_of_war.fog_of_war_chess import FOWChess, DRAW_HALFMOVE_CLOCK
+from fog_of_war.move import MOVE_QUIET, MOVE_CASTLE, MOVE_EN_PASSANT, MOVE_PROMOTION, MOVE_PROMOTION_BLACK
+from fog_of_war.special_move_bitboards import SpecialMoveBitboards
+from fog_of_war.square import Square
+
+U64 = np.uint64
+
+# Rows of BatchGames.pieces, in ChessBitboards order
+BLACK, WHITE, PAWNS, KNIGHTS, BISHOPS, ROOKS, QUEENS, KINGS = range(8)
+
+_KING_SQUARES = U64(1 << Square.e1.index | 1 << Square.e8.index)
+_ROOK_SQUARES = U64(1 << Square.a1.index | 1 << Square.h1.index
+                    | 1 << Square.a8.index | 1 << Square.h8.index)
+# Where white is True, pawns on their last rank can promote
+_LAST_RANKS = (sw.RANK_1, sw.RANK_8)
+
+# Move channels are bitboards of move to squares, where each to square has one from square.
+# For every channel: bit index change from frm to to (for black, white), if it's a sliding
+# direction (frm is the first piece found stepping back from to) and the packed move flag (for black, white).
+_CHANNEL_DELTAS: List[Tuple[int, int]] = []
+_CHANNEL_SLIDES: List[bool] = []
+_CHANNEL_FLAGS: List[Tuple[int, int]] = []
+
+
+def _add_channel(black_delta: int,
+                 white_delta: int,
+                 slides: bool = False,
+                 flag: int = MOVE_QUIET,
+                 black_flag: int | None = None) -> None:
+    _CHANNEL_DELTAS.append((black_delta, white_delta))
+    _CHANNEL_SLIDES.append(slides)
+    _CHANNEL_FLAGS.append((flag if black_flag is None else black_flag, flag))
+
+
+for _delta, _ in sw.KNIGHT_JUMPS + sw.KING_STEPS:
+    _add_channel(_delta, _delta)
+for _direction in sw.ROOK_DIRECTIONS + sw.BISHOP_DIRECTIONS:
+    _add_channel(sw.DIRECTIONS[_direction][0], sw.DIRECTIONS[_direction][0], slides=True)
+_add_channel(-8, 8)  # Single pawn push
+_add_channel(-16, 16)  # Double pawn push
+_add_channel(-9, 7)  # Pawn captures towards the a file
+_add_channel(-7, 9)  # Pawn captures towards the h file
+_add_channel(-9, 7, flag=MOVE_EN_PASSANT)
+_add_channel(-7, 9, flag=MOVE_EN_PASSANT)
+_add_channel(2, 2, flag=MOVE_CASTLE)  # King side
+_add_channel(-2, -2, flag=MOVE_CASTLE)  # Queen side
+for _piece in (2, 3, 4, 5):  # Promotions to a knight, bishop, rook or queen, in place
+    _add_channel(0, 0, flag=MOVE_PROMOTION | _piece - 2,
+                 black_flag=MOVE_PROMOTION | MOVE_PROMOTION_BLACK | _piece - 2)
+
+CHANNEL_DELTAS: np.ndarray = np.array(_CHANNEL_DELTAS, dtype=np.int64)
+CHANNEL_SLIDES: np.ndarray = np.array(_CHANNEL_SLIDES, dtype=np.bool_)
+CHANNEL_FLAGS: np.ndarray = np.array(_CHANNEL_FLAGS, dtype=np.int64)
+
+
+def _square_masks(white: np.ndarray, white_square: Square, black_square: Square) -> np.ndarray:
+    """white_square's bitboard where white is True, else black_square's"""
+    return np.where(white, U64(1 << white_square.index), U64(1 << black_square.index))
+
+
+class BatchGames:
+    """
+    Many fog of war chess games, as arrays with one element per game:
+    pieces, shape (8, games), holds the ChessBitboards (rows are BLACK, WHITE, PAWNS, ...),
+    castling_rooks, castling_kings and ep hold the SpecialMoveBitboards,
+    turn is True where white is to move and half_move counts half moves,
+    halfmove_clock counts half moves since the last pawn move or capture (zeros if not given).
+    Draws by the 50 move rule are found, repetitions aren't (no position history is kept).
+    """
+    def __init__(self,
+                 pieces: np.ndarray,
+                 castling_rooks: np.ndarray,
+                 castling_kings: np.ndarray,
+                 ep: np.ndarray,
+                 turn: np.ndarray,
+                 half_move: np.ndarray,
+                 halfmove_clock: np.ndarray | None = None) -> None:
+        self.pieces: np.ndarray = pieces
+        self.castling_rooks: np.ndarray = castling_rooks
+        self.castling_kings: np.ndarray = castling_kings
+        self.ep: np.ndarray = ep
+        self.turn: np.ndarray = turn
+        self.half_move: np.ndarray = half_move
+        self.halfmove_clock: np.ndarray = (halfmove_clock if halfmove_clock is not None
+                                           else np.zeros_like(half_move))
+
+    @classmethod
+    def from_fow(cls, games: Sequence[FOWChess]) -> BatchGames:
+        """Batch of the given game states"""
+        return cls(
+            pieces=np.array([[int(bb) for bb in game.bitboards] for game in games],
+                            dtype=np.uint64).reshape(len(games), 8).T.copy(),
+            castling_rooks=np.array([int(game.special_moves.castling_rooks) for game in games], dtype=np.uint64),
+            castling_kings=np.array([int(game.special_moves.castling_kings) for game in games], dtype=np.uint64),
+            ep=np.array([int(game.special_moves.ep_bitboard) for game in games], dtype=np.uint64),
+            turn=np.array([game.current_turn for game in games], dtype=np.bool_),
+            half_move=np.array([game.half_move_counter for game in games], dtype=np.int64),
+            halfmove_clock=np.array([game.halfmove_clock for game in games], dtype=np.int64))
+
+    @classmethod
+    def new_games(cls, count: int) -> BatchGames:
+        """count games in the starting position"""
+        return cls.from_fow([FOWChess.new_game()]).select(np.zeros(count, dtype=np.int64))
+
+    def __len__(self) -> int:
+        return len(self.turn)
+
+    def to_fow(self, game: int) -> FOWChess:
+        """FOWChess of one game in the batch"""
+        return FOWChess(
+            bitboards=ChessBitboards(*(Bitboard(int(bb)) for bb in self.pieces[:, game])),
+            turn=bool(self.turn[game]),
+            special_moves=SpecialMoveBitboards(Bitboard(int(self.castling_rooks[game])),
+                                               Bitboard(int(self.castling_kings[game])),
+                                               Bitboard(int(self.ep[game]))),
+            half_move=int(self.half_move[game]),
+            halfmove_clock=int(self.halfmove_clock[game]))
+
+    def select(self, games: np.ndarray) -> BatchGames:
+        """New batch of the games picked by an index or boolean array"""
+        return BatchGames(self.pieces[:, games], self.castling_rooks[games], self.castling_kings[games],
+                          self.ep[games], self.turn[games], self.half_move[games], self.halfmove_clock[games])
+
+    def copy(self) -> BatchGames:
+        return self.select(np.arange(len(self)))
+
+    @property
+    def is_over(self) -> np.ndarray:
+        """True for games with 1 king left, or drawn by the 50 move rule"""
+        return (sw.popcount(self.pieces[KINGS]) == 1) | (self.halfmove_clock >= DRAW_HALFMOVE_CLOCK)
+
+    @property
+    def winners(self) -> np.ndarray:
+        """1 where white won, -1 where black won, 0 where the game isn't over"""
+        kings: np.ndarray = self.pieces[KINGS]
+        white_king: np.ndarray = (kings & self.pieces[WHITE]) != 0
+        black_king: np.ndarray = (kings & self.pieces[BLACK]) != 0
+        return white_king.astype(np.int8) - black_king.astype(np.int8)
+
+    def _attacked_by_opponent(self, games: np.ndarray) -> np.ndarray:
+        """Squares the player not to move attacks, in the picked games"""
+        pieces: np.ndarray = self.pieces[:, games]
+        white: np.ndarray = self.turn[games]
+        theirs: np.ndarray = np.where(white, pieces[BLACK], pieces[WHITE])
+        queens: np.ndarray = pieces[QUEENS] & theirs
+        return (sw.pawn_attacks(pieces[PAWNS] & theirs, ~white)
+                | sw.knight_attacks(pieces[KNIGHTS] & theirs)
+                | sw.king_attacks(pieces[KINGS] & theirs | queens)
+                | sw.slider_attacks(pieces[ROOKS] & theirs | queens,
+                                    pieces[BISHOPS] & theirs | queens,
+                                    ~(pieces[BLACK] | pieces[WHITE])))
+
+    def visible_squares(self) -> np.ndarray:
+        """
+        Squares each color can see (as FOWChess._visible_squares), for every game.
+        Shape (2, games), indexed by int(color), so visible_squares()[1] is white's.
+        Both colors are found together, in one set-wise pass over the batch twice over.
+        """
+        pieces: np.ndarray = np.concatenate((self.pieces, self.pieces), axis=1)
+        white: np.ndarray = np.repeat(np.array([False, True]), len(self))
+        ours: np.ndarray = np.where(white, pieces[WHITE], pieces[BLACK])
+        theirs: np.ndarray = np.where(white, pieces[BLACK], pieces[WHITE])
+        empty: np.ndarray = ~(ours | theirs)
+
+        queens: np.ndarray = pieces[QUEENS] & ours
+        pawns: np.ndarray = pieces[PAWNS] & ours
+        single, double = sw.pawn_pushes(pawns, empty, white)
+        # En passant adds nothing, FOWChess only adds the (already visible) capturing pawns
+        visible: np.ndarray = (ours
+                               | sw.knight_attacks(pieces[KNIGHTS] & ours)
+                               | sw.king_attacks(pieces[KINGS] & ours)
+                               | sw.slider_attacks(pieces[ROOKS] & ours | queens,
+                                                   pieces[BISHOPS] & ours | queens,
+                                                   empty)
+                               | sw.pawn_attacks(pawns, white) & theirs
+                               | single
+                               | double)
+        return visible.reshape(2, len(self))
+
+    def move_channels(self) -> np.ndarray:
+        """
+        Every game's possible moves (the same ones as FOWChess.possible_move_codes),
+        as channels of to squares, shape (channels, games). See CHANNEL_DELTAS.
+        """
+        pieces: np.ndarray = self.pieces
+        white: np.ndarray = self.turn
+        ours: np.ndarray = np.where(white, pieces[WHITE], pieces[BLACK])
+        theirs: np.ndarray = np.where(white, pieces[BLACK], pieces[WHITE])
+        occupied: np.ndarray = ours | theirs
+        empty: np.ndarray = ~occupied
+        not_ours: np.ndarray = ~ours
+        channels: List[np.ndarray] = []
+
+        knights: np.ndarray = pieces[KNIGHTS] & ours
+        channels += [sw.step(knights, delta, wrap_mask) & not_ours for delta, wrap_mask in sw.KNIGHT_JUMPS]
+        kings: np.ndarray = pieces[KINGS] & ours
+        channels += [sw.step(kings, delta, wrap_mask) & not_ours for delta, wrap_mask in sw.KING_STEPS]
+        queens: np.ndarray = pieces[QUEENS] & ours
+        rook_movers: np.ndarray = pieces[ROOKS] & ours | queens
+        bishop_movers: np.ndarray = pieces[BISHOPS] & ours | queens
+        channels += [sw.slide(rook_movers, empty, direction) & not_ours
+                     for direction in sw.ROOK_DIRECTIONS]
+        channels += [sw.slide(bishop_movers, empty, direction) & not_ours
+                     for direction in sw.BISHOP_DIRECTIONS]
+
+        pawns: np.ndarray = pieces[PAWNS] & ours
+        single, double = sw.pawn_pushes(pawns, empty, white)
+        towards_a: np.ndarray = np.where(white, sw.step(pawns, 7, sw.NOT_FILE_H), sw.step(pawns, -9, sw.NOT_FILE_H))
+        towards_h: np.ndarray = np.where(white, sw.step(pawns, 9, sw.NOT_FILE_A), sw.step(pawns, -7, sw.NOT_FILE_A))
+        ep: np.ndarray = np.where(self.ep & occupied, U64(0), self.ep)
+        channels += [single, double, towards_a & theirs, towards_h & theirs, towards_a & ep, towards_h & ep]
+
+        channels += self._castling_channels(white, ours, occupied, kings)
+        promoting: np.ndarray = pawns & np.where(white, _LAST_RANKS[1], _LAST_RANKS[0])
+        channels += [promoting] * 4
+        return np.stack(channels)
+
+    def _castling_channels(self,
+                           white: np.ndarray,
+                           ours: np.ndarray,
+                           occupied: np.ndarray,
+                           kings: np.ndarray) -> List[np.ndarray]:
+        """King's to squares of king side and queen side castles, where they're allowed"""
+        pieces: np.ndarray = self.pieces
+        king_side: np.ndarray = np.zeros(len(self), dtype=np.uint64)
+        queen_side: np.ndarray = np.zeros(len(self), dtype=np.uint64)
+        our_castling_rooks: np.ndarray = self.castling_rooks & pieces[ROOKS] & ours
+        can_castle: np.ndarray = np.flatnonzero((self.castling_kings & kings != 0) & (our_castling_rooks != 0))
+        if not len(can_castle):
+            return [king_side, queen_side]
+
+        white = white[can_castle]
+        rooks: np.ndarray = our_castling_rooks[can_castle]
+        occupied = occupied[can_castle]
+        king: np.ndarray = kings[can_castle]
+        attacked: np.ndarray = self._attacked_by_opponent(can_castle)
+        a, b, c, d = (_square_masks(white, Square[f"{file}1"], Square[f"{file}8"]) for file in "abcd")
+        f, g, h = (_square_masks(white, Square[f"{file}1"], Square[f"{file}8"]) for file in "fgh")
+
+        king_side[can_castle] = np.where((rooks & h != 0)
+                                         & (occupied & (f | g) == 0)
+                                         & (attacked & (king | f | g) == 0), g, U64(0))
+        queen_side[can_castle] = np.where((rooks & a != 0)
+                                          & (occupied & (b | c | d) == 0)
+                                          & (attacked & (king | c | d) == 0), c, U64(0))
+        return [king_side, queen_side]
+
+    def sample_moves(self, rng: np.random.Generator) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        One uniformly random possible move per game, as packed moves (uint16),
+        and each game's number of possible moves. Games without moves get move 0.
+        """
+        channels: np.ndarray = self.move_channels()
+        counts: np.ndarray = sw.popcount(channels)
+        totals: np.ndarray = counts.sum(axis=0)
+        games: np.ndarray = np.arange(len(self))
+
+        picks: np.ndarray = np.minimum((rng.random(len(self)) * totals).astype(np.int64),
+                                       np.maximum(totals - 1, 0))
+        ends: np.ndarray = counts.cumsum(axis=0)
+        channel: np.ndarray = np.minimum((ends <= picks).sum(axis=0), len(channels) - 1)
+        to: np.ndarray = sw.select_bit(channels[channel, games], picks - ends[channel, games] + counts[channel, games])
+
+        frm: np.ndarray = to - CHANNEL_DELTAS[channel, self.turn.astype(np.int64)]
+        # Sliding pieces are the first piece found stepping back from to
+        sliding: np.ndarray = np.flatnonzero(CHANNEL_SLIDES[channel] & (totals > 0))
+        if len(sliding):
+            occupied: np.ndarray = (self.pieces[BLACK] | self.pieces[WHITE])[sliding]
+            delta: np.ndarray = CHANNEL_DELTAS[channel[sliding], 1]
+            slider: np.ndarray = frm[sliding]
+            for _ in range(6):
+                empty: np.ndarray = (occupied >> slider.astype(np.uint64)) & U64(1) == 0
+                slider = np.where(empty, slider - delta, slider)
+            frm[sliding] = slider
+
+        codes: np.ndarray = frm | to << 6 | CHANNEL_FLAGS[channel, self.turn.astype(np.int64)] << 12
+        return np.where(totals > 0, codes, 0).astype(np.uint16), totals
+
+    def make_moves(self, codes: np.ndarray) -> None:
+        """Make one packed move (as from sample_moves) in every game, in place"""
+        codes = codes.astype(np.int64)
+        frm: np.ndarray = codes & 0x3F
+        to: np.ndarray = (codes >> 6) & 0x3F
+        flag: np.ndarray = codes >> 12
+        frm_mask: np.ndarray = sw.bit_masks(frm)
+        to_mask: np.ndarray = sw.bit_masks(to)
+        castle: np.ndarray = flag == MOVE_CASTLE
+        promotion: np.ndarray = flag & MOVE_PROMOTION != 0
+        pieces: np.ndarray = self.pieces
+
+        # The en passant captured pawn is on frm's rank and to's file, promotions capture nothing
+        captured: np.ndarray = np.where(flag == MOVE_EN_PASSANT, sw.bit_masks(frm & ~7 | to & 7),
+                                        np.where(promotion, U64(0), to_mask))
+        king_side: np.ndarray = (to & 7) == 6
+        rook_frm: np.ndarray = np.where(castle, sw.bit_masks(np.where(king_side, to + 1, to - 2)), U64(0))
+        rook_to: np.ndarray = np.where(castle, sw.bit_masks(np.where(king_side, to - 1, to + 1)), U64(0))
+
+        # Special moves, from the pieces before the move
+        frm_rank: np.ndarray = frm >> 3
+        to_rank: np.ndarray = to >> 3
+        double_push: np.ndarray = ((pieces[PAWNS] & frm_mask != 0)
+                                   & (((frm_rank == 1) & (to_rank == 3)) | ((frm_rank == 6) & (to_rank == 4))))
+        self.ep = np.where(double_push, sw.bit_masks((frm + to) // 2), U64(0))
+        self.castling_kings = self.castling_kings & ~(frm_mask & _KING_SQUARES)
+        self.castling_rooks = self.castling_rooks & ~(frm_mask & _ROOK_SQUARES | rook_frm)
+        # Pawn moves (promotions and en passant included) and captures reset the halfmove clock
+        irreversible: np.ndarray = (pieces[PAWNS] & frm_mask | (pieces[BLACK] | pieces[WHITE]) & to_mask) != 0
+        self.halfmove_clock = np.where(irreversible, 0, self.halfmove_clock + 1)
+
+        # Like ChessBitboards.make_move, on every bitboard: clear captured, move the rook, move the piece
+        pieces &= ~captured
+        pieces[:] = np.where(pieces & rook_frm != 0, pieces & ~rook_frm | rook_to, pieces)
+        pieces[:] = np.where(pieces & frm_mask != 0, pieces & ~frm_mask | to_mask, pieces)
+        # Promotions replace the pawn in place, colors don't change
+        if promotion.any():
+            pieces[PAWNS] &= ~np.where(promotion, frm_mask, U64(0))
+            promoted: np.ndarray = (flag & 0b11) + KNIGHTS
+            for plane in (KNIGHTS, BISHOPS, ROOKS, QUEENS):
+                pieces[plane] |= np.where(promotion & (promoted == plane), to_mask, U64(0))
+
+        self.turn = ~self.turn
+        self.half_move = self.half_move + 1
+
+
+def play_out(games: BatchGames | Sequence[FOWChess],
+             rng: np.random.Generator | None = None,
+             max_plies: int | None = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Make random moves in every game until it's over (a king is captured or it's drawn by the 50 move rule),
+    it has no possible moves or max_plies moves have been made.
+    Returns winners (1 white, -1 black, 0 no winner) and the number of moves made, per game.
+    games isn't changed.
+    """
+    if not isinstance(games, BatchGames):
+        games = BatchGames.from_fow(games)
+    rng = rng if rng is not None else np.random.default_rng()
+    winners: np.ndarray = np.zeros(len(games), dtype=np.int8)
+    lengths: np.ndarray = np.zeros(len(games), dtype=np.int64)
+    playing: np.ndarray = np.arange(len(games))  # Original index of each game still being played
+
+    plies: int = 0
+    over: np.ndarray = games.is_over
+    winners[over] = games.winners[over]
+    games = games.select(~over)
+    playing = playing[~over]
+    while len(playing) and (max_plies is None or plies < max_plies):
+        codes, totals = games.sample_moves(rng)
+        stuck: np.ndarray = totals == 0
+        if stuck.any():
+            lengths[playing[stuck]] = plies
+            games, codes, playing = games.select(~stuck), codes[~stuck], playing[~stuck]
+
+        games.make_moves(codes)
+        plies += 1
+
+        over = games.is_over
+        if over.any():
+            winners[playing[over]] = games.winners[over]
+            lengths[playing[over]] = plies
+            games, playing = games.select(~over), playing[~over]
+
+    lengths[playing] = plies
+    return winners, lengths
@@ -14,6 +14,11 @@ import numpy as np
 from fog_of_war.square import Square
 
 
+# Row i holds the bits of byte i, lowest bit first (file 1 first)
+_BYTE_BITS: np.ndarray = np.unpackbits(np.arange(256, dtype=np.uint8)[:, np.newaxis],
+                                       axis=1, bitorder="little").astype(np.int16)
+
+
 class Bitboard(int):
     """
     Int subclass for representing 8x8 bitboards
@@ -38,13 +43,18 @@ class Bitboard(int):
         Convert bitboard from int representation to an 8x8 numpy array of 1's and 0's
         @return arr:np.ndarray - An 8x8 numpy array (dtype=np.int16)
         """
-        try:
-            bb_bytes = (int(self) >> np.arange(0, 57, 8, dtype=np.uint64)).astype(np.uint8)
-        except OverflowError:
-            as_string = format(self, '064b')
-            bb_bytes = np.array([int(as_string[i:i + 8]) for i in range(0, 64, 8)], dtype=np.uint8)
+        # Big endian bytes are ranks 8 to 1, so rank 8 is row 0
+        return _BYTE_BITS[np.frombuffer(int(self).to_bytes(8, "big"), dtype=np.uint8)]
 
-        return np.flipud(np.unpackbits(bb_bytes, bitorder="little").reshape(8, 8).astype(np.int16))
+    @classmethod
+    def batch_to_numpy(cls, bitboards) -> np.ndarray:
+        """
+        Convert many bitboards at once, like to_numpy.
+        @param bitboards - Sequence or array of N bitboards (anything np.uint64 can hold)
+        @return arr:np.ndarray - An (N, 8, 8) numpy array (dtype=np.int16)
+        """
+        as_bytes: np.ndarray = np.asarray(bitboards, dtype=np.uint64).astype(">u8").view(np.uint8)
+        return _BYTE_BITS[as_bytes.reshape(-1, 8)]
 
     @classmethod
     def from_rank(cls, rank_num: int) -> Bitboard:
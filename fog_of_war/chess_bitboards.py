@@ -16,17 +16,28 @@ Modified
 """
 from __future__ import annotations
 
+from array import array
 from functools import cached_property
-from typing import NamedTuple, List, Dict
+from typing import NamedTuple, List, Dict, Sequence, Tuple
 
 import numpy as np
 
-from fog_of_war.square import Square
+from fog_of_war.square import Square, SQUARE_MASKS
 from fog_of_war.piece import Piece
-from fog_of_war.move import Move
+from fog_of_war.move import Move, \
+    encode_move, \
+    castling_rook_squares, \
+    MOVE_CASTLE, \
+    MOVE_EN_PASSANT, \
+    MOVE_PROMOTION
 from fog_of_war.bitboard import Bitboard
 
 
+# Piece values of the pawns to kings bitboards, shaped to multiply (6, 8, 8) planes
+_PIECE_VALUES: np.ndarray = np.array([Piece[name].value for name in "PNBRQK"],
+                                     dtype=np.int16)[:, np.newaxis, np.newaxis]
+
+
 class ChessBitboards(NamedTuple):
     """
     ChessBitboards is a NamedTuple subclass.
@@ -46,17 +57,9 @@ class ChessBitboards(NamedTuple):
         A numpy representation of the chess board, using integers.
         See Piece enum for encoding
         """
-        return (
-                       Bitboard(self.kings).to_numpy() * Piece['K'].value
-                       + Bitboard(self.queens).to_numpy() * Piece['Q'].value
-                       + Bitboard(self.pawns).to_numpy() * Piece['P'].value
-                       + Bitboard(self.rooks).to_numpy() * Piece['R'].value
-                       + Bitboard(self.bishops).to_numpy() * Piece['B'].value
-                       + Bitboard(self.knights).to_numpy() * Piece['N'].value
-               ) * (
-                       Bitboard(self.black).to_numpy() * -1
-                       + Bitboard(self.white).to_numpy()
-               )
+        planes: np.ndarray = Bitboard.batch_to_numpy(self)
+        return ((planes[2:] * _PIECE_VALUES).sum(axis=0, dtype=np.int16)
+                * (planes[1] - planes[0]))
 
     def piece_at(self, square: Square) -> Piece | None:
         """If a piece is at square, return its value, else return None"""
@@ -99,38 +102,89 @@ class ChessBitboards(NamedTuple):
                    | Bitboard.from_square(Square.e1))
         )
 
-    def make_move(self, move: Move) -> ChessBitboards:
-        """Clear move.frm and set move.to in the same bitboard. Clear move.to"""
-
-        if move.promotion_to is None:
-            def search(current_bb: Bitboard,
-                       frm_mask: Bitboard,
-                       to_mask: Bitboard):
-                if current_bb & to_mask:
-                    # If the to square is already set in a BB, we're capturing, Therefore clear it
-                    current_bb ^= to_mask
-
-                if move.rook_to is not None and current_bb & Bitboard.from_square(move.rook_frm):
-                    # If there's a rook move, we're castling. Clear frm and set to.
-                    current_bb = ((current_bb
-                                   ^ Bitboard.from_square(move.rook_frm))
-                                  | Bitboard.from_square(move.rook_to))
-
-                if current_bb & frm_mask:
-                    # If frm, this is the piece we're moving. Clear it and set to
-                    current_bb = (current_bb ^ frm_mask) | to_mask
-
-                return current_bb
-
-            return ChessBitboards(
-                *(search(current_bb,
-                         frm_mask=Bitboard.from_square(move.frm),
-                         to_mask=Bitboard.from_square(move.to))
-                  for current_bb in self))
-
-        cpy: List[Bitboard] = list(self)
-        cpy[2] = self.pawns ^ Bitboard.from_square(move.frm)
-        cpy[abs(move.promotion_to.value) + 1] = (
-                cpy[abs(move.promotion_to.value) + 1] ^ move.to.value
-        )
-        return ChessBitboards(*cpy)
+    def make_move(self, move: Move | int, mailbox: array | None = None) -> ChessBitboards:
+        """
+        Clear move.frm and set move.to in the same bitboard. Clear move.to
+        Takes a Move or a packed move (see move.encode_move).
+        Only the bitboards of the moving piece, a captured piece and a castling rook are changed.
+        Give this board's mailbox (see mailbox.py) to look their types up instead of searching for them.
+        """
+        cpy: List[int] = list(self)
+        make_move_in_place(cpy, move if isinstance(move, int) else encode_move(move), mailbox)
+        return self._make(cpy)
+
+
+def _bitboard_indices(bitboards: Sequence[int], index: int, mailbox: array | None) -> Tuple[int, int] | None:
+    """
+    Positions in bitboards of the color and piece bitboards holding the piece on bit index,
+    None if it's empty. Read from mailbox (see mailbox.py) if given.
+    """
+    if mailbox is not None:
+        code: int = mailbox[index]
+        return (int(code > 0), abs(code) + 1) if code else None
+    mask: int = SQUARE_MASKS[index]
+    color: int = 1 if bitboards[1] & mask else 0 if bitboards[0] & mask else -1
+    for piece in range(2, 8):
+        if bitboards[piece] & mask:
+            return color, piece
+    return None
+
+
+def resets_halfmove_clock(bitboards: Sequence[int], code: int) -> bool:
+    """
+    True if a packed move is a pawn move or a capture, which reset the halfmove clock (50 move rule).
+    bitboards (in ChessBitboards order) are from before the move.
+    """
+    return bool(bitboards[2] & SQUARE_MASKS[code & 0x3F]
+                or (bitboards[0] | bitboards[1]) & SQUARE_MASKS[(code >> 6) & 0x3F])
+
+
+def make_move_in_place(bitboards: List[int], code: int, mailbox: array | None = None) -> None:
+    """
+    Make a packed move on a list of bitboards (in ChessBitboards order), changing the list.
+    The same as ChessBitboards.make_move, for boards which are changed in place (see rollout_board.py).
+    mailbox must be the mailbox from before the move, if given.
+    """
+    # move_frm, move_to and move_flag inlined, this runs for every move made
+    frm: int = code & 0x3F
+    to: int = (code >> 6) & 0x3F
+    flag: int = code >> 12
+    frm_mask: int = SQUARE_MASKS[frm]
+    to_mask: int = SQUARE_MASKS[to]
+
+    if flag & MOVE_PROMOTION:
+        # Pawn is replaced in place, colors don't change
+        bitboards[2] ^= frm_mask
+        bitboards[(flag & 0b11) + 3] |= to_mask
+        return
+
+    occupied: int = bitboards[0] | bitboards[1]
+    moving: Tuple[int, int] | None = _bitboard_indices(bitboards, frm, mailbox)
+
+    captured: int = to
+    if flag == MOVE_EN_PASSANT or (bitboards[2] & frm_mask
+                                   and (frm - to) % 8
+                                   and not occupied & to_mask):
+        # A pawn changing file onto an empty square is en passant.
+        # The captured pawn is on frm's rank and to's file.
+        captured = (frm & ~7) | (to & 7)
+    captured_mask: int = SQUARE_MASKS[captured]
+    if occupied & captured_mask and (
+            captured_indices := _bitboard_indices(bitboards, captured, mailbox)):
+        color, piece = captured_indices
+        bitboards[color] ^= captured_mask
+        bitboards[piece] ^= captured_mask
+
+    if flag == MOVE_CASTLE:
+        rook_frm, rook_to = castling_rook_squares(to)
+        rook_frm_mask, rook_to_mask = SQUARE_MASKS[rook_frm], SQUARE_MASKS[rook_to]
+        if bitboards[5] & rook_frm_mask:
+            color = 1 if bitboards[1] & rook_frm_mask else 0
+            bitboards[color] = (bitboards[color] ^ rook_frm_mask) | rook_to_mask
+            bitboards[5] = (bitboards[5] ^ rook_frm_mask) | rook_to_mask
+
+    if moving is not None:
+        color, piece = moving
+        if color >= 0:
+            bitboards[color] = (bitboards[color] ^ frm_mask) | to_mask
+        bitboards[piece] = (bitboards[piece] ^ frm_mask) | to_mask
@@ -1,4 +1,3 @@
-# pylint: disable=C0415
 """
 attack_masks.py
 Functions for generating bitboard masks for different pieces attack patterns.
@@ -10,20 +9,33 @@ Last Modified: 2022/02/23
 """
 from __future__ import annotations
 
+from array import array
 from functools import cached_property
 from random import choice as rand_choice
-from typing import List, Generator
+from typing import List, Generator, Tuple
 
+import numpy as np
 
-from fog_of_war.attack_masks import non_pawn_move_mask, pawn_attack_mask
-from fog_of_war.chess_bitboards import Bitboard, ChessBitboards
+
+from fog_of_war.chess_bitboards import Bitboard, ChessBitboards, resets_halfmove_clock
 from fog_of_war.special_move_bitboards import SpecialMoveBitboards
-from fog_of_war.helper_functions import \
-    reverse_scan_for_square, \
-    reduce_with_bitwise_or
-from fog_of_war.move import Move
-from fog_of_war.piece import Piece
+from fog_of_war.helper_functions import popcount
+from fog_of_war.zobrist import zobrist_hash, zobrist_update
+from fog_of_war.mailbox import new_mailbox, mailbox_update, mailbox_to_numpy
+from fog_of_war.move_generation import AttackMap, \
+    new_attack_map, \
+    move_codes, \
+    king_capture_code, \
+    random_move_code, \
+    visible_squares
+from fog_of_war.move import Move, decode_move, encode_move
 from fog_of_war.square import Square
+from fog_of_war.piece import Piece
+
+# Games are drawn when the halfmove clock reaches this (the 50 move rule),
+# or a position is reached this many times
+DRAW_HALFMOVE_CLOCK: int = 100
+DRAW_REPETITIONS: int = 3
 
 
 class FOWChess:
@@ -37,21 +49,38 @@ class FOWChess:
                  bitboards: ChessBitboards,
                  turn: bool,
                  special_moves: SpecialMoveBitboards,
-                 half_move: int, ) -> None:
+                 half_move: int,
+                 zobrist_key: int | None = None,
+                 mailbox: array | None = None,
+                 halfmove_clock: int = 0,
+                 history: Tuple | None = None) -> None:
         # immutable
         self.__current_turn: bool = turn  # color of the current player
         self.__bitboards = bitboards  # Integer bitboards of both colors and all pieces
         self.__special: SpecialMoveBitboards = special_moves  # Bitboards for castling/ep bitboards
         self.__half_move: int = half_move
+        # Zobrist key of the position, updated incrementally by from_fow
+        self.__zobrist_key: int = (zobrist_hash(bitboards, special_moves, turn)
+                                   if zobrist_key is None else zobrist_key)
+        # Piece code on every square (see mailbox.py), built when first needed.
+        # from_fow needs it for the Zobrist key, and updates it for each child instead of rebuilding it
+        self.__mailbox: array | None = mailbox
+        # Half moves since the last pawn move or capture
+        self.__halfmove_clock: int = halfmove_clock
+        # Zobrist keys of the positions since then, newest first, as nested (key, earlier history) pairs.
+        # Positions before a pawn move or capture can't be repeated, so they're dropped.
+        self.__history: Tuple | None = history
+        # [black's, white's] AttackMap, each made when first needed
+        self.__attack_maps: List[AttackMap | None] = [None, None]
 
     def __hash__(self) -> int:
-        return (*self.__bitboards,
-                *self.__special,
-                self.__current_turn,
-                self.__half_move).__hash__()
+        return self.__zobrist_key
 
     def __eq__(self, other: FOWChess) -> bool:
-        return (self.bitboards == other.bitboards
+        # Same position, whatever the move order. The halfmove clock and history aren't compared,
+        # so a node shared by a transposition table keeps the draw state of the path that made it
+        return (self.__zobrist_key == other.zobrist_key
+                and self.bitboards == other.bitboards
                 and self.special_moves == other.special_moves
                 and self.current_turn == other.current_turn
                 and self.half_move_counter == other.half_move_counter)
@@ -69,17 +98,26 @@ class FOWChess:
             half_move=0)
 
     @classmethod
-    def from_fow(cls, parent: FOWChess, move: Move) -> FOWChess:
+    def from_fow(cls, parent: FOWChess, move: Move | int) -> FOWChess:
         """
         Create a new fow game state,
-        by applying a move to an existing fow game state
+        by applying a move (Move or packed move) to an existing fow game state
         """
-        new_bitboards: ChessBitboards = parent.bitboards.make_move(move)
+        code: int = move if isinstance(move, int) else encode_move(move)
+        mailbox: array = parent.mailbox
+        new_bitboards: ChessBitboards = parent.bitboards.make_move(code, mailbox)
+        new_special: SpecialMoveBitboards = parent.special_moves.update(parent.bitboards, code)
+        irreversible: bool = resets_halfmove_clock(parent.bitboards, code)
         return cls(
             bitboards=new_bitboards,
             turn=not parent.current_turn,
-            special_moves=parent.special_moves.update(parent.bitboards, move),
-            half_move=parent.half_move_counter + 1
+            special_moves=new_special,
+            half_move=parent.half_move_counter + 1,
+            zobrist_key=zobrist_update(parent.zobrist_key, code, mailbox,
+                                       parent.special_moves, new_special),
+            mailbox=mailbox_update(mailbox, code),
+            halfmove_clock=0 if irreversible else parent.__halfmove_clock + 1,
+            history=None if irreversible else (parent.zobrist_key, parent.__history)
         )
 
     @property
@@ -90,6 +128,35 @@ class FOWChess:
         """
         return self.__half_move
 
+    @property
+    def halfmove_clock(self) -> int:
+        """Half moves since the last pawn move or capture, for the 50 move rule"""
+        return self.__halfmove_clock
+
+    @property
+    def history(self) -> Tuple | None:
+        """
+        Zobrist keys of the positions since the last pawn move or capture, newest first,
+        as nested (key, earlier history) pairs ending in None
+        """
+        return self.__history
+
+    @cached_property
+    def repetitions(self) -> int:
+        """How many times this position was reached before (since the last pawn move or capture)"""
+        count: int = 0
+        history: Tuple | None = self.__history
+        while history is not None:
+            key, history = history
+            count += key == self.__zobrist_key
+        return count
+
+    @cached_property
+    def is_draw(self) -> bool:
+        """True if drawn by the 50 move rule or repetition"""
+        return (self.__halfmove_clock >= DRAW_HALFMOVE_CLOCK
+                or self.repetitions + 1 >= DRAW_REPETITIONS)
+
     @cached_property
     def full_move_number(self) -> int:
         """
@@ -98,6 +165,11 @@ class FOWChess:
         """
         return self.__half_move // 2 + 1
 
+    @property
+    def zobrist_key(self) -> int:
+        """64 bit Zobrist key of the position (pieces, castling, en passant, side to move)"""
+        return self.__zobrist_key
+
     @property
     def current_turn(self) -> bool:
         """Color of the current player. True if white, False if black"""
@@ -113,23 +185,72 @@ class FOWChess:
         """Bitboards representing ep and castling bitboards"""
         return self.__special
 
+    @property
+    def mailbox(self) -> array:
+        """Piece code on every square, indexed by bit index (see mailbox.py). Don't modify it."""
+        if self.__mailbox is None:
+            self.__mailbox = new_mailbox(self.bitboards)
+        return self.__mailbox
+
+    def piece_at(self, square: Square) -> Piece | None:
+        """If a piece is at square, return it, else return None. Looked up in the mailbox."""
+        code: int = self.mailbox[square.index]
+        return Piece(code) if code else None
+
+    def to_numpy(self) -> np.ndarray:
+        """The board as numpy array of piece values, same as ChessBitboards.to_numpy"""
+        return mailbox_to_numpy(self.mailbox)
+
+    def attack_map(self, color: bool) -> AttackMap:
+        """
+        Squares color's pieces attack (see move_generation.AttackMap).
+        Made once per position and color, then shared by move generation, visibility and castling.
+        """
+        attack_map: AttackMap | None = self.__attack_maps[color]
+        if attack_map is None:
+            attack_map = self.__attack_maps[color] = new_attack_map(self.bitboards, color, self.mailbox)
+        return attack_map
+
     @cached_property
     def possible_moves_list(self) -> List[Move]:
         """List of possible legal moves"""
         return list(self._possible_move_generator())
 
-    def make_move(self, move: Move) -> FOWChess:
-        """Given a move, create a FOWChess node where that move has been made."""
+    @cached_property
+    def possible_move_codes(self) -> array:
+        """Possible legal moves as packed moves (see move.encode_move), in an array('H')"""
+        return array('H', self._possible_move_code_generator())
+
+    def make_move(self, move: Move | int) -> FOWChess:
+        """Given a move (Move or packed move), create a FOWChess node where that move has been made."""
         return FOWChess.from_fow(self, move)
 
-    def make_random_move(self) -> FOWChess:
-        """Make a randomly chosen move from the list of possible moves"""
-        return self.make_move(rand_choice(self.possible_moves_list))
+    def make_random_move(self, capture_king: bool = False, sample_one: bool = False) -> FOWChess:
+        """
+        Make a randomly chosen move from the list of possible moves.
+        With capture_king, capture the opponent's king instead whenever it's attacked, ending the game.
+        With sample_one, pick the move without generating the list (see move_generation.random_move_code).
+        Raises IndexError if there are no possible moves.
+        """
+        if capture_king and (code := king_capture_code(self.bitboards, self.current_turn,
+                                                       self.attack_map(self.current_turn))) is not None:
+            return self.make_move(code)
+        if not sample_one:
+            return self.make_move(rand_choice(self.possible_move_codes))
+        special: SpecialMoveBitboards = self.special_moves
+        code = random_move_code(self.bitboards, self.current_turn, special.castling_rooks,
+                                special.castling_kings, special.ep_bitboard, self.attack_map)
+        if code is None:
+            raise IndexError("No possible moves")
+        return self.make_move(code)
 
     @cached_property
-    def is_over(self) -> bool:  # TODO: better termination checks
-        """True if 1 king left on board"""
-        return len(list(reverse_scan_for_square(self.bitboards.kings))) == 1
+    def is_over(self) -> bool:
+        """
+        True if 1 king left on board, or the game is a draw (see is_draw).
+        Insufficient material isn't a draw, kings can be captured.
+        """
+        return popcount(self.bitboards.kings) == 1 or self.is_draw
 
     @cached_property
     def winner(self) -> bool | None:  # maybe make this a class
@@ -143,210 +264,22 @@ class FOWChess:
         elif not black:
             return self.WHITE
 
-    def _occupied_by_color(self, color: bool) -> Bitboard:
-        """White's bitboard if True, black's if False"""
-        return self.bitboards.white if color else self.bitboards.black
-
-    def _anyone_attacking(self, square_mask: Bitboard) -> bool:
-        """
-        Using the principal of
-        "Is one of their pieces attacking square" being logically the same as
-        "If a piece of our color was on square, could it attack the same piece type of their color"
-        determine if anyone is attacking square.
-        """
-        square: Square = Square(square_mask.bit_length())
-        from fog_of_war.attack_masks import rank_moves,\
-            file_moves,\
-            diagonal_moves,\
-            king_moves,\
-            knight_moves
-
-        occupied = self.bitboards.black | self.bitboards.white
-        their_pieces = self._occupied_by_color(not self.current_turn)
-
-        r_and_f_attackers = (self.bitboards.queens | self.bitboards.rooks) & their_pieces
-        diag_attackers = (self.bitboards.queens | self.bitboards.bishops) & their_pieces
-        king_attackers = (self.bitboards.kings | self.bitboards.queens) & their_pieces
-        knight_attackers = self.bitboards.knights & their_pieces
-
-        return any((
-            (self.bitboards.pawns
-             & their_pieces
-             & pawn_attack_mask(square, self.current_turn)),
-            ((rank_moves(square, occupied) | file_moves(square, occupied))
-             & r_and_f_attackers),
-            diagonal_moves(square, occupied) & diag_attackers,
-            king_moves(square) & king_attackers,
-            knight_moves(square) & knight_attackers))
-
     def _possible_move_generator(self) -> Generator[Move]:
         """List of possible moves the current player can legally make."""
+        for code in self.possible_move_codes:
+            yield decode_move(code)
 
-        # 'Best practice' calls for this to be made into a billion little functions
-        # But honestly I think making a bunch of little functions just to use them here
-        # is less readable and takes more time than this huge massive one.
-        # And they're all pretty specialized,
-        # so it's not like they'll be reused anywhere other than in visible_squares.
-
-        our_pieces: Bitboard = self._occupied_by_color(self.current_turn)
-        their_pieces: Bitboard = self._occupied_by_color(not self.current_turn)
-        everyones_pieces: Bitboard = our_pieces | their_pieces
-
-        # Generate non-pawn moves.
-        for frm_sqr in reverse_scan_for_square(our_pieces & ~self.bitboards.pawns):
-            for to_sqr in reverse_scan_for_square(
-                    ~our_pieces &
-                    non_pawn_move_mask(frm_sqr, self.bitboards.piece_at(frm_sqr), everyones_pieces)
-            ):
-                yield Move(to=to_sqr, frm=frm_sqr)
-
-        # check for castling
-        if (self.special_moves.castling_kings & our_pieces
-                and self.special_moves.castling_rooks & our_pieces):
-
-            backrank: Bitboard = (Bitboard.from_rank(1)
-                                  if self.current_turn else Bitboard.from_rank(8))
-
-            a_mask: Bitboard = backrank & Bitboard.from_file(1)
-            b_mask: Bitboard = backrank & Bitboard.from_file(2)
-            c_mask: Bitboard = backrank & Bitboard.from_file(3)
-            d_mask: Bitboard = backrank & Bitboard.from_file(4)
-
-            f_mask: Bitboard = backrank & Bitboard.from_file(6)
-            g_mask: Bitboard = backrank & Bitboard.from_file(7)
-            h_mask: Bitboard = backrank & Bitboard.from_file(8)
-
-            our_king_mask: Bitboard = self.bitboards.kings & our_pieces
-
-            # Try for king side castle
-            if (self.special_moves.castling_kings & our_pieces
-                    and self.special_moves.king_side_castling & our_pieces
-                    and ~everyones_pieces & (f_mask | g_mask)
-                    and not any(self._anyone_attacking(square_mask)
-                                for square_mask in (our_king_mask, f_mask, g_mask))):
-                yield Move(to=Square(g_mask.bit_length()),
-                           frm=Square(our_king_mask.bit_length()),
-                           rook_to=Square(f_mask.bit_length()),
-                           rook_frm=Square(h_mask.bit_length()))
-            # Try for queen side
-            if (self.special_moves.castling_kings & our_pieces
-                    and self.special_moves.queen_side_castling & our_pieces
-                    and ~everyones_pieces & (b_mask | c_mask | d_mask)
-                    and not any(self._anyone_attacking(square)
-                                for square in (our_king_mask, c_mask, d_mask))):
-                yield Move(to=Square(c_mask.bit_length()),
-                           frm=Square(our_king_mask.bit_length()),
-                           rook_frm=Square(a_mask.bit_length()),
-                           rook_to=Square(d_mask.bit_length()))
-
-        # If there are pawns, generate their moves
-        if pawns := self.bitboards.pawns & our_pieces:
-            # First if they can attack anyone
-            for frm_sqr in reverse_scan_for_square(pawns):
-                for to_sqr in reverse_scan_for_square(
-                        pawn_attack_mask(frm_sqr, self.current_turn)
-                        & their_pieces):
-                    yield Move(to_sqr, frm_sqr)
-
-            backrank: Bitboard
-            forward_or_back: int
-            # Then find their single and double moves
-            if self.current_turn:
-                single_moves = (pawns << 8) & ~everyones_pieces
-                double_moves = (single_moves << 8
-                                & Bitboard.from_rank(4)
-                                & ~everyones_pieces)
-                backrank = Bitboard.from_rank(1)
-                forward_or_back = -1
-            else:
-                single_moves = pawns >> 8 & ~everyones_pieces
-                double_moves = (
-                        single_moves >> 8
-                        & Bitboard.from_rank(5)
-                        & ~everyones_pieces)
-                backrank = Bitboard.from_rank(8)
-                forward_or_back = 1
-
-            for to_sqr in reverse_scan_for_square(single_moves):
-                yield Move(to_sqr, Square(to_sqr.value + (8 * forward_or_back)))
-
-            for to_sqr in reverse_scan_for_square(double_moves):
-                yield Move(to_sqr, Square(to_sqr.value + (16 * forward_or_back)))
-
-            # promotion
-            if backrank & pawns:
-                for pawn in reverse_scan_for_square(pawns):
-                    for promote in (2, 3, 4):
-                        yield Move(to=pawn,
-                                   frm=pawn,
-                                   promotion_to=Piece(
-                                       promote * (-1 * (not self.current_turn))
-                                   ))
-
-            # Check for en passent
-            if (self.special_moves.ep_bitboard
-                    and not self.special_moves.ep_bitboard & everyones_pieces):
-                # "Is there one of our pawns attacking the ep square?"
-                # is logically the same question as
-                # "If there was one of their pawns on the ep square,
-                #   would it be attacking one of our pawns?"
-                ep_square: Square = Square(self.special_moves.ep_bitboard.bit_length())
-                for frm_sqr in reverse_scan_for_square(
-                        pawn_attack_mask(ep_square, not self.current_turn) & pawns):
-                    yield Move(ep_square, frm_sqr)
+    def _possible_move_code_generator(self) -> Generator[int]:
+        """Packed moves (see move.encode_move) the current player can legally make."""
+        return move_codes(self.bitboards, self.current_turn,
+                          self.special_moves.castling_rooks,
+                          self.special_moves.castling_kings,
+                          self.special_moves.ep_bitboard,
+                          self.attack_map)
 
     def _visible_squares(self, color: bool) -> Bitboard:
         """
         Generate a bitboard of squares which should not be visible to the @param color
         (where True is white and black is False)
         """
-        # 'Best practice' calls for this to be made into a billion little functions
-        # But honestly I think making a bunch of little functions just to use them here
-        # is less readable and takes more time than this huge massive one.
-        # And they're all pretty specialized,
-        # so it's not like they'll be reused anywhere other than in possible_move_generator.
-
-        visible: Bitboard = Bitboard(0)
-
-        our_pieces: Bitboard = Bitboard(self._occupied_by_color(color))
-        their_pieces: Bitboard = Bitboard(self._occupied_by_color(not color))
-        everyones_pieces: Bitboard = our_pieces | their_pieces
-
-        visible |= our_pieces
-
-        # Generate non-pawn moves.
-        piece_moves = reduce_with_bitwise_or(
-            *(non_pawn_move_mask(frm, self.bitboards.piece_at(frm), everyones_pieces) & ~our_pieces
-              for frm in (reverse_scan_for_square(our_pieces & ~self.bitboards.pawns)))
-        )
-        visible |= piece_moves
-
-        # If there are pawns, generate their moves
-        if pawns := self.bitboards.pawns & our_pieces:
-            # First if they can attack anyone
-            pawn_attacks = reduce_with_bitwise_or(
-                *(pawn_attack_mask(frm, color) & their_pieces
-                  for frm in reverse_scan_for_square(pawns))
-            )
-            visible |= pawn_attacks
-
-            # Then find their single and double moves
-            if color == self.WHITE:
-                single_moves = pawns << 8 & ~everyones_pieces
-                double_moves = single_moves << 8 & Bitboard.from_rank(4) & ~everyones_pieces
-
-            else:
-                single_moves = pawns >> 8 & ~everyones_pieces
-                double_moves = single_moves >> 8 & Bitboard.from_rank(5) & ~everyones_pieces
-            visible |= single_moves | double_moves
-
-            # Finally, check if an en passant is available
-            if (self.special_moves.ep_bitboard
-                    and not (everyones_pieces
-                             & self.special_moves.ep_bitboard)):
-                ep_square: Square = Square(self.special_moves.ep_bitboard.bit_length())
-                visible |= reduce_with_bitwise_or(
-                    *(Bitboard.from_square(frm_sqr) for frm_sqr in reverse_scan_for_square(
-                        pawn_attack_mask(ep_square, not self.current_turn) & pawns)))
-
-        return Bitboard(visible)
+        return Bitboard(visible_squares(self.bitboards, color, self.attack_map(color)))
@@ -1,9 +1,10 @@
 from __future__ import annotations
 
 from functools import cached_property
-from typing import List
+from typing import List, Sequence
 
 import numpy as np
+from fog_of_war.batch_engine import BatchGames, PAWNS, WHITE, BLACK
 from fog_of_war.piece import Piece
 from fog_of_war.square import Square
 from fog_of_war.chess_bitboards import ChessBitboards
@@ -18,6 +19,49 @@ def _apply_fog(board: np.ndarray, visible: np.ndarray) -> np.ndarray:
     return foggy_board
 
 
+# Planes written by encode_boards: white pawns to kings, black pawns to kings,
+# squares visible to the perspective player and 1's if it's their turn
+PIECE_PLANES: int = 12
+VISIBLE_PLANE: int = 12
+TURN_PLANE: int = 13
+ENCODER_PLANES: int = 14
+
+
+def encode_boards(games: Sequence[FOWChess] | BatchGames,
+                  perspective: bool | np.ndarray,
+                  out: np.ndarray | None = None) -> np.ndarray:
+    """
+    Encode many games as seen by perspective (a color for all of them, or one per game),
+    into out, shape (games, ENCODER_PLANES, 8, 8), any dtype. Made as float32 if not given.
+    Pieces are one-hot planes with the fog applied (only visible pieces are set).
+    Boards are oriented like FOWBoard: for white row 0 is rank 8, for black row 0 is rank 1.
+    Work is done for the whole batch at once, so nothing is allocated per position.
+    """
+    batch: BatchGames = games if isinstance(games, BatchGames) else BatchGames.from_fow(games)
+    count: int = len(batch)
+    if out is None:
+        out = np.empty((count, ENCODER_PLANES, 8, 8), dtype=np.float32)
+    elif out.shape != (count, ENCODER_PLANES, 8, 8):
+        raise ValueError(f"out must have shape {(count, ENCODER_PLANES, 8, 8)}")
+    white_view: np.ndarray = np.broadcast_to(np.asarray(perspective, dtype=np.bool_), (count,))
+
+    black_visible, white_visible = batch.visible_squares()
+    visible: np.ndarray = np.where(white_view, white_visible, black_visible)
+    planes: np.ndarray = np.empty((count, ENCODER_PLANES - 1), dtype=np.uint64)
+    pieces: np.ndarray = batch.pieces[PAWNS:] & visible
+    planes[:, :PIECE_PLANES // 2] = (pieces & batch.pieces[WHITE]).T
+    planes[:, PIECE_PLANES // 2:PIECE_PLANES] = (pieces & batch.pieces[BLACK]).T
+    planes[:, VISIBLE_PLANE] = visible
+
+    # Little endian bytes are ranks 1 to 8, little bit order gives files a to h
+    squares: np.ndarray = np.unpackbits(planes.astype("<u8", copy=False).view(np.uint8),
+                                        bitorder="little").reshape(count, -1, 8, 8)
+    out[white_view, :TURN_PLANE] = squares[white_view, :, ::-1]
+    out[~white_view, :TURN_PLANE] = squares[~white_view]
+    out[:, TURN_PLANE] = (batch.turn == white_view)[:, None, None]
+    return out
+
+
 class FOWBoard:
     def __init__(self,
                  bitboards: ChessBitboards,
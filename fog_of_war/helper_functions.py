@@ -8,11 +8,11 @@ Date: 2022/02/22
 Last Modified: 2022/02/23
     Added docstrings
 """
-from collections.abc import Iterable
+from collections.abc import Iterable, Iterator
 from functools import reduce
 
 from fog_of_war.bitboard import Bitboard
-from fog_of_war.square import Square
+from fog_of_war.square import Square, SQUARES
 
 
 def reduce_with_bitwise_or(*args: Bitboard) -> Bitboard:
@@ -27,5 +27,26 @@ def reverse_scan_for_square(bitboard: Bitboard) -> Iterable[Square]:
     """Generator yielding all bit position numbers in the given bitboard."""
     while bitboard:
         length: int = bitboard.bit_length()
-        yield Square(length)
+        yield SQUARES[length - 1]
         bitboard ^= 1 << (length-1)
+
+
+def scan_indices(bitboard: int) -> Iterator[int]:
+    """
+    Generator yielding the bit index (0-63) of every set bit in bitboard, lowest first.
+    Isolates the lowest set bit with bitboard & -bitboard, so no Square is made.
+    """
+    while bitboard:
+        lowest_bit: int = bitboard & -bitboard
+        yield lowest_bit.bit_length() - 1
+        bitboard ^= lowest_bit
+
+
+if hasattr(int, "bit_count"):  # python 3.10+
+    def popcount(bitboard: int) -> int:
+        """Number of set bits in bitboard."""
+        return bitboard.bit_count()
+else:
+    def popcount(bitboard: int) -> int:
+        """Number of set bits in bitboard."""
+        return bin(bitboard).count("1")
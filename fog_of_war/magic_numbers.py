@@ -0,0 +1,173 @@
+"""
+magic_numbers.py
+Magic bitboard tables for constant time sliding piece (rook, bishop, queen) attacks.
+
+For each square, the occupancy of the squares a slider could be blocked on
+is multiplied by that square's magic number. The top bits of the product are a
+perfect hash of the occupancy, used to index a precomputed table of attacks.
+
+Squares are referred to by their bit index (Square.value - 1, 0-63).
+"""
+from __future__ import annotations
+
+from functools import reduce
+from random import Random, getrandbits
+from typing import Iterable, List, Tuple
+
+_FULL_BOARD: int = 0xFFFF_FFFF_FFFF_FFFF
+
+_ROOK_DIRECTIONS: Tuple[Tuple[int, int], ...] = ((1, 0), (-1, 0), (0, 1), (0, -1))
+_BISHOP_DIRECTIONS: Tuple[Tuple[int, int], ...] = ((1, 1), (1, -1), (-1, 1), (-1, -1))
+
+
+def rand_magic(rng: Random | None = None) -> int:
+    """Random 64 bit int with few bits set, which makes for better magic candidates."""
+    rand_bits = getrandbits if rng is None else rng.getrandbits
+    return reduce(lambda a, b: a & b, [rand_bits(64) for _ in range(3)])
+
+
+def _sliding_attacks(index: int, occupied: int, directions: Iterable[Tuple[int, int]]) -> int:
+    """
+    Slow reference attacks, stepping along (rank, file) directions from index
+    until the edge of the board or the first piece in occupied (WILL INCLUDE THAT PIECE).
+    """
+    attacks: int = 0
+    for rank_step, file_step in directions:
+        rank, file = divmod(index, 8)
+        rank, file = rank + rank_step, file + file_step
+        while 0 <= rank < 8 and 0 <= file < 8:
+            attacks |= 1 << (rank * 8 + file)
+            if occupied & (1 << (rank * 8 + file)):
+                break
+            rank, file = rank + rank_step, file + file_step
+    return attacks
+
+
+def _relevant_occupancy_mask(index: int, directions: Iterable[Tuple[int, int]]) -> int:
+    """
+    Squares a piece on index could be blocked on.
+    Edge squares are left out, a piece there can't hide anything behind it.
+    """
+    mask: int = 0
+    for rank_step, file_step in directions:
+        rank, file = divmod(index, 8)
+        rank, file = rank + rank_step, file + file_step
+        while 0 <= rank + rank_step < 8 and 0 <= file + file_step < 8:
+            mask |= 1 << (rank * 8 + file)
+            rank, file = rank + rank_step, file + file_step
+    return mask
+
+
+def _occupancy_subsets(mask: int) -> Iterable[int]:
+    """Generator yielding every subset of mask's bits (Carry-Rippler trick), starting with 0."""
+    subset: int = 0
+    while True:
+        yield subset
+        subset = (subset - mask) & mask
+        if not subset:
+            break
+
+
+def find_magic(index: int, directions: Iterable[Tuple[int, int]], rng: Random | None = None) -> int:
+    """
+    Brute force search for a magic number for a slider on index moving along directions.
+    Slow (seconds for a whole board), used to generate ROOK_MAGICS and BISHOP_MAGICS.
+    """
+    directions = tuple(directions)
+    mask: int = _relevant_occupancy_mask(index, directions)
+    shift: int = 64 - bin(mask).count("1")
+    occupancies: List[int] = list(_occupancy_subsets(mask))
+    attacks: List[int] = [_sliding_attacks(index, occ, directions) for occ in occupancies]
+
+    while True:
+        magic: int = rand_magic(rng)
+        if bin((mask * magic) & 0xFF00_0000_0000_0000).count("1") < 6:
+            continue
+        table: List[int | None] = [None] * (1 << (64 - shift))
+        for occ, attack in zip(occupancies, attacks):
+            key: int = ((occ * magic) & _FULL_BOARD) >> shift
+            if table[key] is None:
+                table[key] = attack
+            elif table[key] != attack:
+                break
+        else:
+            return magic
+
+
+# Found with find_magic(index, directions, Random(2022)), for index in range(64)
+ROOK_MAGICS = (
+    0x2080_0040_0020_8015, 0x0140_1000_4000_A000, 0x0900_2000_0900_C210, 0x1080_1000_8008_0004,
+    0x4100_0801_0004_0210, 0x0200_0802_0004_0110, 0x8400_1001_0082_2834, 0x0100_0848_8208_2100,
+    0x0320_8020_8000_4002, 0x1000_4000_5000_2002, 0x0040_8020_0880_1000, 0x0180_8010_0080_0800,
+    0x8208_8008_0004_0080, 0x8400_8080_0400_0200, 0x2202_8001_000A_0080, 0x0002_0006_9201_4401,
+    0x0040_0C80_0040_8820, 0x2100_4240_0020_1002, 0x0001_0100_1420_0840, 0x0009_0100_0A24_1000,
+    0x8004_8080_0400_0800, 0x0028_8080_0400_0200, 0x4000_0400_0802_0110, 0x0004_0200_0084_0041,
+    0x0080_0245_4000_2000, 0x0048_2006_4010_0041, 0x8000_1000_8020_0080, 0x0010_1000_8008_0080,
+    0x4096_00D2_0004_2008, 0x0040_0200_8004_0080, 0x0028_5004_0001_0208, 0x0042_1042_0010_8401,
+    0x0008_8040_0880_0722, 0x0100_4000_8880_200C, 0x0408_2000_4100_1100, 0x3402_0320_4200_0890,
+    0x220A_0801_8080_0400, 0x00A0_4010_6801_0420, 0x0205_1008_0402_0200, 0x0011_0000_4300_0282,
+    0x0080_0020_0042_4004, 0x0000_5000_2000_4000, 0x4042_0040_2082_0010, 0x3013_0220_1001_0008,
+    0x8088_0040_2004_0400, 0x0002_0008_0402_0011, 0x5001_4208_5004_0001, 0x0801_1060_840A_0001,
+    0x8001_0042_0080_2600, 0x0000_8040_0020_0080, 0x2C02_0018_4020_8200, 0x0028_8408_0010_0080,
+    0x0004_0008_0080_8480, 0x4010_2004_4010_0801, 0xA089_1001_0208_0400, 0x2024_0402_4083_0600,
+    0x0010_4201_0010_2082, 0x0013_2100_8050_4003, 0x2020_4111_0008_2003, 0x4008_2010_0168_0D01,
+    0x0192_0010_0408_2002, 0x040A_0008_0401_1002, 0x0000_0801_0082_1044, 0xC800_0C00_4021_0882,
+)
+BISHOP_MAGICS = (
+    0x0040_0888_0D00_4311, 0x0021_0404_0048_4100, 0x0004_8800_8100_8010, 0x0008_2040_4080_0920,
+    0x0004_0420_00C1_0840, 0x0006_060A_A048_0000, 0x0101_0411_2028_0002, 0x0001_0101_0120_4203,
+    0x1000_D210_1003_0250, 0x2008_5850_8408_4140, 0x0005_0448_0085_0000, 0x0901_0404_2082_2000,
+    0x8004_3202_1032_0000, 0x6000_1101_0842_2000, 0x0000_2044_1008_0920, 0x2400_0104_0101_0803,
+    0x4250_4004_20A8_8100, 0x0008_8042_2819_0400, 0x1108_0011_2801_2080, 0x8208_0800_8206_4008,
+    0x2001_0208_2008_014C, 0x0002_001D_0041_0422, 0x011C_0082_6908_0810, 0x0082_0000_2A01_2408,
+    0xA004_2000_1002_1012, 0x4198_0800_8202_8820, 0x0404_1000_0100_4080, 0x1020_0800_0100_4008,
+    0x8001_9400_0080_2000, 0x0410_0040_4208_2200, 0x0082_1088_0068_0800, 0x0804_0040_0022_0211,
+    0x0950_3010_8098_0B20, 0x0004_0424_0902_1040, 0x8083_1090_0008_0040, 0x3080_5200_8098_0480,
+    0x0010_0202_0000_2008, 0x4000_9802_0020_4103, 0x4008_0800_6001_0900, 0x00D8_0200_58C8_8040,
+    0x0004_0444_04A0_4108, 0x1A01_1808_0200_0484, 0x0888_1041_1000_2041, 0x0081_2920_1100_0800,
+    0x0008_0810_1040_0400, 0x0040_0114_0020_4100, 0x0048_0104_0400_0092, 0x2004_1104_0104_1420,
+    0x0001_0082_2022_0080, 0xC042_0084_2402_A200, 0x0022_0044_6C10_0000, 0x0002_0000_4202_02A0,
+    0x0002_1904_1044_0000, 0x4001_20A0_0200_8200, 0x0006_2002_6401_0410, 0x1004_0182_1206_0130,
+    0x6061_0108_0124_0200, 0x0000_0202_80D8_0801, 0x0010_1008_4208_0400, 0x0820_1218_9042_0202,
+    0x0002_0051_2002_0484, 0x0110_0405_A408_0200, 0x600A_4008_1A20_8220, 0x0208_1910_0401_1920,
+)
+
+
+def _build_tables(magics: Tuple[int, ...],
+                  directions: Tuple[Tuple[int, int], ...]
+                  ) -> Tuple[Tuple[int, ...], Tuple[int, ...], Tuple[Tuple[int, ...], ...]]:
+    """Occupancy masks, shifts and attack tables for every square."""
+    masks: List[int] = []
+    shifts: List[int] = []
+    tables: List[Tuple[int, ...]] = []
+    for index, magic in enumerate(magics):
+        mask: int = _relevant_occupancy_mask(index, directions)
+        shift: int = 64 - bin(mask).count("1")
+        table: List[int] = [0] * (1 << (64 - shift))
+        for occ in _occupancy_subsets(mask):
+            table[((occ * magic) & _FULL_BOARD) >> shift] = _sliding_attacks(index, occ, directions)
+        masks.append(mask)
+        shifts.append(shift)
+        tables.append(tuple(table))
+    return tuple(masks), tuple(shifts), tuple(tables)
+
+
+ROOK_MASKS, ROOK_SHIFTS, ROOK_ATTACKS = _build_tables(ROOK_MAGICS, _ROOK_DIRECTIONS)
+BISHOP_MASKS, BISHOP_SHIFTS, BISHOP_ATTACKS = _build_tables(BISHOP_MAGICS, _BISHOP_DIRECTIONS)
+
+
+def rook_attacks(index: int, occupied: int) -> int:
+    """Squares a rook on index attacks, including the first piece hit in each direction."""
+    return ROOK_ATTACKS[index][
+        ((occupied & ROOK_MASKS[index]) * ROOK_MAGICS[index] & _FULL_BOARD) >> ROOK_SHIFTS[index]]
+
+
+def bishop_attacks(index: int, occupied: int) -> int:
+    """Squares a bishop on index attacks, including the first piece hit in each direction."""
+    return BISHOP_ATTACKS[index][
+        ((occupied & BISHOP_MASKS[index]) * BISHOP_MAGICS[index] & _FULL_BOARD) >> BISHOP_SHIFTS[index]]
+
+
+def queen_attacks(index: int, occupied: int) -> int:
+    """Squares a queen on index attacks, including the first piece hit in each direction."""
+    return rook_attacks(index, occupied) | bishop_attacks(index, occupied)
@@ -0,0 +1,105 @@
+"""
+mailbox.py
+Mailboxes, the piece on every square of a chess board.
+
+A mailbox is an array('b') of 64 piece codes indexed by bit index (a1 is 0, h8 is 63).
+Codes are Piece values (negative for black) and 0 for an empty square.
+It's kept alongside the bitboards so the piece on a square is one lookup,
+and making a move only has to change the 2-4 squares the move touches.
+"""
+from __future__ import annotations
+
+from array import array
+from typing import Tuple
+
+import numpy as np
+
+from fog_of_war.chess_bitboards import ChessBitboards
+from fog_of_war.helper_functions import scan_indices
+from fog_of_war.move import Move, \
+    encode_move, \
+    move_frm, \
+    move_to, \
+    move_flag, \
+    castling_rook_squares, \
+    MOVE_CASTLE, \
+    MOVE_EN_PASSANT, \
+    MOVE_PROMOTION, \
+    MOVE_PROMOTION_BLACK
+
+
+def new_mailbox(bitboards: ChessBitboards) -> array:
+    """Mailbox of a whole board, built from scratch"""
+    mailbox: array = array('b', bytes(64))
+    for sign, color_bb in ((-1, bitboards.black), (1, bitboards.white)):
+        for piece_type, piece_bb in enumerate(bitboards[2:], 1):
+            for index in scan_indices(color_bb & piece_bb):
+                mailbox[index] = sign * piece_type
+    return mailbox
+
+
+def mailbox_update(mailbox: array, move: Move | int) -> array:
+    """
+    Mailbox after a move (Move or packed move), from the mailbox before it.
+    Moves pieces the same way ChessBitboards.make_move does. mailbox isn't changed.
+    """
+    new: array = mailbox[:]
+    mailbox_make_move(new, move if isinstance(move, int) else encode_move(move))
+    return new
+
+
+def mailbox_make_move(mailbox: array, code: int) -> Tuple[int, int, int]:
+    """
+    Make a packed move in mailbox, changing it.
+    Returns (moved piece, captured square, captured piece), what mailbox_unmake_move needs to undo it.
+    """
+    frm: int = move_frm(code)
+    to: int = move_to(code)
+    flag: int = move_flag(code)
+    piece: int = mailbox[frm]
+
+    if flag & MOVE_PROMOTION:
+        promoted: int = (flag & 0b11) + 2
+        mailbox[frm] = 0
+        mailbox[to] = -promoted if flag & MOVE_PROMOTION_BLACK else promoted
+        return piece, to, 0
+
+    captured: int = to
+    if flag == MOVE_CASTLE:
+        rook_frm, rook_to = castling_rook_squares(to)
+        if mailbox[rook_frm]:
+            mailbox[rook_to] = mailbox[rook_frm]
+            mailbox[rook_frm] = 0
+    elif flag == MOVE_EN_PASSANT or (abs(piece) == 1 and (frm - to) % 8 and not mailbox[to]):
+        # A pawn changing file onto an empty square is en passant.
+        # The captured pawn is on frm's rank and to's file.
+        captured = (frm & ~7) | (to & 7)
+    captured_piece: int = mailbox[captured]
+
+    mailbox[captured] = 0
+    mailbox[frm] = 0
+    mailbox[to] = piece
+    return piece, captured, captured_piece
+
+
+def mailbox_unmake_move(mailbox: array, code: int, undo: Tuple[int, int, int]) -> None:
+    """Undo a packed move made by mailbox_make_move, given what it returned"""
+    piece, captured, captured_piece = undo
+    frm: int = move_frm(code)
+    to: int = move_to(code)
+    if move_flag(code) == MOVE_CASTLE:
+        rook_frm, rook_to = castling_rook_squares(to)
+        if mailbox[rook_to] and not mailbox[rook_frm]:
+            mailbox[rook_frm] = mailbox[rook_to]
+            mailbox[rook_to] = 0
+    mailbox[to] = 0
+    mailbox[captured] = captured_piece
+    mailbox[frm] = piece
+
+
+def mailbox_to_numpy(mailbox: array) -> np.ndarray:
+    """
+    The board as an 8x8 numpy array of piece values (dtype=np.int16),
+    laid out like ChessBitboards.to_numpy (rank 8 is row 0, file a is column 0)
+    """
+    return np.frombuffer(mailbox, dtype=np.int8).reshape(8, 8)[::-1].astype(np.int16)
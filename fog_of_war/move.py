@@ -8,9 +8,9 @@ Last Modified: 2022/02/23
     Added docstrings
 """
 from dataclasses import dataclass
-from typing import Optional
+from typing import Optional, Tuple
 
-from fog_of_war.square import Square
+from fog_of_war.square import Square, SQUARES
 from fog_of_war.piece import Piece
 
 
@@ -35,3 +35,84 @@ class Move:
     rook_frm: Optional[Square] = None
     promotion_to: Optional[Piece] = None
     resignation:Optional[bool] = None
+
+
+# Packed moves, for when a Move object is too much. Fits in 16 bits (array('H')).
+# bits 0-5 are frm's bit index, bits 6-11 are to's bit index and bits 12-15 are a flag.
+MOVE_QUIET: int = 0
+MOVE_CASTLE: int = 1  # frm and to are the king's squares, rook squares are implied by to
+MOVE_EN_PASSANT: int = 2
+MOVE_RESIGNATION: int = 3
+# Promotion flags are MOVE_PROMOTION | MOVE_PROMOTION_BLACK (if black) | piece type - 2
+# So knight, bishop, rook, queen are 0, 1, 2, 3 in the low 2 bits
+MOVE_PROMOTION: int = 0b1000
+MOVE_PROMOTION_BLACK: int = 0b0100
+
+# King's to square -> (rook_frm, rook_to), as bit indices
+_CASTLING_ROOKS = {
+    Square.g1.value - 1: (Square.h1.value - 1, Square.f1.value - 1),
+    Square.c1.value - 1: (Square.a1.value - 1, Square.d1.value - 1),
+    Square.g8.value - 1: (Square.h8.value - 1, Square.f8.value - 1),
+    Square.c8.value - 1: (Square.a8.value - 1, Square.d8.value - 1),
+}
+
+
+def pack_move(frm: int, to: int, flag: int = MOVE_QUIET) -> int:
+    """Packed move from frm and to bit indices (0-63) and a flag"""
+    return frm | to << 6 | flag << 12
+
+
+def move_frm(code: int) -> int:
+    """Bit index of the square a packed move is from"""
+    return code & 0x3F
+
+
+def move_to(code: int) -> int:
+    """Bit index of the square a packed move is to"""
+    return (code >> 6) & 0x3F
+
+
+def move_flag(code: int) -> int:
+    """Flag of a packed move"""
+    return code >> 12
+
+
+def castling_rook_squares(to: int) -> Tuple[int, int]:
+    """(rook_frm, rook_to) bit indices for a castling king moving to bit index to"""
+    return _CASTLING_ROOKS[to]
+
+
+def encode_move(move: Move, en_passant: bool = False) -> int:
+    """
+    Pack a Move into an int.
+    A Move doesn't know if it's an en passant, so pass en_passant=True to flag it.
+    """
+    flag: int = MOVE_QUIET
+    if move.promotion_to is not None:
+        flag = (MOVE_PROMOTION
+                | (MOVE_PROMOTION_BLACK if move.promotion_to.value < 0 else 0)
+                | abs(move.promotion_to.value) - 2)
+    elif move.rook_frm is not None:
+        flag = MOVE_CASTLE
+    elif move.resignation:
+        flag = MOVE_RESIGNATION
+    elif en_passant:
+        flag = MOVE_EN_PASSANT
+    return pack_move(move.frm.value - 1, move.to.value - 1, flag)
+
+
+def decode_move(code: int) -> Move:
+    """Unpack a packed move into a Move. The en passant flag is dropped."""
+    frm: Square = SQUARES[code & 0x3F]
+    to: Square = SQUARES[(code >> 6) & 0x3F]
+    flag: int = code >> 12
+    if flag & MOVE_PROMOTION:
+        piece_type: int = (flag & 0b11) + 2
+        return Move(to=to, frm=frm,
+                    promotion_to=Piece(-piece_type if flag & MOVE_PROMOTION_BLACK else piece_type))
+    if flag == MOVE_CASTLE:
+        rook_frm, rook_to = _CASTLING_ROOKS[to.value - 1]
+        return Move(to=to, frm=frm, rook_to=SQUARES[rook_to], rook_frm=SQUARES[rook_frm])
+    if flag == MOVE_RESIGNATION:
+        return Move(to=to, frm=frm, resignation=True)
+    return Move(to=to, frm=frm)
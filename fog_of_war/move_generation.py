@@ -0,0 +1,289 @@
+"""
+move_generation.py
+Move generation and visibility on plain int bitboards.
+
+Boards are given as a sequence of 8 ints in ChessBitboards order
+and the castling rooks, castling kings and ep bitboards as ints,
+so FOWChess (immutable) and RolloutBoard (changed in place) share the same generator.
+Was part of fog_of_war_chess.py.
+"""
+from __future__ import annotations
+
+from array import array
+from random import randrange
+from typing import Callable, Iterator, List, NamedTuple, Sequence, Tuple
+
+from fog_of_war.attack_masks import non_pawn_move_mask
+from fog_of_war.bitboard import Bitboard
+from fog_of_war.helper_functions import popcount, scan_indices
+from fog_of_war.move import pack_move, \
+    MOVE_CASTLE, \
+    MOVE_EN_PASSANT, \
+    MOVE_PROMOTION, \
+    MOVE_PROMOTION_BLACK
+from fog_of_war.piece import Piece
+from fog_of_war.square import SQUARES
+
+# Backrank squares on each file, indexed by color: [file][True] is on white's backrank (rank 1)
+_BACKRANKS = (Bitboard.from_rank(8), Bitboard.from_rank(1))
+_A_MASKS, _B_MASKS, _C_MASKS, _D_MASKS, _, _F_MASKS, _G_MASKS, _H_MASKS = (
+    tuple(backrank & Bitboard.from_file(file) for backrank in _BACKRANKS) for file in range(1, 9))
+_BOARD: int = 0xFFFF_FFFF_FFFF_FFFF
+_RANK_4: int = Bitboard.from_rank(4)
+_RANK_5: int = Bitboard.from_rank(5)
+_NOT_FILE_A: int = ~Bitboard.from_file(1) & _BOARD
+_NOT_FILE_H: int = ~Bitboard.from_file(8) & _BOARD
+# Indexed by color, pawns on their last rank can promote. White's is rank 8
+_LAST_RANKS = (Bitboard.from_rank(1), Bitboard.from_rank(8))
+# Indexed by color, bit index change of (captures towards the a file, captures towards the h file)
+_CAPTURE_DELTAS = ((-9, -7), (7, 9))
+
+
+def pawn_captures(pawns: int, color: bool) -> Tuple[int, int]:
+    """
+    Squares color's pawns attack, as (captures towards the a file, captures towards the h file).
+    Every pawn at once, shifting diagonally and masking off the files the shift wrapped onto.
+    """
+    if color:
+        return (pawns << 7) & _NOT_FILE_H & _BOARD, (pawns << 9) & _NOT_FILE_A & _BOARD
+    return pawns >> 9 & _NOT_FILE_H, pawns >> 7 & _NOT_FILE_A
+
+
+def pawn_pushes(pawns: int, everyones_pieces: int, color: bool) -> Tuple[int, int]:
+    """To squares of color's pawns' single and double pushes onto empty squares"""
+    if color:
+        # Mask to the board, a pawn on the last rank would be shifted off of it
+        single_moves: int = (pawns << 8) & ~everyones_pieces & _BOARD
+        return single_moves, single_moves << 8 & _RANK_4 & ~everyones_pieces
+    single_moves = pawns >> 8 & ~everyones_pieces
+    return single_moves, single_moves >> 8 & _RANK_5 & ~everyones_pieces
+
+
+class AttackMap(NamedTuple):
+    """
+    Squares one color's pieces attack in a position. Attacks stop at and include the first piece
+    they hit, of either color, so they're moves once that color's own pieces are masked off.
+    """
+    pieces: Tuple[Tuple[int, int], ...]  # (bit index, attacked squares) of every piece that isn't a pawn
+    piece_union: int  # Every square attacked by a piece that isn't a pawn
+    pawns_towards_a: int  # Pawn captures towards the a file, see pawn_captures
+    pawns_towards_h: int  # Pawn captures towards the h file
+    union: int  # Every square attacked by any of them
+
+
+def new_attack_map(bitboards: Sequence[int], color: bool, mailbox: array) -> AttackMap:
+    """color's attack map, mailbox is used to find each piece's type"""
+    black, white, pawns, *_ = bitboards
+    our_pieces: int = white if color else black
+    everyones_pieces: int = black | white
+
+    pieces: List[Tuple[int, int]] = []
+    piece_union: int = 0
+    for frm in scan_indices(our_pieces & ~pawns):
+        attacks: int = non_pawn_move_mask(SQUARES[frm], Piece(mailbox[frm]), everyones_pieces)
+        pieces.append((frm, attacks))
+        piece_union |= attacks
+    towards_a, towards_h = pawn_captures(pawns & our_pieces, color)
+    return AttackMap(tuple(pieces), piece_union, towards_a, towards_h, piece_union | towards_a | towards_h)
+
+
+def _castling_codes(bitboards: Sequence[int],
+                    turn: bool,
+                    castling_rooks: int,
+                    castling_kings: int,
+                    attack_map: Callable[[bool], AttackMap]) -> Iterator[int]:
+    """Packed castling moves the player to move (turn) can make, shared by move_codes and random_move_code"""
+    black, white, _, _, _, rooks, _, kings = bitboards
+    our_pieces: int = white if turn else black
+    everyones_pieces: int = black | white
+    # Castling needs our king and rook still on squares that have castling rights
+    our_castling_kings: int = castling_kings & kings & our_pieces
+    our_castling_rooks: int = castling_rooks & rooks & our_pieces
+    if our_castling_kings and our_castling_rooks:
+        a_mask: int = _A_MASKS[turn]
+        b_mask: int = _B_MASKS[turn]
+        c_mask: int = _C_MASKS[turn]
+        d_mask: int = _D_MASKS[turn]
+
+        f_mask: int = _F_MASKS[turn]
+        g_mask: int = _G_MASKS[turn]
+        h_mask: int = _H_MASKS[turn]
+
+        our_king_mask: int = kings & our_pieces
+        their_attacks: int = attack_map(not turn).union
+
+        # Try for king side castle
+        if (our_castling_rooks & h_mask
+                and not everyones_pieces & (f_mask | g_mask)
+                and not their_attacks & (our_king_mask | f_mask | g_mask)):
+            yield pack_move(our_king_mask.bit_length() - 1,
+                            g_mask.bit_length() - 1,
+                            MOVE_CASTLE)
+        # Try for queen side
+        if (our_castling_rooks & a_mask
+                and not everyones_pieces & (b_mask | c_mask | d_mask)
+                and not their_attacks & (our_king_mask | c_mask | d_mask)):
+            yield pack_move(our_king_mask.bit_length() - 1,
+                            c_mask.bit_length() - 1,
+                            MOVE_CASTLE)
+
+
+def move_codes(bitboards: Sequence[int],
+               turn: bool,
+               castling_rooks: int,
+               castling_kings: int,
+               ep_bitboard: int,
+               attack_map: Callable[[bool], AttackMap]) -> Iterator[int]:
+    """
+    Packed moves (see move.encode_move) the player to move (turn) can legally make.
+    attack_map gives the position's AttackMap of a color, their's is only asked for to check castling.
+    """
+
+    # 'Best practice' calls for this to be made into a billion little functions
+    # But honestly I think making a bunch of little functions just to use them here
+    # is less readable and takes more time than this huge massive one.
+    # And they're all pretty specialized,
+    # so it's not like they'll be reused anywhere other than in visible_squares.
+
+    black, white, pawns, *_ = bitboards
+    our_pieces: int = white if turn else black
+    their_pieces: int = black if turn else white
+    everyones_pieces: int = our_pieces | their_pieces
+    our_attacks: AttackMap = attack_map(turn)
+
+    # Generate non-pawn moves.
+    for frm, attacks in our_attacks.pieces:
+        for to in scan_indices(attacks & ~our_pieces):
+            yield pack_move(frm, to)
+
+    # check for castling
+    yield from _castling_codes(bitboards, turn, castling_rooks, castling_kings, attack_map)
+
+    # If there are pawns, generate their moves, for all of them at once
+    if pawns := pawns & our_pieces:
+        # First if they can attack anyone
+        towards_a: int = our_attacks.pawns_towards_a
+        towards_h: int = our_attacks.pawns_towards_h
+        a_delta, h_delta = _CAPTURE_DELTAS[turn]
+        for to in scan_indices(towards_a & their_pieces):
+            yield pack_move(to - a_delta, to)
+        for to in scan_indices(towards_h & their_pieces):
+            yield pack_move(to - h_delta, to)
+
+        # Then find their single and double moves
+        single_moves, double_moves = pawn_pushes(pawns, everyones_pieces, turn)
+        push_delta: int = 8 if turn else -8
+        for to in scan_indices(single_moves):
+            yield pack_move(to - push_delta, to)
+
+        for to in scan_indices(double_moves):
+            yield pack_move(to - 2 * push_delta, to)
+
+        # promotion, pawns on the last rank are replaced in place
+        if promoting := pawns & _LAST_RANKS[turn]:
+            color_flag: int = 0 if turn else MOVE_PROMOTION_BLACK
+            for pawn in scan_indices(promoting):
+                for promote in (2, 3, 4, 5):
+                    yield pack_move(pawn, pawn, MOVE_PROMOTION | color_flag | promote - 2)
+
+        # Check for en passent, captures onto the (empty) ep square
+        if ep_bitboard and not ep_bitboard & everyones_pieces:
+            ep_square: int = ep_bitboard.bit_length() - 1
+            if towards_a & ep_bitboard:
+                yield pack_move(ep_square - a_delta, ep_square, MOVE_EN_PASSANT)
+            if towards_h & ep_bitboard:
+                yield pack_move(ep_square - h_delta, ep_square, MOVE_EN_PASSANT)
+
+
+def king_capture_code(bitboards: Sequence[int], turn: bool, attack_map: AttackMap) -> int | None:
+    """
+    Packed move of the player to move (turn) capturing their opponent's king, None if it can't be.
+    attack_map is turn's AttackMap, a king capture is one AND with its union. Pawns capture first.
+    """
+    their_king: int = bitboards[7] & bitboards[not turn]
+    if not attack_map.union & their_king:
+        return None
+    to: int = their_king.bit_length() - 1
+    a_delta, h_delta = _CAPTURE_DELTAS[turn]
+    if attack_map.pawns_towards_a & their_king:
+        return pack_move(to - a_delta, to)
+    if attack_map.pawns_towards_h & their_king:
+        return pack_move(to - h_delta, to)
+    for frm, attacks in attack_map.pieces:
+        if attacks & their_king:
+            return pack_move(frm, to)
+    return None
+
+
+def random_move_code(bitboards: Sequence[int],
+                     turn: bool,
+                     castling_rooks: int,
+                     castling_kings: int,
+                     ep_bitboard: int,
+                     attack_map: Callable[[bool], AttackMap]) -> int | None:
+    """
+    One of move_codes' moves picked uniformly at random, None if there are none.
+    Moves are counted a set of to squares at a time with popcount and only the picked one is packed,
+    instead of generating every move to choose from.
+    """
+    black, white, pawns, *_ = bitboards
+    our_pieces: int = white if turn else black
+    their_pieces: int = black if turn else white
+    everyones_pieces: int = our_pieces | their_pieces
+    our_attacks: AttackMap = attack_map(turn)
+
+    # (to squares, their from square, or -1 with the bit index change of a pawn moving to them)
+    to_sets: List[Tuple[int, int, int]] = [(attacks & ~our_pieces, frm, 0) for frm, attacks in our_attacks.pieces]
+    # The few moves with flags, packed as in move_codes
+    flagged: List[int] = list(_castling_codes(bitboards, turn, castling_rooks, castling_kings, attack_map))
+    if pawns := pawns & our_pieces:
+        a_delta, h_delta = _CAPTURE_DELTAS[turn]
+        push_delta: int = 8 if turn else -8
+        single_moves, double_moves = pawn_pushes(pawns, everyones_pieces, turn)
+        to_sets += [(our_attacks.pawns_towards_a & their_pieces, -1, a_delta),
+                    (our_attacks.pawns_towards_h & their_pieces, -1, h_delta),
+                    (single_moves, -1, push_delta),
+                    (double_moves, -1, 2 * push_delta)]
+        if promoting := pawns & _LAST_RANKS[turn]:
+            color_flag: int = 0 if turn else MOVE_PROMOTION_BLACK
+            flagged += [pack_move(pawn, pawn, MOVE_PROMOTION | color_flag | promote - 2)
+                        for pawn in scan_indices(promoting) for promote in (2, 3, 4, 5)]
+        if ep_bitboard and not ep_bitboard & everyones_pieces:
+            ep_square: int = ep_bitboard.bit_length() - 1
+            flagged += [pack_move(ep_square - delta, ep_square, MOVE_EN_PASSANT)
+                        for towards, delta in ((our_attacks.pawns_towards_a, a_delta),
+                                               (our_attacks.pawns_towards_h, h_delta))
+                        if towards & ep_bitboard]
+
+    counts: List[int] = [popcount(to_set) for to_set, _, _ in to_sets]
+    total: int = sum(counts) + len(flagged)
+    if not total:
+        return None
+    pick: int = randrange(total)
+    for count, (to_set, frm, delta) in zip(counts, to_sets):
+        if pick < count:
+            for _ in range(pick):
+                to_set &= to_set - 1
+            to: int = (to_set & -to_set).bit_length() - 1
+            return pack_move(frm if frm >= 0 else to - delta, to)
+        pick -= count
+    return flagged[pick]
+
+
+def visible_squares(bitboards: Sequence[int], color: bool, attack_map: AttackMap) -> int:
+    """
+    Generate a bitboard of squares which should be visible to color
+    (where True is white and black is False), given color's AttackMap
+    """
+    black, white, pawns, *_ = bitboards
+    our_pieces: int = white if color else black
+    their_pieces: int = black if color else white
+
+    # Pieces see everything they attack, pawns see the pieces they can capture and where they can push.
+    # En passant adds nothing, the capturing pawns are ours so they're already visible
+    single_moves, double_moves = pawn_pushes(pawns & our_pieces, our_pieces | their_pieces, color)
+    return (our_pieces
+            | attack_map.piece_union
+            | (attack_map.pawns_towards_a | attack_map.pawns_towards_h) & their_pieces
+            | single_moves
+            | double_moves)
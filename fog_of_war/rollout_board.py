@@ -0,0 +1,242 @@
+"""
+rollout_board.py
+A fog of war chess board which is changed in place, for playing out games quickly.
+"""
+from __future__ import annotations
+
+from array import array
+from random import choice as rand_choice
+from typing import List, Sequence, Tuple
+
+from fog_of_war.bitboard import Bitboard
+from fog_of_war.chess_bitboards import ChessBitboards, make_move_in_place, resets_halfmove_clock
+from fog_of_war.special_move_bitboards import SpecialMoveBitboards, special_moves_after
+from fog_of_war.fog_of_war_chess import FOWChess, DRAW_HALFMOVE_CLOCK, DRAW_REPETITIONS
+from fog_of_war.helper_functions import popcount
+from fog_of_war.mailbox import new_mailbox, mailbox_make_move, mailbox_unmake_move
+from fog_of_war.move import Move, encode_move
+from fog_of_war.move_generation import AttackMap, \
+    new_attack_map, \
+    move_codes, \
+    king_capture_code, \
+    random_move_code, \
+    visible_squares
+from fog_of_war.zobrist import zobrist_hash, zobrist_update
+
+
+class RolloutBoard:
+    """
+    Mutable fog of war chess board, made from a FOWChess.
+    Moves are made in place with push and undone with pop (an undo stack),
+    so playing a game out doesn't make a new board for every move.
+    Pushes with record=False skip the undo stack, for games that are only played forward.
+    Move generation and terminal checks are the same as FOWChess's.
+    """
+    WHITE = True
+    BLACK = False
+
+    __slots__ = ("bitboards", "castling_rooks", "castling_kings", "ep_bitboard",
+                 "current_turn", "half_move_counter", "mailbox", "zobrist_key", "halfmove_clock",
+                 "_keys", "_undo", "_attack_maps")
+
+    def __init__(self,
+                 bitboards: Sequence[int],
+                 turn: bool,
+                 castling_rooks: int,
+                 castling_kings: int,
+                 ep_bitboard: int,
+                 half_move: int,
+                 mailbox: array | None = None,
+                 zobrist_key: int | None = None,
+                 halfmove_clock: int = 0,
+                 keys: Sequence[int] = ()) -> None:
+        self.bitboards: List[int] = list(bitboards)  # in ChessBitboards order
+        self.castling_rooks: int = castling_rooks
+        self.castling_kings: int = castling_kings
+        self.ep_bitboard: int = ep_bitboard
+        self.current_turn: bool = turn
+        self.half_move_counter: int = half_move
+        self.mailbox: array = (mailbox[:] if mailbox is not None
+                               else new_mailbox(ChessBitboards(*self.bitboards)))
+        self.zobrist_key: int = (zobrist_hash(ChessBitboards(*self.bitboards),
+                                              SpecialMoveBitboards(castling_rooks, castling_kings, ep_bitboard),
+                                              turn)
+                                 if zobrist_key is None else zobrist_key)
+        # Half moves since the last pawn move or capture
+        self.halfmove_clock: int = halfmove_clock
+        # Zobrist keys of the positions since then, oldest first, for finding repetitions
+        self._keys: List[int] = list(keys)
+        # (move, bitboards, castling rooks, castling kings, ep bitboard, mailbox undo,
+        #  zobrist key, halfmove clock, keys replaced by a pawn move or capture or None) before each push
+        self._undo: List[Tuple] = []
+        # [black's, white's] AttackMap of the current position, cleared by push and pop
+        self._attack_maps: List[AttackMap | None] = [None, None]
+
+    @classmethod
+    def from_fow(cls, game: FOWChess) -> RolloutBoard:
+        """Board in the same position as game"""
+        return cls(bitboards=game.bitboards,
+                   turn=game.current_turn,
+                   castling_rooks=game.special_moves.castling_rooks,
+                   castling_kings=game.special_moves.castling_kings,
+                   ep_bitboard=game.special_moves.ep_bitboard,
+                   half_move=game.half_move_counter,
+                   mailbox=game.mailbox,
+                   zobrist_key=game.zobrist_key,
+                   halfmove_clock=game.halfmove_clock,
+                   keys=_history_keys(game.history))
+
+    def to_fow(self) -> FOWChess:
+        """FOWChess in the board's current position"""
+        return FOWChess(bitboards=ChessBitboards(*map(Bitboard, self.bitboards)),
+                        turn=self.current_turn,
+                        special_moves=SpecialMoveBitboards(Bitboard(self.castling_rooks),
+                                                           Bitboard(self.castling_kings),
+                                                           Bitboard(self.ep_bitboard)),
+                        half_move=self.half_move_counter,
+                        zobrist_key=self.zobrist_key,
+                        mailbox=self.mailbox[:],
+                        halfmove_clock=self.halfmove_clock,
+                        history=_keys_history(self._keys))
+
+    def __len__(self) -> int:
+        """Number of moves that can be popped"""
+        return len(self._undo)
+
+    def push(self, move: Move | int, record: bool = True) -> None:
+        """
+        Make a move (Move or packed move) in place.
+        With record=False the move can't be popped, and it clears the undo stack,
+        earlier moves can't be popped past it either.
+        """
+        code: int = move if isinstance(move, int) else encode_move(move)
+        bitboards: List[int] = self.bitboards
+        if record:
+            before: Tuple[int, ...] = tuple(bitboards)
+        rooks, kings, ep_bitboard = special_moves_after(self.castling_rooks, self.castling_kings,
+                                                        bitboards[2], code)
+        irreversible: bool = resets_halfmove_clock(bitboards, code)
+        # Bitboards and key first, they read the mailbox from before the move
+        make_move_in_place(bitboards, code, self.mailbox)
+        key: int = zobrist_update(self.zobrist_key, code, self.mailbox,
+                                  (self.castling_rooks, self.castling_kings, self.ep_bitboard),
+                                  (rooks, kings, ep_bitboard))
+        if record:
+            self._undo.append((code, before, self.castling_rooks, self.castling_kings, self.ep_bitboard,
+                               mailbox_make_move(self.mailbox, code),
+                               self.zobrist_key, self.halfmove_clock, self._keys if irreversible else None))
+        else:
+            mailbox_make_move(self.mailbox, code)
+            if self._undo:
+                self._undo.clear()
+        if irreversible:
+            self._keys = []
+            self.halfmove_clock = 0
+        else:
+            self._keys.append(self.zobrist_key)
+            self.halfmove_clock += 1
+        self.zobrist_key = key
+        self.castling_rooks = rooks
+        self.castling_kings = kings
+        self.ep_bitboard = ep_bitboard
+        self.current_turn = not self.current_turn
+        self.half_move_counter += 1
+        self._attack_maps[0] = self._attack_maps[1] = None
+
+    def pop(self) -> int:
+        """Undo the last move pushed, returning it as a packed move"""
+        (code, before, self.castling_rooks, self.castling_kings, self.ep_bitboard, mailbox_undo,
+         self.zobrist_key, self.halfmove_clock, keys) = self._undo.pop()
+        self.bitboards[:] = before
+        if keys is None:
+            self._keys.pop()
+        else:
+            self._keys = keys
+        mailbox_unmake_move(self.mailbox, code, mailbox_undo)
+        self.current_turn = not self.current_turn
+        self.half_move_counter -= 1
+        self._attack_maps[0] = self._attack_maps[1] = None
+        return code
+
+    def attack_map(self, color: bool) -> AttackMap:
+        """Squares color's pieces attack (see move_generation.AttackMap), made once per position"""
+        attack_map: AttackMap | None = self._attack_maps[color]
+        if attack_map is None:
+            attack_map = self._attack_maps[color] = new_attack_map(self.bitboards, color, self.mailbox)
+        return attack_map
+
+    @property
+    def possible_move_codes(self) -> array:
+        """
+        Possible legal moves as packed moves (see move.encode_move), in an array('H').
+        Generated every time, the board can change between calls.
+        """
+        return array('H', move_codes(self.bitboards, self.current_turn,
+                                     self.castling_rooks, self.castling_kings,
+                                     self.ep_bitboard, self.attack_map))
+
+    def push_random_move(self, capture_king: bool = False, sample_one: bool = False, record: bool = True) -> None:
+        """
+        Make a randomly chosen move from the list of possible moves, see FOWChess.make_random_move.
+        record is passed on to push.
+        """
+        if capture_king and (code := king_capture_code(self.bitboards, self.current_turn,
+                                                       self.attack_map(self.current_turn))) is not None:
+            self.push(code, record)
+        elif not sample_one:
+            self.push(rand_choice(self.possible_move_codes), record)
+        elif (code := random_move_code(self.bitboards, self.current_turn, self.castling_rooks,
+                                       self.castling_kings, self.ep_bitboard, self.attack_map)) is not None:
+            self.push(code, record)
+        else:
+            raise IndexError("No possible moves")
+
+    def visible_squares(self, color: bool) -> int:
+        """Bitboard of squares visible to color (True is white), the same as FOWChess's"""
+        return visible_squares(self.bitboards, color, self.attack_map(color))
+
+    @property
+    def repetitions(self) -> int:
+        """How many times this position was reached before (since the last pawn move or capture)"""
+        return self._keys.count(self.zobrist_key)
+
+    @property
+    def is_draw(self) -> bool:
+        """True if drawn by the 50 move rule or repetition, the same as FOWChess's"""
+        return (self.halfmove_clock >= DRAW_HALFMOVE_CLOCK
+                or self._keys.count(self.zobrist_key) + 1 >= DRAW_REPETITIONS)
+
+    @property
+    def is_over(self) -> bool:
+        """True if 1 king left on board, or the game is a draw"""
+        return popcount(self.bitboards[7]) == 1 or self.is_draw
+
+    @property
+    def winner(self) -> bool | None:
+        """Return True if white, False if Black, None if not over."""
+        white: int = self.bitboards[1] & self.bitboards[7]
+        black: int = self.bitboards[0] & self.bitboards[7]
+        if white == black:
+            return None
+        elif not white:
+            return self.BLACK
+        elif not black:
+            return self.WHITE
+
+
+def _history_keys(history: Tuple | None) -> List[int]:
+    """Keys of a FOWChess.history chain, oldest first"""
+    keys: List[int] = []
+    while history is not None:
+        key, history = history
+        keys.append(key)
+    keys.reverse()
+    return keys
+
+
+def _keys_history(keys: Sequence[int]) -> Tuple | None:
+    """FOWChess.history chain of keys, oldest first"""
+    history: Tuple | None = None
+    for key in keys:
+        history = (key, history)
+    return history
@@ -0,0 +1,160 @@
+"""
+setwise.py
+Set-wise bitboard operations on NumPy uint64 arrays, one bitboard per element.
+Moves and attacks of every piece on a bitboard are found at once with shifts and fills,
+so many positions are handled together without looping over squares.
+"""
+from __future__ import annotations
+
+from typing import Dict, Tuple
+
+import numpy as np
+
+U64 = np.uint64
+
+FILE_A: np.uint64 = U64(0x0101_0101_0101_0101)
+FILE_H: np.uint64 = U64(0x8080_8080_8080_8080)
+NOT_FILE_A: np.uint64 = ~FILE_A
+NOT_FILE_H: np.uint64 = ~FILE_H
+NOT_FILE_AB: np.uint64 = ~(FILE_A | FILE_A << U64(1))
+NOT_FILE_GH: np.uint64 = ~(FILE_H | FILE_H >> U64(1))
+RANK_1: np.uint64 = U64(0xFF)
+RANK_4: np.uint64 = U64(0xFF << 24)
+RANK_5: np.uint64 = U64(0xFF << 32)
+RANK_8: np.uint64 = U64(0xFF << 56)
+
+# Compass direction -> (bit index change of one step, squares a step can land on without wrapping)
+DIRECTIONS: Dict[str, Tuple[int, np.uint64]] = {
+    "n": (8, ~U64(0)),
+    "s": (-8, ~U64(0)),
+    "e": (1, NOT_FILE_A),
+    "w": (-1, NOT_FILE_H),
+    "ne": (9, NOT_FILE_A),
+    "nw": (7, NOT_FILE_H),
+    "se": (-7, NOT_FILE_A),
+    "sw": (-9, NOT_FILE_H),
+}
+ROOK_DIRECTIONS: Tuple[str, ...] = ("n", "s", "e", "w")
+BISHOP_DIRECTIONS: Tuple[str, ...] = ("ne", "nw", "se", "sw")
+
+# Knight jumps as (bit index change, squares a jump can land on without wrapping)
+KNIGHT_JUMPS: Tuple[Tuple[int, np.uint64], ...] = (
+    (17, NOT_FILE_A), (15, NOT_FILE_H), (10, NOT_FILE_AB), (6, NOT_FILE_GH),
+    (-6, NOT_FILE_AB), (-10, NOT_FILE_GH), (-15, NOT_FILE_A), (-17, NOT_FILE_H),
+)
+# King steps, the same as one step in each direction
+KING_STEPS: Tuple[Tuple[int, np.uint64], ...] = tuple(DIRECTIONS.values())
+
+_M1 = U64(0x5555_5555_5555_5555)
+_M2 = U64(0x3333_3333_3333_3333)
+_M4 = U64(0x0F0F_0F0F_0F0F_0F0F)
+_H01 = U64(0x0101_0101_0101_0101)
+
+
+def shift(bitboards: np.ndarray, delta: int) -> np.ndarray:
+    """Move every bit delta bit indices (up if positive), bits moved off the board are lost"""
+    return bitboards << U64(delta) if delta > 0 else bitboards >> U64(-delta)
+
+
+def step(bitboards: np.ndarray, delta: int, wrap_mask: np.uint64) -> np.ndarray:
+    """Shift by delta, dropping bits that wrapped around to the other side of the board"""
+    return shift(bitboards, delta) & wrap_mask
+
+
+def slide(sliders: np.ndarray, empty: np.ndarray, direction: str) -> np.ndarray:
+    """
+    Squares attacked by sliders moving in direction, up to and including the first blocker.
+    Kogge-Stone occluded fill, 3 shifts instead of one per square of the ray.
+    """
+    delta, wrap_mask = DIRECTIONS[direction]
+    propagate: np.ndarray = empty & wrap_mask
+    sliders = sliders | propagate & shift(sliders, delta)
+    propagate = propagate & shift(propagate, delta)
+    sliders = sliders | propagate & shift(sliders, 2 * delta)
+    propagate = propagate & shift(propagate, 2 * delta)
+    sliders = sliders | propagate & shift(sliders, 4 * delta)
+    return step(sliders, delta, wrap_mask)
+
+
+def knight_attacks(knights: np.ndarray) -> np.ndarray:
+    """Squares attacked by any of the knights"""
+    attacks: np.ndarray = np.zeros_like(knights)
+    for delta, wrap_mask in KNIGHT_JUMPS:
+        attacks |= step(knights, delta, wrap_mask)
+    return attacks
+
+
+def king_attacks(kings: np.ndarray) -> np.ndarray:
+    """Squares attacked by any of the kings"""
+    attacks: np.ndarray = np.zeros_like(kings)
+    for delta, wrap_mask in KING_STEPS:
+        attacks |= step(kings, delta, wrap_mask)
+    return attacks
+
+
+def pawn_attacks(pawns: np.ndarray, white: np.ndarray | bool) -> np.ndarray:
+    """Squares attacked by pawns, white pawns where white is True and black ones elsewhere"""
+    white_attacks: np.ndarray = step(pawns, 7, NOT_FILE_H) | step(pawns, 9, NOT_FILE_A)
+    black_attacks: np.ndarray = step(pawns, -9, NOT_FILE_H) | step(pawns, -7, NOT_FILE_A)
+    return np.where(white, white_attacks, black_attacks)
+
+
+def pawn_pushes(pawns: np.ndarray, empty: np.ndarray, white: np.ndarray | bool) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    To squares of single and double pawn pushes onto empty squares,
+    white pawns where white is True and black ones elsewhere
+    """
+    single: np.ndarray = np.where(white, shift(pawns, 8), shift(pawns, -8)) & empty
+    double: np.ndarray = np.where(white, shift(single, 8) & RANK_4, shift(single, -8) & RANK_5) & empty
+    return single, double
+
+
+def slider_attacks(rooks: np.ndarray, bishops: np.ndarray, empty: np.ndarray) -> np.ndarray:
+    """Squares attacked by rook movers (rooks and queens) and bishop movers (bishops and queens)"""
+    attacks: np.ndarray = np.zeros_like(rooks)
+    for direction in ROOK_DIRECTIONS:
+        attacks |= slide(rooks, empty, direction)
+    for direction in BISHOP_DIRECTIONS:
+        attacks |= slide(bishops, empty, direction)
+    return attacks
+
+
+if hasattr(np, "bitwise_count"):  # NumPy >= 2.0
+    def popcount(bitboards: np.ndarray) -> np.ndarray:
+        """Number of set bits in each bitboard, as int64"""
+        return np.bitwise_count(bitboards).astype(np.int64)
+else:
+    def popcount(bitboards: np.ndarray) -> np.ndarray:
+        """Number of set bits in each bitboard, as int64 (SWAR, counting in parallel within each word)"""
+        bitboards = bitboards - ((bitboards >> U64(1)) & _M1)
+        bitboards = (bitboards & _M2) + ((bitboards >> U64(2)) & _M2)
+        bitboards = (bitboards + (bitboards >> U64(4))) & _M4
+        return ((bitboards * _H01) >> U64(56)).astype(np.int64)
+
+
+def select_bit(bitboards: np.ndarray, k: np.ndarray) -> np.ndarray:
+    """
+    Bit index of the k-th (from 0, lowest first) set bit of each bitboard.
+    Binary search on bit counts of halves, so 6 steps for any k.
+    """
+    bitboards = bitboards.copy()
+    k = np.asarray(k, dtype=np.int64).copy()
+    index: np.ndarray = np.zeros(bitboards.shape, dtype=np.int64)
+    for width in (32, 16, 8, 4, 2, 1):
+        low: np.ndarray = bitboards & U64((1 << width) - 1)
+        low_count: np.ndarray = popcount(low)
+        upper: np.ndarray = k >= low_count
+        k -= np.where(upper, low_count, 0)
+        bitboards = np.where(upper, bitboards >> U64(width), low)
+        index += np.where(upper, width, 0)
+    return index
+
+
+def lowest_bit_index(bitboards: np.ndarray) -> np.ndarray:
+    """Bit index of the lowest set bit of each (non zero) bitboard"""
+    return np.log2((bitboards & (~bitboards + U64(1))).astype(np.float64)).astype(np.int64)
+
+
+def bit_masks(indices: np.ndarray) -> np.ndarray:
+    """Bitboards with only the bit at each index set"""
+    return U64(1) << np.asarray(indices).astype(np.uint64)
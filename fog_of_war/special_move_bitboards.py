@@ -12,14 +12,25 @@ Date: 2022/02/24
 """
 from __future__ import annotations
 
-from typing import NamedTuple
+from typing import NamedTuple, Tuple
 
-from fog_of_war.square import Square
+from fog_of_war.square import Square, SQUARE_RANKS, SQUARE_MASKS
 
-from fog_of_war.move import Move
+from fog_of_war.move import Move, \
+    encode_move, \
+    move_frm, \
+    move_to, \
+    move_flag, \
+    castling_rook_squares, \
+    MOVE_CASTLE
 from fog_of_war.bitboard import Bitboard
 from fog_of_war.chess_bitboards import ChessBitboards
 
+# Bit indices of the starting squares of pieces with castling rights
+_KING_SQUARES = frozenset({Square.e1.value - 1, Square.e8.value - 1})
+_ROOK_SQUARES = frozenset({Square.a1.value - 1, Square.a8.value - 1,
+                           Square.h1.value - 1, Square.h8.value - 1})
+
 
 class SpecialMoveBitboards(NamedTuple):
     """
@@ -57,31 +68,41 @@ class SpecialMoveBitboards(NamedTuple):
             ep_bitboard=Bitboard(0)
         )
 
-    def update(self, chess_bitboards: ChessBitboards, move: Move) -> SpecialMoveBitboards:
+    def update(self, chess_bitboards: ChessBitboards, move: Move | int) -> SpecialMoveBitboards:
         """
-        Given the current board and the move being made,
+        Given the current board and the move being made (Move or packed move),
         determine the new state of special moves
         """
-        ep_sqr: Bitboard = Bitboard(0)
-        kings: Bitboard = self.castling_kings
-        rooks: Bitboard = self.castling_rooks
-
-        # Test ep squares
-        if Bitboard.from_square(move.frm) & chess_bitboards.pawns and (
-                (move.frm.rank == 2 and move.to.rank == 4)
-                or (move.frm.rank == 7 and move.to.rank == 5)):
-            ep_sqr = Bitboard.from_square(
-                Square(((move.frm.rank + move.to.rank) / 2 - 1) * 8 + move.frm.file))
-
-        # Test if kings have moved
-        if kings and move.frm in {Square.e1, Square.e8}:
-            kings = kings & ~Bitboard.from_square(move.frm)
-
-        # Test if rooks have moved
-        if rooks:
-            if move.rook_frm is not None:
-                rooks = rooks & ~Bitboard.from_square(move.rook_frm)
-            elif move.frm in {Square.a1, Square.a8, Square.h1, Square.h8}:
-                rooks = rooks & ~Bitboard.from_square(move.frm)
-
-        return SpecialMoveBitboards(rooks, kings, ep_sqr)
+        code: int = move if isinstance(move, int) else encode_move(move)
+        rooks, kings, ep_sqr = special_moves_after(self.castling_rooks, self.castling_kings,
+                                                   chess_bitboards.pawns, code)
+        return SpecialMoveBitboards(rooks, kings, Bitboard(ep_sqr))
+
+
+def special_moves_after(castling_rooks: int, castling_kings: int, pawns: int, code: int) -> Tuple[int, int, int]:
+    """
+    Castling rooks, castling kings and ep bitboard after a packed move,
+    given the castling rooks and kings and the pawns bitboard from before it.
+    """
+    ep_sqr: int = 0
+    frm: int = move_frm(code)
+    to: int = move_to(code)
+
+    # Test ep squares, the square the double stepping pawn skipped over
+    if SQUARE_MASKS[frm] & pawns and (
+            (SQUARE_RANKS[frm] == 2 and SQUARE_RANKS[to] == 4)
+            or (SQUARE_RANKS[frm] == 7 and SQUARE_RANKS[to] == 5)):
+        ep_sqr = SQUARE_MASKS[(frm + to) // 2]
+
+    # Test if kings have moved
+    if castling_kings and frm in _KING_SQUARES:
+        castling_kings = castling_kings & ~SQUARE_MASKS[frm]
+
+    # Test if rooks have moved
+    if castling_rooks:
+        if move_flag(code) == MOVE_CASTLE:
+            castling_rooks = castling_rooks & ~SQUARE_MASKS[castling_rook_squares(to)[0]]
+        elif frm in _ROOK_SQUARES:
+            castling_rooks = castling_rooks & ~SQUARE_MASKS[frm]
+
+    return castling_rooks, castling_kings, ep_sqr
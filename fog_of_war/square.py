@@ -10,6 +10,7 @@ Last Modified: 2022/02/23
 """
 from __future__ import annotations
 from enum import Enum, auto
+from typing import Tuple
 
 
 class Square(Enum):
@@ -85,12 +86,37 @@ class Square(Enum):
     @property
     def rank(self: Square) -> int:
         """Which rank (row) square is in"""
-        return int(self.name[1])
+        return SQUARE_RANKS[self.value - 1]
 
     @property
     def file(self: Square) -> int:
         """Which file (col) square is in"""
-        return ord(self.name[0])-96
+        return SQUARE_FILES[self.value - 1]
+
+    @property
+    def index(self: Square) -> int:
+        """Bit index of square (0-63), the plain int used by the low level API below"""
+        return self.value - 1
+
+
+# Low level API for hot paths, where squares are plain int bit indices (Square.value - 1).
+# a1 is 0, h1 is 7, a8 is 56, h8 is 63
+SQUARE_RANKS: Tuple[int, ...] = tuple(index // 8 + 1 for index in range(64))
+SQUARE_FILES: Tuple[int, ...] = tuple(index % 8 + 1 for index in range(64))
+SQUARE_MASKS: Tuple[int, ...] = tuple(1 << index for index in range(64))
+# SQUARES[index] skips the Enum value lookup done by Square(value)
+SQUARES: Tuple[Square, ...] = tuple(Square)
+
+
+def square_index(rank: int, file: int) -> int:
+    """Bit index of the square on rank and file (both 1-8)"""
+    return (rank - 1) * 8 + file - 1
+
+
+def square_distance(index_a: int, index_b: int) -> int:
+    """Rank or file difference (whichever is greater) between two bit indices"""
+    return max(abs(SQUARE_RANKS[index_a] - SQUARE_RANKS[index_b]),
+               abs(SQUARE_FILES[index_a] - SQUARE_FILES[index_b]))
 
 # Didn't want to type out chess cords, but type checker didn't like that much.
 # Thank god for macros
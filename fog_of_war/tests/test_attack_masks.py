@@ -17,7 +17,10 @@ from fog_of_war.attack_masks import pawn_attack_mask,\
     rank_moves,\
     file_moves,\
     diagonal_moves, \
-    non_pawn_move_mask
+    non_pawn_move_mask, \
+    KNIGHT_ATTACKS, \
+    KING_ATTACKS, \
+    PAWN_ATTACKS
 from fog_of_war.square import Square
 from fog_of_war.bitboard import Bitboard
 
@@ -90,6 +93,17 @@ class TestAttackMasks(TestCase):
         self.assertEqual(h8_moves, king_moves(h8_sqr))
         self.assertEqual(e4_moves, king_moves(e4_sqr))
 
+    def test_attack_tables(self):
+        """Test lookup tables are indexed by bit index, and pawn tables by color"""
+        for table in (KNIGHT_ATTACKS, KING_ATTACKS, *PAWN_ATTACKS):
+            self.assertEqual(64, len(table))
+
+        self.assertEqual(Bitboard.from_square(Square.b3) | Bitboard.from_square(Square.c2),
+                         KNIGHT_ATTACKS[Square.a1.value - 1])
+        self.assertEqual(king_moves(Square.h1), KING_ATTACKS[Square.h1.value - 1])
+        self.assertEqual(pawn_attack_mask(Square.e4, True), PAWN_ATTACKS[True][Square.e4.value - 1])
+        self.assertEqual(pawn_attack_mask(Square.e4, False), PAWN_ATTACKS[False][Square.e4.value - 1])
+
     def test_rank_moves(self):
         """Test move mask creation for piece attacking by rank"""
         d5_sqr: Square = Square.d5
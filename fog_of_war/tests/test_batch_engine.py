@@ -0,0 +1,105 @@
+"""
+test_batch_engine.py
+Tests for playing many fog of war chess games at once with NumPy.
+"""
+import random
+from typing import List
+from unittest import TestCase
+
+import numpy as np
+
+from fog_of_war.batch_engine import BatchGames, play_out
+from fog_of_war.bitboard import Bitboard
+from fog_of_war.chess_bitboards import ChessBitboards
+from fog_of_war.fog_of_war_chess import FOWChess
+from fog_of_war.move import Move, MOVE_CASTLE, MOVE_EN_PASSANT, MOVE_PROMOTION, MOVE_PROMOTION_BLACK
+from fog_of_war.special_move_bitboards import SpecialMoveBitboards
+from fog_of_war.square import Square
+
+
+class TestBatchEngine(TestCase):
+    """BatchGames tests"""
+
+    def setUp(self) -> None:
+        """Set up"""
+        # Positions from random games, not counting game over positions
+        random.seed(7)
+        self.positions: List[FOWChess] = []
+        for _ in range(20):
+            game: FOWChess = FOWChess.new_game()
+            for _ in range(random.randrange(150)):
+                if game.is_over or not game.possible_move_codes:
+                    break
+                self.positions.append(game)
+                game = game.make_random_move()
+        self.batch: BatchGames = BatchGames.from_fow(self.positions)
+
+    def test_round_trip(self):
+        """Test games come back out of a batch unchanged"""
+        for i, position in enumerate(self.positions):
+            self.assertEqual(position, self.batch.to_fow(i))
+
+    def test_sampled_moves(self):
+        """Test move counts and sampled moves match FOWChess, and are made the same way"""
+        rng: np.random.Generator = np.random.default_rng(0)
+        for _ in range(10):
+            codes, counts = self.batch.sample_moves(rng)
+            played: BatchGames = self.batch.copy()
+            played.make_moves(codes)
+            for i, position in enumerate(self.positions):
+                self.assertEqual(len(position.possible_move_codes), counts[i])
+                self.assertIn(codes[i], position.possible_move_codes)
+                self.assertEqual(position.make_move(int(codes[i])), played.to_fow(i))
+                self.assertEqual(position.make_move(int(codes[i])).halfmove_clock, played.halfmove_clock[i])
+
+    def test_special_moves(self):
+        """Test castling, en passant and promotions of both colors are sampled and made like FOWChess"""
+        en_passant: FOWChess = FOWChess.new_game()
+        for move in (Move(frm=Square.e2, to=Square.e4), Move(frm=Square.a7, to=Square.a6),
+                     Move(frm=Square.e4, to=Square.e5), Move(frm=Square.d7, to=Square.d5)):
+            en_passant = en_passant.make_move(move)
+        kings: Bitboard = Bitboard.from_square(Square.e1) | Bitboard.from_square(Square.e8)
+        no_rights: SpecialMoveBitboards = SpecialMoveBitboards(Bitboard(0), Bitboard(0), Bitboard(0))
+        castling: FOWChess = FOWChess(
+            ChessBitboards(black=Bitboard.from_square(Square.e8),
+                           white=Bitboard.from_square(Square.e1) | Bitboard.from_square(Square.h1),
+                           pawns=Bitboard(0), knights=Bitboard(0), bishops=Bitboard(0),
+                           rooks=Bitboard.from_square(Square.h1), queens=Bitboard(0), kings=kings),
+            FOWChess.WHITE, SpecialMoveBitboards.new_game(), 0)
+        promotions: List[FOWChess] = [
+            FOWChess(ChessBitboards(black=Bitboard.from_square(Square.e8) | black_pawn,
+                                    white=Bitboard.from_square(Square.e1) | white_pawn,
+                                    pawns=white_pawn | black_pawn, knights=Bitboard(0), bishops=Bitboard(0),
+                                    rooks=Bitboard(0), queens=Bitboard(0), kings=kings),
+                     turn, no_rights, 0)
+            for white_pawn, black_pawn, turn in ((Bitboard.from_square(Square.a8), Bitboard(0), FOWChess.WHITE),
+                                                 (Bitboard(0), Bitboard.from_square(Square.h1), FOWChess.BLACK))]
+        positions: List[FOWChess] = [en_passant, castling] + promotions
+        batch: BatchGames = BatchGames.from_fow(positions * 100)
+
+        codes, counts = batch.sample_moves(np.random.default_rng(0))
+        played: BatchGames = batch.copy()
+        played.make_moves(codes)
+        for i, position in enumerate(positions * 100):
+            self.assertEqual(len(position.possible_move_codes), counts[i])
+            self.assertIn(codes[i], position.possible_move_codes)
+            self.assertEqual(position.make_move(int(codes[i])), played.to_fow(i))
+        flags = set((codes >> 12).tolist())
+        self.assertLessEqual({MOVE_CASTLE, MOVE_EN_PASSANT}, flags)
+        self.assertTrue(any(flag & MOVE_PROMOTION and flag & MOVE_PROMOTION_BLACK for flag in flags))
+        self.assertTrue(any(flag & MOVE_PROMOTION and not flag & MOVE_PROMOTION_BLACK for flag in flags))
+
+    def test_visible_squares(self):
+        """Test both colors' visible squares match FOWChess"""
+        visible = self.batch.visible_squares()
+        for i, position in enumerate(self.positions):
+            for color in (FOWChess.WHITE, FOWChess.BLACK):
+                self.assertEqual(position._visible_squares(color), visible[int(color)][i])
+
+    def test_play_out(self):
+        """Test every game is played until a king is captured or the move limit"""
+        winners, lengths = play_out(BatchGames.new_games(32), np.random.default_rng(1), max_plies=300)
+        for winner, length in zip(winners, lengths):
+            self.assertTrue(winner != 0 or length == 300)
+            self.assertLessEqual(length, 300)
+        self.assertTrue((winners != 0).any())
@@ -55,6 +55,15 @@ class TestBitboard(TestCase):
         self.assertTrue(np.equal(self.rank_8.to_numpy(), numpy_rank_8).all())
         self.assertTrue(np.equal(self.file_8.to_numpy(), numpy_file_8).all())
 
+    def test_batch_to_numpy(self):
+        """Test converting many bitboards at once matches converting each"""
+        bitboards = [self.empty, self.full, self.rank_1, self.rank_8,
+                     self.file_1, self.file_8, self.first_square]
+        arrays: np.ndarray = Bitboard.batch_to_numpy(bitboards)
+        self.assertEqual((len(bitboards), 8, 8), arrays.shape)
+        for bitboard, array in zip(bitboards, arrays):
+            self.assertTrue(np.equal(bitboard.to_numpy(), array).all())
+
     def test_from_rank(self):
         """Test Bitboard alternate constructor "from_rank" """
         self.assertEqual(Bitboard.from_rank(1), self.rank_1)
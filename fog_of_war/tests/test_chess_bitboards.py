@@ -14,7 +14,8 @@ from unittest import TestCase
 from fog_of_war import reduce_with_bitwise_or
 from fog_of_war.bitboard import Bitboard
 from fog_of_war.chess_bitboards import ChessBitboards
-from fog_of_war.move import Move
+from fog_of_war.mailbox import new_mailbox
+from fog_of_war.move import Move, encode_move
 from fog_of_war.piece import Piece
 from fog_of_war.square import Square
 
@@ -141,4 +142,77 @@ class TestChessBitboards(TestCase):
         self.assertIsNone(result.piece_at(Square.a2))
         self.assertEqual(Piece.P, result.piece_at(Square.a4))
         self.assertEqual(move_a2_pawn_forward, result)
-    # TODO: Test promotions
+
+    def test_make_packed_move(self):
+        """Test if a packed move is made the same as the Move it came from"""
+        for move in (Move(frm=Square.a2, to=Square.a4),
+                     Move(frm=Square.g1, to=Square.f3),
+                     Move(frm=Square.a1, to=Square.a7)):
+            self.assertEqual(self.new_game.make_move(move),
+                             self.new_game.make_move(encode_move(move)))
+
+    def test_en_passant(self):
+        """Test if an en passant capture removes the pawn that was passed"""
+        board: ChessBitboards = ChessBitboards(
+            white=Bitboard.from_square(Square.e5),
+            black=Bitboard.from_square(Square.d5),
+            pawns=Bitboard.from_square(Square.e5) | Bitboard.from_square(Square.d5),
+            knights=Bitboard(0),
+            bishops=Bitboard(0),
+            rooks=Bitboard(0),
+            queens=Bitboard(0),
+            kings=Bitboard(0))
+        result: ChessBitboards = board.make_move(Move(frm=Square.e5, to=Square.d6))
+        self.assertEqual(Bitboard.from_square(Square.d6), result.pawns)
+        self.assertEqual(Bitboard(0), result.black)
+        self.assertEqual(Piece.P, result.piece_at(Square.d6))
+
+    def test_promotion(self):
+        """Test if a promotion replaces the pawn in place"""
+        board: ChessBitboards = ChessBitboards(
+            white=Bitboard.from_square(Square.b8),
+            black=Bitboard(0),
+            pawns=Bitboard.from_square(Square.b8),
+            knights=Bitboard(0),
+            bishops=Bitboard(0),
+            rooks=Bitboard(0),
+            queens=Bitboard(0),
+            kings=Bitboard(0))
+        result: ChessBitboards = board.make_move(
+            Move(frm=Square.b8, to=Square.b8, promotion_to=Piece.Q))
+        self.assertEqual(Bitboard(0), result.pawns)
+        self.assertEqual(Piece.Q, result.piece_at(Square.b8))
+
+    def test_castling(self):
+        """Test if castling moves the king and the rook"""
+        board: ChessBitboards = ChessBitboards(
+            white=Bitboard.from_square(Square.e1) | Bitboard.from_square(Square.h1),
+            black=Bitboard(0),
+            pawns=Bitboard(0),
+            knights=Bitboard(0),
+            bishops=Bitboard(0),
+            rooks=Bitboard.from_square(Square.h1),
+            queens=Bitboard(0),
+            kings=Bitboard.from_square(Square.e1))
+        result: ChessBitboards = board.make_move(
+            Move(frm=Square.e1, to=Square.g1, rook_frm=Square.h1, rook_to=Square.f1))
+        self.assertEqual(Piece.K, result.piece_at(Square.g1))
+        self.assertEqual(Piece.R, result.piece_at(Square.f1))
+        self.assertEqual(Bitboard.from_square(Square.g1) | Bitboard.from_square(Square.f1), result.white)
+        self.assertIsNone(result.piece_at(Square.e1))
+        self.assertIsNone(result.piece_at(Square.h1))
+
+    def test_make_move_with_mailbox(self):
+        """Test if moves made with a mailbox are the same as without one"""
+        board: ChessBitboards = self.new_game
+        for move in (Move(frm=Square.e2, to=Square.e4),
+                     Move(frm=Square.d7, to=Square.d5),
+                     Move(frm=Square.e4, to=Square.d5),
+                     Move(frm=Square.d8, to=Square.d5),
+                     Move(frm=Square.b1, to=Square.c3),
+                     Move(frm=Square.d5, to=Square.a2)):
+            with_mailbox: ChessBitboards = board.make_move(move, new_mailbox(board))
+            board = board.make_move(move)
+            self.assertEqual(board, with_mailbox)
+        self.assertEqual(Piece.q, board.piece_at(Square.a2))
+        self.assertIsNone(board.piece_at(Square.d5))
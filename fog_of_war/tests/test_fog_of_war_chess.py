@@ -7,6 +7,7 @@ Date: 2022/02/24
 Last Modified: 2022/02/25
     Finishing the last of the unit tests
 """
+import random
 from typing import Set
 from unittest import TestCase
 
@@ -16,8 +17,11 @@ from fog_of_war.chess_bitboards import ChessBitboards
 from fog_of_war.special_move_bitboards import SpecialMoveBitboards
 from fog_of_war.fog_of_war_chess import FOWChess
 from fog_of_war.bitboard import Bitboard
-from fog_of_war.square import Square
-from fog_of_war.move import Move
+from fog_of_war.square import Square, SQUARES
+from fog_of_war.attack_masks import pawn_attack_mask
+from fog_of_war.move import Move, decode_move
+from fog_of_war.move_generation import king_capture_code
+from fog_of_war.piece import Piece
 
 
 class TestFOWChess(TestCase):
@@ -350,11 +354,35 @@ class TestFOWChess(TestCase):
         self.assertTrue(self.white_move_board_by_hand == self.white_move_board)
         self.assertTrue(self.black_move_board_by_hand == self.black_move_board)
 
+    def test_possible_move_codes(self):
+        """Test packed moves decode to the same moves as possible_moves_list"""
+        for game in (FOWChess.new_game(), self.black_move_board, self.lone_king_and_rook):
+            self.assertSetEqual(set(game.possible_moves_list),
+                                {decode_move(code) for code in game.possible_move_codes})
+            for code in game.possible_move_codes:
+                self.assertTrue(game.make_move(code) == game.make_move(decode_move(code)))
+
     def test_make_random_move(self):
         """Test if make random move works"""
         new: FOWChess = FOWChess.new_game().make_random_move()
         self.assertFalse(FOWChess.new_game() == new)
 
+    def test_random_move_policies(self):
+        """Test capture_king takes an attacked king and sample_one only picks possible moves"""
+        game: FOWChess = FOWChess.new_game()
+        for move in (Move(frm=Square.e2, to=Square.e4), Move(frm=Square.f7, to=Square.f6),
+                     Move(frm=Square.d1, to=Square.h5), Move(frm=Square.a7, to=Square.a6)):
+            self.assertIsNone(king_capture_code(game.bitboards, game.current_turn,
+                                                game.attack_map(game.current_turn)))
+            game = game.make_move(move)
+        over: FOWChess = game.make_random_move(capture_king=True)
+        self.assertEqual(over.bitboards.kings, Bitboard.from_square(Square.e1))
+        self.assertTrue(over.winner)
+
+        random.seed(25)
+        sampled: Set[FOWChess] = {game.make_random_move(sample_one=True) for _ in range(400)}
+        self.assertSetEqual({game.make_move(code) for code in game.possible_move_codes}, sampled)
+
     def test_castling(self):
         """Test if castling rights are updated as expected"""
         new: FOWChess = self.lone_king_and_rook.make_move(
@@ -376,3 +404,75 @@ class TestFOWChess(TestCase):
         self.assertIsNone(FOWChess.new_game().winner)
         self.assertTrue(self.lone_king_and_rook.winner)
 
+    def test_halfmove_clock(self):
+        """Test the halfmove clock counts up and is reset by pawn moves and captures"""
+        game: FOWChess = FOWChess.new_game().make_move(Move(frm=Square.g1, to=Square.f3))
+        self.assertEqual(1, game.halfmove_clock)
+        game = game.make_move(Move(frm=Square.b8, to=Square.c6))
+        self.assertEqual(2, game.halfmove_clock)
+        game = game.make_move(Move(frm=Square.e2, to=Square.e4))
+        self.assertEqual(0, game.halfmove_clock)
+        self.assertIsNone(game.history)
+        game = game.make_move(Move(frm=Square.c6, to=Square.d4)).make_move(Move(frm=Square.f3, to=Square.d4))
+        self.assertEqual(0, game.halfmove_clock)
+        self.assertFalse(game.is_draw)
+        self.assertTrue(FOWChess(bitboards=game.bitboards, turn=game.current_turn,
+                                 special_moves=game.special_moves, half_move=game.half_move_counter,
+                                 halfmove_clock=100).is_over)
+
+    def test_repetition(self):
+        """Test a position reached for the third time is a draw"""
+        shuffle = [Move(frm=Square.g1, to=Square.f3), Move(frm=Square.g8, to=Square.f6),
+                   Move(frm=Square.f3, to=Square.g1), Move(frm=Square.f6, to=Square.g8)]
+        game: FOWChess = FOWChess.new_game()
+        for repetitions in (1, 2):
+            for move in shuffle:
+                self.assertFalse(game.is_over)
+                game = game.make_move(move)
+            self.assertEqual(repetitions, game.repetitions)
+        self.assertTrue(game.is_draw)
+        self.assertTrue(game.is_over)
+        self.assertIsNone(game.winner)
+
+
+    def test_promotion_moves(self):
+        """Test only pawns on their last rank can promote, in place, to any of the 4 pieces"""
+        pawns: Bitboard = Bitboard.from_square(Square.a8) | Bitboard.from_square(Square.b7)
+        game: FOWChess = FOWChess(
+            bitboards=ChessBitboards(black=Bitboard.from_square(Square.e8),
+                                     white=Bitboard.from_square(Square.e1) | pawns,
+                                     pawns=pawns,
+                                     knights=Bitboard(0),
+                                     bishops=Bitboard(0),
+                                     rooks=Bitboard(0),
+                                     queens=Bitboard(0),
+                                     kings=Bitboard.from_square(Square.e1) | Bitboard.from_square(Square.e8)),
+            turn=True,
+            special_moves=SpecialMoveBitboards(Bitboard(0), Bitboard(0), Bitboard(0)),
+            half_move=0)
+        promotions: Set[Move] = {move for move in game.possible_moves_list if move.promotion_to}
+        self.assertSetEqual({Move(frm=Square.a8, to=Square.a8, promotion_to=piece)
+                             for piece in (Piece.N, Piece.B, Piece.R, Piece.Q)},
+                            promotions)
+        self.assertEqual(Piece.Q, game.make_move(Move(frm=Square.a8, to=Square.a8, promotion_to=Piece.Q))
+                         .piece_at(Square.a8))
+
+    def test_attack_map(self):
+        """Test attack maps are made once per color and hold every piece's attacks"""
+        game: FOWChess = self.black_move_board
+        for color in (FOWChess.WHITE, FOWChess.BLACK):
+            attack_map = game.attack_map(color)
+            self.assertIs(attack_map, game.attack_map(color))
+            ours: Bitboard = game.bitboards.white if color else game.bitboards.black
+            self.assertSetEqual({SQUARES[frm] for frm, _ in attack_map.pieces},
+                                {square for square in SQUARES
+                                 if ours & ~game.bitboards.pawns & Bitboard.from_square(square)})
+            pawn_attacks: int = 0
+            for square in SQUARES:
+                if ours & game.bitboards.pawns & Bitboard.from_square(square):
+                    pawn_attacks |= pawn_attack_mask(square, color)
+            self.assertEqual(pawn_attacks, attack_map.pawns_towards_a | attack_map.pawns_towards_h)
+            piece_attacks: int = 0
+            for _, attacks in attack_map.pieces:
+                piece_attacks |= attacks
+            self.assertEqual(piece_attacks | pawn_attacks, attack_map.union)
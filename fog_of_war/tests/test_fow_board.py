@@ -1,6 +1,9 @@
 from unittest import TestCase
 import numpy as np
 from fog_of_war.fog_of_war_chess import FOWChess
+from fog_of_war.fow_board import FOWBoard, encode_boards, ENCODER_PLANES, TURN_PLANE, VISIBLE_PLANE
+from fog_of_war.move import Move
+from fog_of_war.square import Square
 
 """
 Broke FOWChess up a bit, some responsibility moved to FOWBoard.
@@ -134,3 +137,30 @@ class TestFOWBoard(TestCase):
             np.equal(
                 self.black_move_numpy,
                 self.black_move_board.black_foggy_board).all())
+
+
+class TestEncodeBoards(TestCase):
+    """Batched board encoder tests"""
+
+    def setUp(self) -> None:
+        """Set up"""
+        new_game: FOWChess = FOWChess.new_game()
+        self.games = [new_game,
+                      new_game.make_move(Move(frm=Square.e2, to=Square.e4)),
+                      new_game.make_move(Move(frm=Square.g1, to=Square.f3))
+                              .make_move(Move(frm=Square.d7, to=Square.d5))]
+        # Piece values of the one-hot planes, see Piece
+        self.values = np.array([1, 2, 3, 4, 5, 6, -1, -2, -3, -4, -5, -6])
+
+    def test_matches_foggy_board(self):
+        """Test encoded boards hold the same pieces and fog as FOWBoard, from both sides"""
+        for perspective in (FOWChess.WHITE, FOWChess.BLACK):
+            out = np.zeros((len(self.games), ENCODER_PLANES, 8, 8), dtype=np.int8)
+            self.assertIs(out, encode_boards(self.games, perspective, out))
+            for game, encoded in zip(self.games, out):
+                decoded = np.where(encoded[VISIBLE_PLANE] == 1,
+                                   np.tensordot(self.values, encoded[:VISIBLE_PLANE], 1),
+                                   15)
+                self.assertTrue(np.equal(FOWBoard.from_fow_chess(game, perspective).foggy_board,
+                                         decoded).all())
+                self.assertEqual(game.current_turn == perspective, encoded[TURN_PLANE].all())
@@ -0,0 +1,37 @@
+"""
+test_helper_functions.py
+Tests for bit scanning and counting helpers.
+"""
+from unittest import TestCase
+
+from fog_of_war.bitboard import Bitboard
+from fog_of_war.helper_functions import scan_indices, popcount, reverse_scan_for_square
+from fog_of_war.square import Square
+
+
+class TestHelperFunctions(TestCase):
+    """Bit helper tests"""
+
+    def setUp(self) -> None:
+        """Set up"""
+        self.corners: Bitboard = (Bitboard.from_square(Square.a1)
+                                  | Bitboard.from_square(Square.h1)
+                                  | Bitboard.from_square(Square.a8)
+                                  | Bitboard.from_square(Square.h8))
+
+    def test_scan_indices(self):
+        """Test bit indices come out lowest first"""
+        self.assertEqual([0, 7, 56, 63], list(scan_indices(self.corners)))
+        self.assertEqual([], list(scan_indices(Bitboard(0))))
+        self.assertEqual(list(range(64)), list(scan_indices(Bitboard(0xFFFF_FFFF_FFFF_FFFF))))
+
+    def test_scan_matches_reverse_scan(self):
+        """Test scan_indices finds the same squares as reverse_scan_for_square"""
+        self.assertEqual(sorted(sqr.index for sqr in reverse_scan_for_square(self.corners)),
+                         list(scan_indices(self.corners)))
+
+    def test_popcount(self):
+        """Test set bits are counted"""
+        self.assertEqual(0, popcount(Bitboard(0)))
+        self.assertEqual(4, popcount(self.corners))
+        self.assertEqual(64, popcount(Bitboard(0xFFFF_FFFF_FFFF_FFFF)))
@@ -0,0 +1,62 @@
+"""
+test_magic_numbers.py
+Tests for magic bitboard sliding attack lookups.
+"""
+from random import Random
+from unittest import TestCase
+
+from fog_of_war.bitboard import Bitboard
+from fog_of_war.magic_numbers import rook_attacks, \
+    bishop_attacks, \
+    queen_attacks, \
+    find_magic, \
+    _sliding_attacks, \
+    _relevant_occupancy_mask, \
+    _occupancy_subsets, \
+    _ROOK_DIRECTIONS, \
+    _BISHOP_DIRECTIONS
+from fog_of_war.square import Square
+
+
+class TestMagicNumbers(TestCase):
+    """Magic bitboard tests"""
+
+    def setUp(self) -> None:
+        """Set up"""
+        rng: Random = Random(0)
+        self.occupancies = [rng.getrandbits(64) & rng.getrandbits(64) for _ in range(20)]
+
+    def test_rook_attacks(self):
+        """Test rook lookups against stepping along ranks and files"""
+        for index in range(64):
+            for occ in self.occupancies:
+                self.assertEqual(_sliding_attacks(index, occ, _ROOK_DIRECTIONS),
+                                 rook_attacks(index, occ))
+
+    def test_bishop_attacks(self):
+        """Test bishop lookups against stepping along diagonals"""
+        for index in range(64):
+            for occ in self.occupancies:
+                self.assertEqual(_sliding_attacks(index, occ, _BISHOP_DIRECTIONS),
+                                 bishop_attacks(index, occ))
+
+    def test_queen_attacks(self):
+        """Test queen attacks are rook and bishop attacks combined"""
+        occupied: Bitboard = Bitboard.from_square(Square.d6) | Bitboard.from_square(Square.f4)
+        d4: int = Square.d4.value - 1
+        self.assertEqual(rook_attacks(d4, occupied) | bishop_attacks(d4, occupied),
+                         queen_attacks(d4, occupied))
+        self.assertTrue(queen_attacks(d4, occupied) & Bitboard.from_square(Square.d6))
+        self.assertFalse(queen_attacks(d4, occupied) & Bitboard.from_square(Square.d7))
+
+    def test_find_magic(self):
+        """Test a found magic maps occupancies with different attacks to different keys"""
+        d4: int = Square.d4.value - 1
+        magic: int = find_magic(d4, _BISHOP_DIRECTIONS, Random(0))
+        mask: int = _relevant_occupancy_mask(d4, _BISHOP_DIRECTIONS)
+        shift: int = 64 - bin(mask).count("1")
+        seen = {}
+        for occ in _occupancy_subsets(mask):
+            key: int = ((occ * magic) & 0xFFFF_FFFF_FFFF_FFFF) >> shift
+            attacks: int = _sliding_attacks(d4, occ, _BISHOP_DIRECTIONS)
+            self.assertEqual(attacks, seen.setdefault(key, attacks))
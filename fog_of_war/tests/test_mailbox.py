@@ -0,0 +1,78 @@
+"""
+test_mailbox.py
+Tests for mailboxes kept alongside FOWChess bitboards.
+"""
+import random
+from typing import List
+from unittest import TestCase
+
+import numpy as np
+
+from fog_of_war.fog_of_war_chess import FOWChess
+from fog_of_war.mailbox import new_mailbox
+from fog_of_war.move import Move, pack_move, MOVE_PROMOTION, MOVE_PROMOTION_BLACK
+from fog_of_war.square import Square, SQUARES
+
+
+class TestMailbox(TestCase):
+    """Mailbox tests"""
+
+    def setUp(self) -> None:
+        """Set up"""
+        # Has a double step, en passant, a capture and castling
+        self.moves: List[Move] = [
+            Move(frm=Square.e2, to=Square.e4),
+            Move(frm=Square.a7, to=Square.a6),
+            Move(frm=Square.e4, to=Square.e5),
+            Move(frm=Square.d7, to=Square.d5),
+            Move(frm=Square.e5, to=Square.d6),
+            Move(frm=Square.c7, to=Square.d6),
+            Move(frm=Square.g1, to=Square.f3),
+            Move(frm=Square.a6, to=Square.a5),
+            Move(frm=Square.f1, to=Square.c4),
+            Move(frm=Square.a5, to=Square.a4),
+            Move(frm=Square.e1, to=Square.g1, rook_frm=Square.h1, rook_to=Square.f1),
+        ]
+
+    def assert_matches_bitboards(self, game: FOWChess) -> None:
+        """The mailbox, piece_at and to_numpy agree with the bitboards"""
+        self.assertEqual(new_mailbox(game.bitboards), game.mailbox)
+        for square in SQUARES:
+            self.assertEqual(game.bitboards.piece_at(square), game.piece_at(square))
+        np.testing.assert_array_equal(game.bitboards.to_numpy(), game.to_numpy())
+
+    def test_new_game(self):
+        """Test the starting position"""
+        game: FOWChess = FOWChess.new_game()
+        self.assertEqual(list(game.mailbox[:8]), [4, 2, 3, 5, 6, 3, 2, 4])
+        self.assertEqual(list(game.mailbox[48:56]), [-1] * 8)
+        self.assert_matches_bitboards(game)
+
+    def test_incremental_matches_full(self):
+        """Test mailboxes updated move by move match mailboxes built from scratch"""
+        game: FOWChess = FOWChess.new_game()
+        game.mailbox  # Build it, so children are updated from it
+        for move in self.moves:
+            game = game.make_move(move)
+            self.assert_matches_bitboards(game)
+
+    def test_promotion(self):
+        """Test promotions replace the pawn with the promoted piece"""
+        game: FOWChess = FOWChess.new_game()
+        game.mailbox
+        white_queen = game.make_move(pack_move(Square.e2.index, Square.e2.index, MOVE_PROMOTION | 3))
+        self.assertEqual(white_queen.mailbox[Square.e2.index], 5)
+        black_knight = game.make_move(pack_move(Square.e7.index, Square.e7.index,
+                                                MOVE_PROMOTION | MOVE_PROMOTION_BLACK | 0))
+        self.assertEqual(black_knight.mailbox[Square.e7.index], -2)
+        self.assert_matches_bitboards(white_queen)
+        self.assert_matches_bitboards(black_knight)
+
+    def test_random_games(self):
+        """Test mailboxes stay correct through random games"""
+        random.seed(19)
+        for _ in range(5):
+            game: FOWChess = FOWChess.new_game()
+            while not game.is_over and game.half_move_counter < 150:
+                game = game.make_random_move()
+                self.assertEqual(new_mailbox(game.bitboards), game.mailbox)
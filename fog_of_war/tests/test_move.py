@@ -0,0 +1,63 @@
+"""
+test_move.py
+Tests for packed move encoding.
+"""
+from array import array
+from unittest import TestCase
+
+from fog_of_war.move import Move, \
+    encode_move, \
+    decode_move, \
+    pack_move, \
+    move_frm, \
+    move_to, \
+    move_flag, \
+    MOVE_QUIET, \
+    MOVE_CASTLE, \
+    MOVE_EN_PASSANT, \
+    MOVE_PROMOTION
+from fog_of_war.piece import Piece
+from fog_of_war.square import Square
+
+
+class TestMove(TestCase):
+    """Packed move tests"""
+
+    def setUp(self) -> None:
+        """Set up"""
+        self.moves = [
+            Move(to=Square.e4, frm=Square.e2),
+            Move(to=Square.a1, frm=Square.h8),
+            Move(to=Square.g1, frm=Square.e1, rook_to=Square.f1, rook_frm=Square.h1),
+            Move(to=Square.c8, frm=Square.e8, rook_to=Square.d8, rook_frm=Square.a8),
+            Move(to=Square.b8, frm=Square.b8, promotion_to=Piece.Q),
+            Move(to=Square.b1, frm=Square.b1, promotion_to=Piece.n),
+            Move(to=Square.b1, frm=Square.b2, resignation=True),
+        ]
+
+    def test_round_trip(self):
+        """Test moves come back the same after encoding and decoding"""
+        for move in self.moves:
+            self.assertEqual(move, decode_move(encode_move(move)))
+
+    def test_fits_in_16_bits(self):
+        """Test packed moves fit in an array('H')"""
+        codes: array = array('H', (encode_move(move) for move in self.moves))
+        self.assertEqual(self.moves, [decode_move(code) for code in codes])
+
+    def test_fields(self):
+        """Test frm, to and flag come back out of a packed move"""
+        code: int = encode_move(Move(to=Square.e4, frm=Square.e2))
+        self.assertEqual(Square.e2.index, move_frm(code))
+        self.assertEqual(Square.e4.index, move_to(code))
+        self.assertEqual(MOVE_QUIET, move_flag(code))
+
+        self.assertEqual(MOVE_CASTLE, move_flag(encode_move(self.moves[2])))
+        self.assertTrue(MOVE_PROMOTION & move_flag(encode_move(self.moves[4])))
+
+    def test_en_passant(self):
+        """Test en passant flag is set when asked, and dropped when decoded"""
+        move: Move = Move(to=Square.d6, frm=Square.e5)
+        code: int = encode_move(move, en_passant=True)
+        self.assertEqual(pack_move(Square.e5.index, Square.d6.index, MOVE_EN_PASSANT), code)
+        self.assertEqual(move, decode_move(code))
@@ -0,0 +1,147 @@
+"""
+test_rollout_board.py
+Tests for boards changed in place with push and pop.
+"""
+import random
+from typing import List
+from unittest import TestCase
+
+from fog_of_war.fog_of_war_chess import FOWChess
+from fog_of_war.mailbox import new_mailbox
+from fog_of_war.move import Move, encode_move, pack_move, MOVE_PROMOTION
+from fog_of_war.rollout_board import RolloutBoard
+from fog_of_war.square import Square
+
+
+class TestRolloutBoard(TestCase):
+    """RolloutBoard tests"""
+
+    def setUp(self) -> None:
+        """Set up"""
+        # Has a double step, en passant, a capture and castling
+        self.moves: List[Move] = [
+            Move(frm=Square.e2, to=Square.e4),
+            Move(frm=Square.a7, to=Square.a6),
+            Move(frm=Square.e4, to=Square.e5),
+            Move(frm=Square.d7, to=Square.d5),
+            Move(frm=Square.e5, to=Square.d6),
+            Move(frm=Square.c7, to=Square.d6),
+            Move(frm=Square.g1, to=Square.f3),
+            Move(frm=Square.a6, to=Square.a5),
+            Move(frm=Square.f1, to=Square.c4),
+            Move(frm=Square.a5, to=Square.a4),
+            Move(frm=Square.e1, to=Square.g1, rook_frm=Square.h1, rook_to=Square.f1),
+        ]
+
+    def assert_same_position(self, game: FOWChess, board: RolloutBoard) -> None:
+        """board is in game's position"""
+        self.assertEqual(game, board.to_fow())
+        self.assertEqual(game.mailbox, board.mailbox)
+        self.assertEqual(game.possible_move_codes, board.possible_move_codes)
+        for color in (True, False):
+            self.assertEqual(game._visible_squares(color), board.visible_squares(color))
+
+    def test_push_matches_fow(self):
+        """Test pushing moves gives the same positions as FOWChess.make_move"""
+        game: FOWChess = FOWChess.new_game()
+        board: RolloutBoard = RolloutBoard.from_fow(game)
+        for move in self.moves:
+            game = game.make_move(move)
+            board.push(move)
+            self.assert_same_position(game, board)
+        self.assertEqual(len(self.moves), len(board))
+
+    def test_pop(self):
+        """Test popping every move returns to each earlier position"""
+        games: List[FOWChess] = [FOWChess.new_game()]
+        board: RolloutBoard = RolloutBoard.from_fow(games[0])
+        for move in self.moves:
+            games.append(games[-1].make_move(move))
+            board.push(move)
+        for move in reversed(self.moves):
+            games.pop()
+            self.assertEqual(encode_move(move), board.pop())
+            self.assert_same_position(games[-1], board)
+        self.assertRaises(IndexError, board.pop)
+
+    def test_promotion(self):
+        """Test a promotion can be pushed and popped"""
+        game: FOWChess = FOWChess.new_game()
+        board: RolloutBoard = RolloutBoard.from_fow(game)
+        promotion: int = pack_move(Square.a2.index, Square.a2.index, MOVE_PROMOTION | 3)
+        board.push(promotion)
+        self.assert_same_position(game.make_move(promotion), board)
+        board.pop()
+        self.assert_same_position(game, board)
+
+    def test_random_games(self):
+        """Test random games played on a board agree with FOWChess and undo back to the start"""
+        random.seed(21)
+        for _ in range(3):
+            start: FOWChess = FOWChess.new_game()
+            game: FOWChess = start
+            board: RolloutBoard = RolloutBoard.from_fow(start)
+            while not board.is_over and board.half_move_counter < 150:
+                code: int = random.choice(board.possible_move_codes)
+                board.push(code)
+                game = game.make_move(code)
+                self.assertEqual(game, board.to_fow())
+                self.assertEqual(new_mailbox(game.bitboards), board.mailbox)
+            self.assertEqual(game.is_over, board.is_over)
+            self.assertEqual(game.winner, board.winner)
+            while len(board):
+                board.pop()
+            self.assert_same_position(start, board)
+
+    def test_push_unrecorded(self):
+        """Test pushes without undo give the same positions, and can't be popped"""
+        random.seed(2021)
+        game: FOWChess = FOWChess.new_game()
+        board: RolloutBoard = RolloutBoard.from_fow(game)
+        board.push(self.moves[0])
+        game = game.make_move(self.moves[0])
+        while not board.is_over and board.half_move_counter < 150:
+            code: int = random.choice(board.possible_move_codes)
+            board.push(code, record=False)
+            game = game.make_move(code)
+            self.assertEqual(game, board.to_fow())
+            self.assertEqual((game.halfmove_clock, game.repetitions), (board.halfmove_clock, board.repetitions))
+        self.assert_same_position(game, board)
+        self.assertEqual(0, len(board))
+        self.assertRaises(IndexError, board.pop)
+
+    def test_draws(self):
+        """Test the halfmove clock and repetitions match FOWChess, through pushes and pops"""
+        shuffle = [Move(frm=Square.g1, to=Square.f3), Move(frm=Square.g8, to=Square.f6),
+                   Move(frm=Square.f3, to=Square.g1), Move(frm=Square.f6, to=Square.g8)]
+        game: FOWChess = FOWChess.new_game().make_move(Move(frm=Square.e2, to=Square.e3))
+        board: RolloutBoard = RolloutBoard.from_fow(game.make_move(shuffle[0]))
+        game = game.make_move(shuffle[0])
+        for move in shuffle[1:] + shuffle:
+            game = game.make_move(move)
+            board.push(move)
+            self.assertEqual(game, board.to_fow())
+            self.assertEqual((game.halfmove_clock, game.repetitions, game.is_over),
+                             (board.halfmove_clock, board.repetitions, board.is_over))
+        self.assertTrue(board.is_draw)
+        self.assertEqual(game.repetitions, board.to_fow().repetitions)
+        board.pop()
+        self.assertFalse(board.is_over)
+        board.push(Move(frm=Square.d7, to=Square.d5))
+        self.assertEqual((0, 0), (board.halfmove_clock, board.repetitions))
+        board.pop()
+        self.assertEqual(7, board.halfmove_clock)
+
+    def test_random_move_policies(self):
+        """Test random games with capture_king and sample_one end when a king is attacked, and undo"""
+        random.seed(25)
+        start: FOWChess = FOWChess.new_game()
+        board: RolloutBoard = RolloutBoard.from_fow(start)
+        while not board.is_over:
+            king_attacked: bool = bool(board.attack_map(board.current_turn).union
+                                       & board.bitboards[7] & board.bitboards[not board.current_turn])
+            board.push_random_move(capture_king=True, sample_one=True)
+            self.assertEqual(king_attacked, board.is_over and board.winner is not None)
+        while len(board):
+            board.pop()
+        self.assert_same_position(start, board)
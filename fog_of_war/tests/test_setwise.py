@@ -0,0 +1,55 @@
+"""
+test_setwise.py
+Tests for set-wise bitboard operations on NumPy arrays.
+"""
+from random import Random
+from unittest import TestCase
+
+import numpy as np
+
+from fog_of_war import setwise as sw
+from fog_of_war.attack_masks import KNIGHT_ATTACKS, KING_ATTACKS, PAWN_ATTACKS
+from fog_of_war.magic_numbers import rook_attacks, bishop_attacks
+
+
+class TestSetwise(TestCase):
+    """Set-wise operation tests"""
+
+    def setUp(self) -> None:
+        """Set up"""
+        rng: Random = Random(0)
+        self.occupancies = [rng.getrandbits(64) & rng.getrandbits(64) for _ in range(64)]
+        self.squares = np.arange(64)
+
+    def test_popcount(self):
+        """Test bit counts match bin().count"""
+        bitboards = np.array(self.occupancies, dtype=np.uint64)
+        self.assertEqual([bin(occupancy).count("1") for occupancy in self.occupancies],
+                         sw.popcount(bitboards).tolist())
+
+    def test_select_bit(self):
+        """Test the k-th set bit is found for every k"""
+        occupancy: int = self.occupancies[0] | 1 << 63
+        indices = [index for index in range(64) if occupancy >> index & 1]
+        bitboards = np.full(len(indices), occupancy, dtype=np.uint64)
+        self.assertEqual(indices, sw.select_bit(bitboards, np.arange(len(indices))).tolist())
+        self.assertEqual(indices[0], sw.lowest_bit_index(bitboards[:1])[0])
+
+    def test_slides_match_magics(self):
+        """Test a slider's fills on each square match the magic bitboard attacks"""
+        pieces = sw.bit_masks(self.squares)
+        empty = ~np.array(self.occupancies, dtype=np.uint64) | pieces
+        rooks = sw.slider_attacks(pieces, np.zeros_like(pieces), empty)
+        bishops = sw.slider_attacks(np.zeros_like(pieces), pieces, empty)
+        for index, occupancy in enumerate(self.occupancies):
+            occupied: int = occupancy & ~(1 << index)
+            self.assertEqual(rook_attacks(index, occupied), int(rooks[index]))
+            self.assertEqual(bishop_attacks(index, occupied), int(bishops[index]))
+
+    def test_steps_match_tables(self):
+        """Test knight, king and pawn attacks on each square match the attack tables"""
+        pieces = sw.bit_masks(self.squares)
+        self.assertEqual(list(KNIGHT_ATTACKS), sw.knight_attacks(pieces).tolist())
+        self.assertEqual(list(KING_ATTACKS), sw.king_attacks(pieces).tolist())
+        self.assertEqual(list(PAWN_ATTACKS[True]), sw.pawn_attacks(pieces, True).tolist())
+        self.assertEqual(list(PAWN_ATTACKS[False]), sw.pawn_attacks(pieces, False).tolist())
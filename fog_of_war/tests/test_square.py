@@ -9,7 +9,13 @@ Last Modified: 2022/02/23
 """
 from typing import List
 from unittest import TestCase
-from fog_of_war.square import Square
+from fog_of_war.square import Square, \
+    SQUARES, \
+    SQUARE_RANKS, \
+    SQUARE_FILES, \
+    SQUARE_MASKS, \
+    square_index, \
+    square_distance
 
 
 class TestSquare(TestCase):
@@ -36,3 +42,21 @@ class TestSquare(TestCase):
     def test_files(self):
         """Test that all squares have the expected file"""
         self.assertEqual(self.sqrs_as_files, [i.file for i in Square])
+
+    def test_index(self):
+        """Test bit index is one less than value, and SQUARES goes back to the square"""
+        self.assertEqual(list(range(64)), [i.index for i in Square])
+        self.assertEqual(list(Square), [SQUARES[i.index] for i in Square])
+
+    def test_int_tables(self):
+        """Test that plain int rank/file/mask tables agree with Square"""
+        self.assertEqual(self.sqrs_as_ranks, list(SQUARE_RANKS))
+        self.assertEqual(self.sqrs_as_files, list(SQUARE_FILES))
+        self.assertEqual(1 << 63, SQUARE_MASKS[Square.h8.index])
+        self.assertEqual(Square.c2.index, square_index(2, 3))
+
+    def test_square_distance(self):
+        """Test distance between bit indices is the greater of rank and file difference"""
+        self.assertEqual(7, square_distance(Square.a1.index, Square.h8.index))
+        self.assertEqual(2, square_distance(Square.e4.index, Square.f6.index))
+        self.assertEqual(0, square_distance(Square.e4.index, Square.e4.index))
@@ -0,0 +1,133 @@
+"""
+test_zobrist.py
+Tests for Zobrist hashing of FOWChess positions.
+"""
+import random
+from typing import List
+from unittest import TestCase
+
+from fog_of_war.chess_bitboards import ChessBitboards
+from fog_of_war.fog_of_war_chess import FOWChess
+from fog_of_war.bitboard import Bitboard
+from fog_of_war.move import Move, pack_move, MOVE_PROMOTION, MOVE_PROMOTION_BLACK
+from fog_of_war.special_move_bitboards import SpecialMoveBitboards
+from fog_of_war.square import Square
+from fog_of_war.zobrist import zobrist_hash, \
+    PIECE_KEYS, \
+    CASTLING_KEYS, \
+    EP_KEYS, \
+    BLACK_TO_MOVE_KEY
+
+
+def full_diff_update(key: int,
+                     old_bitboards: ChessBitboards,
+                     new_bitboards: ChessBitboards,
+                     old_special: SpecialMoveBitboards,
+                     new_special: SpecialMoveBitboards) -> int:
+    """Key after a move found by xoring every square that differs between the positions, as an oracle"""
+    key ^= BLACK_TO_MOVE_KEY
+    for color in (False, True):
+        for piece_keys, old_piece_bb, new_piece_bb in zip(PIECE_KEYS[color], old_bitboards[2:], new_bitboards[2:]):
+            changed: int = (old_bitboards[color] & old_piece_bb) ^ (new_bitboards[color] & new_piece_bb)
+            for index in range(64):
+                if changed >> index & 1:
+                    key ^= piece_keys[index]
+    castling: int = ((old_special.castling_rooks | old_special.castling_kings)
+                     ^ (new_special.castling_rooks | new_special.castling_kings))
+    ep: int = old_special.ep_bitboard ^ new_special.ep_bitboard
+    for index in range(64):
+        if castling >> index & 1:
+            key ^= CASTLING_KEYS[index]
+        if ep >> index & 1:
+            key ^= EP_KEYS[index]
+    return key
+
+
+class TestZobrist(TestCase):
+    """Zobrist key tests"""
+
+    def setUp(self) -> None:
+        """Set up"""
+        # Has a double step, en passant, a capture and castling
+        self.moves: List[Move] = [
+            Move(frm=Square.e2, to=Square.e4),
+            Move(frm=Square.a7, to=Square.a6),
+            Move(frm=Square.e4, to=Square.e5),
+            Move(frm=Square.d7, to=Square.d5),
+            Move(frm=Square.e5, to=Square.d6),
+            Move(frm=Square.c7, to=Square.d6),
+            Move(frm=Square.g1, to=Square.f3),
+            Move(frm=Square.a6, to=Square.a5),
+            Move(frm=Square.f1, to=Square.c4),
+            Move(frm=Square.a5, to=Square.a4),
+            Move(frm=Square.e1, to=Square.g1, rook_frm=Square.h1, rook_to=Square.f1),
+        ]
+
+    def test_incremental_matches_full(self):
+        """Test keys updated move by move match keys computed from scratch"""
+        game: FOWChess = FOWChess.new_game()
+        for move in self.moves:
+            game = game.make_move(move)
+            self.assertEqual(zobrist_hash(game.bitboards, game.special_moves, game.current_turn),
+                             game.zobrist_key)
+
+    def test_matches_full_diff(self):
+        """Test keys updated from the move match the key change found from every changed square"""
+        random.seed(6)
+        for _ in range(5):
+            game: FOWChess = FOWChess.new_game()
+            while not game.is_over and game.half_move_counter < 150:
+                child: FOWChess = game.make_move(random.choice(game.possible_move_codes))
+                self.assert_update_matches(game, child)
+                game = child
+
+    def test_promotion(self):
+        """Test keys of promotions, where the pawn is replaced in place"""
+        pawns: Bitboard = Bitboard.from_square(Square.a8) | Bitboard.from_square(Square.h1)
+        kings: Bitboard = Bitboard.from_square(Square.e1) | Bitboard.from_square(Square.e8)
+        game: FOWChess = FOWChess(
+            bitboards=ChessBitboards(black=Bitboard.from_square(Square.h1) | Bitboard.from_square(Square.e8),
+                                     white=Bitboard.from_square(Square.a8) | Bitboard.from_square(Square.e1),
+                                     pawns=pawns, knights=Bitboard(0), bishops=Bitboard(0),
+                                     rooks=Bitboard(0), queens=Bitboard(0), kings=kings),
+            turn=True,
+            special_moves=SpecialMoveBitboards(Bitboard(0), Bitboard(0), Bitboard(0)),
+            half_move=0)
+        for promote in range(4):
+            white: FOWChess = game.make_move(pack_move(Square.a8.index, Square.a8.index,
+                                                       MOVE_PROMOTION | promote))
+            self.assert_update_matches(game, white)
+            self.assert_update_matches(white, white.make_move(
+                pack_move(Square.h1.index, Square.h1.index, MOVE_PROMOTION | MOVE_PROMOTION_BLACK | promote)))
+
+    def assert_update_matches(self, game: FOWChess, child: FOWChess) -> None:
+        """child's key matches the full diff oracle and the key computed from scratch"""
+        self.assertEqual(full_diff_update(game.zobrist_key, game.bitboards, child.bitboards,
+                                          game.special_moves, child.special_moves),
+                         child.zobrist_key)
+        self.assertEqual(zobrist_hash(child.bitboards, child.special_moves, child.current_turn),
+                         child.zobrist_key)
+
+    def test_transposition(self):
+        """Test the same position reached by different move orders has the same key"""
+        knights_first: FOWChess = (FOWChess.new_game()
+                                   .make_move(Move(frm=Square.g1, to=Square.f3))
+                                   .make_move(Move(frm=Square.g8, to=Square.f6))
+                                   .make_move(Move(frm=Square.b1, to=Square.c3)))
+        knights_second: FOWChess = (FOWChess.new_game()
+                                    .make_move(Move(frm=Square.b1, to=Square.c3))
+                                    .make_move(Move(frm=Square.g8, to=Square.f6))
+                                    .make_move(Move(frm=Square.g1, to=Square.f3)))
+        self.assertEqual(knights_first.zobrist_key, knights_second.zobrist_key)
+        self.assertEqual(hash(knights_first), hash(knights_second))
+        self.assertTrue(knights_first == knights_second)
+
+    def test_side_to_move(self):
+        """Test the same pieces with a different player to move have different keys"""
+        game: FOWChess = FOWChess.new_game()
+        black_to_move: FOWChess = FOWChess(bitboards=game.bitboards,
+                                           turn=False,
+                                           special_moves=game.special_moves,
+                                           half_move=0)
+        self.assertNotEqual(game.zobrist_key, black_to_move.zobrist_key)
+        self.assertFalse(game == black_to_move)
@@ -0,0 +1,102 @@
+"""
+zobrist.py
+Zobrist keys for hashing chess positions.
+
+A position's key is the xor of a random 64 bit key for every (color, piece, square),
+castling right and en passant square in it, and a key for black being the one to move.
+Making a move only has to xor in the keys of what changed, found from the move and a mailbox.
+"""
+from __future__ import annotations
+
+from array import array
+from random import Random
+from typing import Sequence, Tuple
+
+from fog_of_war.chess_bitboards import ChessBitboards
+from fog_of_war.move import castling_rook_squares, \
+    MOVE_CASTLE, \
+    MOVE_EN_PASSANT, \
+    MOVE_PROMOTION, \
+    MOVE_PROMOTION_BLACK
+from fog_of_war.special_move_bitboards import SpecialMoveBitboards
+from fog_of_war.helper_functions import scan_indices
+
+_rng: Random = Random(0x2022_0226)
+
+# PIECE_KEYS[color][piece bitboard][bit index]
+# color False/0 is black and True/1 is white,
+# piece bitboard is the position in ChessBitboards minus 2 (pawns 0, ..., kings 5)
+PIECE_KEYS: Tuple[Tuple[Tuple[int, ...], ...], ...] = tuple(
+    tuple(tuple(_rng.getrandbits(64) for _ in range(64)) for _ in range(6)) for _ in range(2))
+# Castling rooks and kings start on different squares, so they can share keys
+CASTLING_KEYS: Tuple[int, ...] = tuple(_rng.getrandbits(64) for _ in range(64))
+EP_KEYS: Tuple[int, ...] = tuple(_rng.getrandbits(64) for _ in range(64))
+BLACK_TO_MOVE_KEY: int = _rng.getrandbits(64)
+
+
+def zobrist_hash(bitboards: ChessBitboards, special_moves: SpecialMoveBitboards, turn: bool) -> int:
+    """Key of a whole position, computed from scratch"""
+    key: int = 0 if turn else BLACK_TO_MOVE_KEY
+    for color, color_bb in ((False, bitboards.black), (True, bitboards.white)):
+        for piece_keys, piece_bb in zip(PIECE_KEYS[color], bitboards[2:]):
+            for index in scan_indices(color_bb & piece_bb):
+                key ^= piece_keys[index]
+    for index in scan_indices(special_moves.castling_rooks | special_moves.castling_kings):
+        key ^= CASTLING_KEYS[index]
+    for index in scan_indices(special_moves.ep_bitboard):
+        key ^= EP_KEYS[index]
+    return key
+
+
+def zobrist_update(key: int,
+                   code: int,
+                   mailbox: array,
+                   old_special: SpecialMoveBitboards | Sequence[int],
+                   new_special: SpecialMoveBitboards | Sequence[int]) -> int:
+    """
+    Key of the position after a packed move, from the key before it. Flips the side to move.
+    mailbox (see mailbox.py) is from before the move, it gives the types of the moved, captured
+    and castling pieces, so only the 2-4 squares the move changes are xored in or out.
+    Special moves can also be plain sequences of ints, in SpecialMoveBitboards order.
+    """
+    # move_frm, move_to and move_flag inlined, this runs for every move made
+    frm: int = code & 0x3F
+    to: int = (code >> 6) & 0x3F
+    flag: int = code >> 12
+    key ^= BLACK_TO_MOVE_KEY
+
+    piece: int = mailbox[frm]
+    if piece:
+        key ^= PIECE_KEYS[piece > 0][abs(piece) - 1][frm]
+    if flag & MOVE_PROMOTION:
+        # Pawn is replaced in place by the promoted piece
+        key ^= PIECE_KEYS[not flag & MOVE_PROMOTION_BLACK][(flag & 0b11) + 1][to]
+    else:
+        captured: int = to
+        if flag == MOVE_CASTLE:
+            rook_frm, rook_to = castling_rook_squares(to)
+            if rook := mailbox[rook_frm]:
+                rook_keys: Tuple[int, ...] = PIECE_KEYS[rook > 0][abs(rook) - 1]
+                key ^= rook_keys[rook_frm] ^ rook_keys[rook_to]
+        elif flag == MOVE_EN_PASSANT or (abs(piece) == 1 and (frm - to) % 8 and not mailbox[to]):
+            # A pawn changing file onto an empty square is en passant.
+            # The captured pawn is on frm's rank and to's file.
+            captured = (frm & ~7) | (to & 7)
+        if captured_piece := mailbox[captured]:
+            key ^= PIECE_KEYS[captured_piece > 0][abs(captured_piece) - 1][captured]
+        if piece:
+            key ^= PIECE_KEYS[piece > 0][abs(piece) - 1][to]
+
+    changed: int = (old_special[0] | old_special[1]) ^ (new_special[0] | new_special[1])
+    # Bit scan inlined, castling rights and ep squares change on few moves
+    while changed:
+        lowest_bit: int = changed & -changed
+        key ^= CASTLING_KEYS[lowest_bit.bit_length() - 1]
+        changed ^= lowest_bit
+
+    changed = old_special[2] ^ new_special[2]
+    while changed:
+        lowest_bit = changed & -changed
+        key ^= EP_KEYS[lowest_bit.bit_length() - 1]
+        changed ^= lowest_bit
+    return key
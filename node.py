@@ -1,37 +1,127 @@
 from __future__ import annotations
 
-from typing import List
+from array import array
+import random
+from typing import List, Protocol, Sequence, Tuple, TYPE_CHECKING
+
+import numpy as np
 
 from fog_of_war import move as mv, fog_of_war_chess as fow
 
+if TYPE_CHECKING:
+    from transposition_table import TranspositionTable
+
+
+class TreeNode(Protocol):
+    """
+    What tree search needs from a node, so it can run on either tree store:
+    Node (one object per node) or array_tree.ArrayNode (a handle into an ArrayTree).
+    """
+    game: fow.FOWChess
+    depth: int
+    visited: bool
+    visits: int
+    score: float
+
+    @property
+    def children(self) -> Sequence[TreeNode]: ...
+
+    @property
+    def child_moves(self) -> Sequence[int]: ...  # packed move reaching each child from this node
+
+    def child(self, index: int) -> TreeNode: ...
+
+    def child_stats(self) -> Tuple[np.ndarray, np.ndarray]: ...
+
+    def populate(self) -> None: ...
+
+    def has_untried(self) -> bool: ...
+
+    def expand_untried(self, transposition_table: TranspositionTable | None = None) -> TreeNode: ...
+
+    def update_score(self, score_change: float) -> None: ...
+
+    def add_virtual_loss(self, loss: float, count: int = 1) -> None: ...
+
 
 class Node:
     """
     Tree node containg a game state, connected nodes are immediately reachable
     game states.
     """
-    def __init__(self, game:fow.FOWChess, depth:int, move:mv.Move) -> None:
+    def __init__(self, game:fow.FOWChess, depth:int, move:mv.Move | int | None) -> None:
         self.game: fow.FOWChess = game
         self.depth: int = depth
-        self.move: mv.Move = move
+        self.move: mv.Move | int | None = move  # packed move (see move.encode_move) for children
 
         self.visited: bool = False
 
-        self.possible_moves: List[mv.Move] = []
+        self.possible_moves: array = array('H')  # packed moves
+        # Children are only made when first selected, children[i] is reached by child_moves[i]
         self.children: List[Node] = []
-        self._unvisited_list: List[Node] = []
+        self.child_moves: List[int] = []
+        # Indices into possible_moves without a child yet, shuffled once so the last is a random one
+        self._unvisited_list: List[int] = []
 
         #Node stats for UCB calculation
         self.visits: int = 0
-        self.score: int = 0
+        self.score: float = 0
 
     def populate(self) -> None:
+        """
+        Find the possible moves, without making any children.
+        Children are made one at a time by expand.
+        """
         self.visited = True
-        self.possible_moves = self.game._possible_move_generator()
-        self.children = [Node(self.game.make_move(move), self.depth+1, move) for move in self.possible_moves]
-        self._unvisited_list = self.children.copy()
+        self.possible_moves = self.game.possible_move_codes
+        self._unvisited_list = random.sample(range(len(self.possible_moves)), len(self.possible_moves))
+
+    def expand(self, move_index: int, transposition_table: TranspositionTable | None = None) -> Node:
+        """
+        Make the child reached by possible_moves[move_index].
+        With a transposition table, a child already reached by another path is shared,
+        so its move may not be the one that reaches it from this node (see child_moves).
+        """
+        unvisited: List[int] = self._unvisited_list
+        if unvisited and unvisited[-1] == move_index:
+            unvisited.pop()
+        elif move_index in unvisited:
+            unvisited.remove(move_index)
+        move: int = self.possible_moves[move_index]
+        if transposition_table is None:
+            child: Node = Node(self.game.make_move(move), self.depth+1, move)
+        else:
+            child = transposition_table.get_or_create(self.game.make_move(move), self.depth+1, move)
+        self.children.append(child)
+        self.child_moves.append(move)
+        return child
+
+    def child(self, index: int) -> Node:
+        return self.children[index]
+
+    def child_stats(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Visits and scores of the children, as arrays in children order"""
+        count: int = len(self.children)
+        return (np.fromiter((child.visits for child in self.children), dtype=np.float64, count=count),
+                np.fromiter((child.score for child in self.children), dtype=np.float64, count=count))
+
+    def has_untried(self) -> bool:
+        """True if some possible move has no child yet"""
+        return bool(self._unvisited_list)
+
+    def expand_untried(self, transposition_table: TranspositionTable | None = None) -> Node:
+        """Expand a random move that has no child yet, the last of the shuffled untried moves"""
+        return self.expand(self._unvisited_list[-1], transposition_table)
+
+    def add_virtual_loss(self, loss: float, count: int = 1) -> None:
+        """
+        Count count visits that each lost loss, while they're in progress.
+        Removed again with a negative count.
+        """
+        self.visits += count
+        self.score -= loss * count
 
-    def update_score(self, score_change:int) -> None:
+    def update_score(self, score_change:float) -> None:
         """
         Backpropogate outcome up path.
         If outcome matches the turn, increase. Else decrease.
@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+import multiprocessing as mp
+import os
+import random
+from typing import Any, Dict, Iterable, NamedTuple, Optional, Type
+
+from abstract_tree_seach import AbstractTreeSearch
+from fog_of_war.fog_of_war_chess import FOWChess
+from node import TreeNode
+
+
+class MoveStats(NamedTuple):
+    """Merged stats of the root child reached by a move"""
+    visits: int
+    score: float
+
+
+# The search each worker process runs, made once by _init_worker so it stays warm between calls
+_worker_search: Optional[AbstractTreeSearch] = None
+
+
+def _init_worker(search_class: Type[AbstractTreeSearch], search_kwargs: Dict[str, Any]) -> None:
+    global _worker_search
+    _worker_search = search_class(**search_kwargs)
+
+
+def root_move_stats(root: TreeNode) -> Dict[int, MoveStats]:
+    """Stats of root's children, keyed by the packed move reaching them"""
+    visits, scores = root.child_stats()
+    return {move: MoveStats(int(child_visits), float(score))
+            for move, child_visits, score in zip(root.child_moves, visits, scores)}
+
+
+def merge_move_stats(worker_stats: Iterable[Dict[int, MoveStats]]) -> Dict[int, MoveStats]:
+    """Sum of each move's visits and score over the workers' root_move_stats"""
+    merged: Dict[int, MoveStats] = {}
+    for stats in worker_stats:
+        for move, (visits, score) in stats.items():
+            old: MoveStats = merged.get(move, MoveStats(0, 0.0))
+            merged[move] = MoveStats(old.visits + visits, old.score + score)
+    return merged
+
+
+def _search_root(game: FOWChess, simulations: int, seed: int) -> Dict[int, MoveStats]:
+    """Search game in a worker"""
+    random.seed(seed)
+    return root_move_stats(_worker_search.simulate(game, simulations))
+
+
+class RootParallelSearch:
+    """
+    Root parallel MCTS. Each worker process searches its own tree from the same game
+    with its own seed, then the stats of the roots' children are merged by move.
+
+    The worker processes are started once and reused for every search, call close()
+    (or use as a context manager) to stop them.
+    search_class must be importable by the workers (defined at module level),
+    it's made in every worker with search_kwargs.
+    """
+    def __init__(self,
+                 search_class: Type[AbstractTreeSearch],
+                 workers: int | None = None,
+                 search_kwargs: Dict[str, Any] | None = None,
+                 seed: int | None = None,
+                 start_method: str | None = None) -> None:
+        self.workers: int = workers or os.cpu_count() or 1
+        # Seeds for each search's workers, seeded so a whole run can be repeated
+        self._seeds: random.Random = random.Random(seed)
+        context = mp.get_context(start_method)
+        self._pool = context.Pool(self.workers,
+                                  initializer=_init_worker,
+                                  initargs=(search_class, search_kwargs or {}))
+
+    def __enter__(self) -> RootParallelSearch:
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Stop the worker processes"""
+        self._pool.terminate()
+        self._pool.join()
+
+    def search(self, game: FOWChess, simulations_per_worker: int = 200) -> Dict[int, MoveStats]:
+        """
+        Run simulations_per_worker simulations from game in every worker.
+        Returns the root children's visits and score summed over workers, keyed by packed move.
+        """
+        tasks = [(game, simulations_per_worker, self._seeds.getrandbits(64))
+                 for _ in range(self.workers)]
+        return merge_move_stats(self._pool.starmap(_search_root, tasks))
+
+    def best_move(self, game: FOWChess, simulations_per_worker: int = 200) -> int:
+        """Packed move with the most merged visits"""
+        merged: Dict[int, MoveStats] = self.search(game, simulations_per_worker)
+        return max(merged, key=lambda move: merged[move].visits)
@@ -0,0 +1,31 @@
+"""
+random_search.py
+A concrete tree search for the search tests, with plain random rollouts.
+At module level so worker processes (root_parallel, tree_parallel, ProcessPoolExecutor) can import it.
+"""
+from __future__ import annotations
+
+from abstract_tree_seach import AbstractTreeSearch
+from fog_of_war.fog_of_war_chess import FOWChess
+from node import TreeNode
+
+
+class RandomSearch(AbstractTreeSearch):
+    """Searches with random rollouts cut off at max_depth, white wins score 1 and black wins -1"""
+    max_depth: int = 40
+
+    def is_terminal_state(self, state: FOWChess, depth: int) -> bool:
+        return state.is_over or depth >= self.max_depth
+
+    def terminal_state_value(self, state: FOWChess, depth: int) -> int:
+        winner: bool | None = state.winner
+        return 0 if winner is None else 1 if winner else -1
+
+    def update_node_score(self, node: TreeNode, result: float) -> None:
+        node.update_score(result)
+
+    def simulate(self, game: FOWChess, simulations: int = 200) -> TreeNode:
+        root: TreeNode = self.new_root(game)
+        for _ in range(simulations):
+            self.mcts(root)
+        return root
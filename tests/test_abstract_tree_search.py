@@ -0,0 +1,149 @@
+"""
+test_abstract_tree_search.py
+Tests for AbstractTreeSearch's selection, simulation and rollouts.
+"""
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from math import inf, log, sqrt
+import random
+import sys
+from typing import List, Tuple
+from unittest import TestCase
+
+from fog_of_war.fog_of_war_chess import FOWChess
+from node import Node, TreeNode
+from root_parallel import root_move_stats
+from tests.random_search import RandomSearch
+from transposition_table import TranspositionTable
+
+
+def make_node(visits: int, child_stats: List[Tuple[int, float]]) -> Node:
+    """Node with visits and children with the given (visits, score)"""
+    game: FOWChess = FOWChess.new_game()
+    node: Node = Node(game, 0, None)
+    node.visits = visits
+    for code, (child_visits, score) in zip(game.possible_move_codes, child_stats):
+        child: Node = Node(game.make_move(code), 1, code)
+        child.visits, child.score = child_visits, score
+        node.children.append(child)
+        node.child_moves.append(code)
+    return node
+
+
+def scalar_ucb(node: Node, c_const: float = 1.41) -> Node:
+    """The UCB formula one child at a time, first child wins ties, unvisited children first"""
+    best, best_value = None, -inf
+    for child in node.children:
+        value: float = (inf if not child.visits
+                        else child.score / child.visits + c_const * sqrt(log(node.visits) / child.visits))
+        if value > best_value:
+            best, best_value = child, value
+    return best
+
+
+class RecursiveSearch(RandomSearch):
+    """RandomSearch with mcts as it was before it was made iterative"""
+
+    def mcts(self, node: TreeNode, depth: int = 0) -> float:
+        if self.is_terminal_state(node.game, depth):
+            result: float = self.terminal_state_value(node.game, depth)
+        elif not node.visited:
+            self.populate_node(node)
+            result = self.rollout(node, depth)
+        else:
+            result = self.mcts(self.best_child(node), depth + 1)
+        self.update_node_score(node, result)
+        return result
+
+
+class TestAbstractTreeSearch(TestCase):
+    """AbstractTreeSearch tests"""
+
+    def setUp(self) -> None:
+        """Set up"""
+        self.search: RandomSearch = RandomSearch()
+
+    def test_ucb(self):
+        """Test the vectorised UCB picks the same child as the formula one child at a time"""
+        for visits, child_stats in ((10, [(3, 1.0), (3, 2.0), (4, -1.0)]),
+                                    (100, [(90, 60.0), (5, 1.0), (5, 4.0)]),
+                                    (7, [(2, 0.5), (2, 0.5), (3, 1.5)]),
+                                    (30, [(1, -1.0), (20, 15.0), (9, 2.0), (0, 0.0)])):
+            node: Node = make_node(visits, child_stats)
+            self.assertIs(scalar_ucb(node), self.search.ucb(node))
+            self.assertIs(scalar_ucb(node, 0.1), self.search.ucb(node, 0.1))
+
+    def test_ucb_unvisited_and_empty(self):
+        """Test children without visits are picked first, and a node without children raises"""
+        node: Node = make_node(0, [(0, 0.0), (0, 0.0)])
+        self.assertIs(node.children[0], self.search.ucb(node))
+        node = make_node(5, [(5, 5.0), (0, 0.0)])
+        self.assertIs(node.children[1], self.search.ucb(node))
+        self.assertRaises(ValueError, self.search.ucb, make_node(5, []))
+
+    def test_mcts_matches_recursive(self):
+        """Test iterative simulations back up the same results and visits as recursive ones"""
+        trees = []
+        for search in (self.search, RecursiveSearch()):
+            # Captured kings, so results aren't all draws
+            search.rollout_capture_king = True
+            random.seed(11)
+            root: Node = search.new_root(FOWChess.new_game())
+            results: List[float] = [search.mcts(root) for _ in range(60)]
+            trees.append((results, root.visits, root.score, root_move_stats(root)))
+        self.assertEqual(*trees)
+        self.assertTrue(any(trees[0][0]))
+        self.assertEqual([], self.search._local.path)
+
+    def test_mcts_deep_path(self):
+        """Test a simulation down a path deeper than the recursion limit, and that it isn't kept"""
+        game: FOWChess = FOWChess.new_game()
+        code: int = game.possible_move_codes[0]
+        length: int = sys.getrecursionlimit() + 100
+        chain: List[Node] = [Node(game, depth, code) for depth in range(length)]
+        for node, child in zip(chain, chain[1:]):
+            node.visited = True
+            node.visits = 1
+            node.children.append(child)
+            node.child_moves.append(code)
+        self.search.max_depth = length + 2
+        self.search.mcts(chain[0])
+        self.assertEqual([2] * (length - 1) + [1], [node.visits for node in chain])
+        self.assertTrue(chain[-1].visited)
+        self.assertEqual([], self.search._local.path)
+
+    def test_batch_rollout(self):
+        """Test a leaf backs up the mean of rollouts_per_leaf rollouts, once per simulation"""
+        results: List[int] = []
+
+        class RecordingSearch(RandomSearch):
+            def rollout(self, node: TreeNode, depth: int) -> int:
+                results.append(super().rollout(node, depth))
+                return results[-1]
+
+        random.seed(14)
+        search: RecordingSearch = RecordingSearch(rollouts_per_leaf=5, rollout_capture_king=True)
+        root: Node = search.new_root(FOWChess.new_game())
+        search.mcts(root)
+        self.assertEqual(5, len(results))
+        self.assertEqual((1, sum(results) / 5), (root.visits, root.score))
+        for simulations in range(2, 6):
+            search.mcts(root)
+            self.assertEqual(simulations, root.visits)
+            self.assertEqual(5 * simulations, len(results))
+        child: Node = root.children[0]
+        self.assertEqual(1, child.visits)
+        self.assertAlmostEqual(sum(results[5:10]) / 5, child.score)
+
+    def test_rollout_executors(self):
+        """Test rollouts run in thread and process pools, with the search pickled for processes"""
+        for executor in (ThreadPoolExecutor(2), ProcessPoolExecutor(2)):
+            with executor:
+                search: RandomSearch = RandomSearch(rollouts_per_leaf=4, rollout_executor=executor,
+                                                    rollout_capture_king=True,
+                                                    transposition_table=TranspositionTable())
+                root: Node = search.simulate(FOWChess.new_game(), 6)
+            self.assertEqual(6, root.visits)
+            self.assertEqual(5, sum(child.visits for child in root.children))
+            # Every backed up result is a mean of 4 results of -1, 0 or 1
+            self.assertEqual(root.score * 4, round(root.score * 4))
+            self.assertLessEqual(abs(root.score), 6)
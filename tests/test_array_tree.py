@@ -0,0 +1,119 @@
+"""
+test_array_tree.py
+Tests for ArrayTree, the struct of arrays tree store, and its ArrayNode handles.
+"""
+import random
+import sys
+from unittest import TestCase
+
+from array_tree import ArrayTree, ArrayNode
+from fog_of_war.fog_of_war_chess import FOWChess
+from fog_of_war.move import Move, encode_move
+from fog_of_war.square import Square
+
+
+class TestArrayTree(TestCase):
+    """ArrayTree tests"""
+
+    def setUp(self) -> None:
+        """Set up"""
+        random.seed(9)
+        self.game: FOWChess = FOWChess.new_game()
+
+    def test_populate_and_expand(self):
+        """Test children are allocated together and expanded one at a time into the possible moves"""
+        tree: ArrayTree = ArrayTree(capacity=4)
+        root: ArrayNode = tree.new_root(self.game)
+        self.assertFalse(root.visited)
+        root.populate()
+        self.assertTrue(root.visited)
+        n_children: int = int(tree.n_children[0])
+        self.assertEqual(len(self.game.possible_move_codes), n_children)
+        self.assertEqual(1 + n_children, len(tree))
+
+        expanded = []
+        while root.has_untried():
+            child: ArrayNode = root.expand_untried()
+            expanded.append(child.index)
+            self.assertLessEqual(tree.n_expanded[0], tree.n_children[0])
+            self.assertEqual(root, child.parent)
+            self.assertEqual(1, child.depth)
+            self.assertEqual(self.game.make_move(child.move), child.game)
+        self.assertEqual(list(range(int(tree.first_child[0]), int(tree.first_child[0]) + n_children)),
+                         expanded)
+        self.assertEqual(tree.n_children[0], tree.n_expanded[0])
+        self.assertEqual(sorted(self.game.possible_move_codes), sorted(root.child_moves))
+        self.assertEqual(expanded, [child.index for child in root.children])
+
+    def test_replay_deep_game(self):
+        """Test a game is replayed from the nearest stored one, down a path deeper than the recursion limit"""
+        shuffle = [encode_move(move) for move in (Move(frm=Square.g1, to=Square.f3),
+                                                  Move(frm=Square.g8, to=Square.f6),
+                                                  Move(frm=Square.f3, to=Square.g1),
+                                                  Move(frm=Square.f6, to=Square.g8))]
+        depth: int = (sys.getrecursionlimit() // 4 + 25) * 4  # Back in the starting position
+        tree: ArrayTree = ArrayTree()
+        tree.new_root(self.game)
+        for node in range(1, depth + 1):
+            tree._allocate(1)
+            tree.parent[node] = node - 1
+            tree.move[node] = shuffle[(node - 1) % 4]
+        tree.games[50] = self.game.make_move(shuffle[0]).make_move(shuffle[1])
+
+        game: FOWChess = tree.game(depth)
+        self.assertEqual(self.game.bitboards, game.bitboards)
+        # Replayed from node 50's game (2 half moves in), storing every game on the way
+        self.assertEqual(2 + depth - 50, game.half_move_counter)
+        self.assertTrue(all(tree.games[node] is not None for node in range(50, depth + 1)))
+        self.assertIsNone(tree.games[49])
+        self.assertEqual(51, tree.games[99].half_move_counter)
+
+        tree.games[0] = None
+        tree.games[depth] = tree.games[1] = None
+        self.assertRaises(ValueError, tree.game, 1)
+
+    def test_max_nodes(self):
+        """Test populate refuses to go past max_nodes, leaving the node unvisited"""
+        tree: ArrayTree = ArrayTree(max_nodes=10)
+        root: ArrayNode = tree.new_root(self.game)
+        self.assertFalse(tree.populate(0))
+        self.assertFalse(root.visited)
+        self.assertFalse(root.has_untried())
+        self.assertEqual(1, len(tree))
+
+        tree = ArrayTree(max_nodes=21)
+        self.assertTrue(tree.populate(tree.new_root(self.game).index))
+        self.assertEqual(21, len(tree))
+        self.assertFalse(tree.populate(tree.expand_next(0)))
+
+    def test_grow(self):
+        """Test growing the arrays keeps the nodes already in them"""
+        tree: ArrayTree = ArrayTree(capacity=2)
+        root: ArrayNode = tree.new_root(self.game)
+        root.populate()
+        child: ArrayNode = root.expand_untried()
+        child.update_score(1.0)
+        child.populate()
+        self.assertGreaterEqual(tree.capacity, len(tree))
+        self.assertEqual(tree.capacity, len(tree.games))
+        self.assertEqual((1, 1.0), (child.visits, child.score))
+        self.assertEqual(0, tree.parent[child.index])
+        self.assertTrue(root.visited and child.visited)
+        self.assertEqual(self.game.make_move(child.move), child.game)
+        for grandchild in range(int(tree.first_child[child.index]), len(tree)):
+            self.assertEqual(child.index, tree.parent[grandchild])
+            self.assertEqual(2, tree.depth[grandchild])
+
+    def test_memory_report(self):
+        """Test the memory report counts nodes, capacity, bytes and stored games"""
+        tree: ArrayTree = ArrayTree(capacity=64, max_nodes=100)
+        root: ArrayNode = tree.new_root(self.game)
+        root.populate()
+        root.expand_untried()
+        report: dict = tree.memory_report()
+        self.assertEqual(21, report["nodes"])
+        self.assertEqual(64, report["capacity"])
+        self.assertEqual(100, report["max_nodes"])
+        self.assertEqual(tree.nbytes, report["array_bytes"])
+        self.assertEqual(tree.nbytes / 64, report["bytes_per_node"])
+        self.assertEqual(2, report["games_stored"])
@@ -0,0 +1,38 @@
+"""
+test_node.py
+Tests for Node, the one object per node tree store.
+"""
+import random
+from unittest import TestCase
+
+from fog_of_war.fog_of_war_chess import FOWChess
+from node import Node
+
+
+class TestNode(TestCase):
+    """Node tests"""
+
+    def test_expand_untried(self):
+        """Test every possible move is expanded once, in a random order"""
+        random.seed(8)
+        orders = []
+        for _ in range(2):
+            node: Node = Node(FOWChess.new_game(), 0, None)
+            node.populate()
+            while node.has_untried():
+                child: Node = node.expand_untried()
+                self.assertEqual(node.game.make_move(child.move), child.game)
+            self.assertEqual(sorted(node.possible_moves), sorted(node.child_moves))
+            orders.append(node.child_moves)
+        self.assertNotEqual(*orders)
+
+    def test_expand(self):
+        """Test expanding a chosen move leaves the rest untried"""
+        node: Node = Node(FOWChess.new_game(), 0, None)
+        node.populate()
+        node.expand(3)
+        self.assertEqual([node.possible_moves[3]], node.child_moves)
+        while node.has_untried():
+            node.expand_untried()
+        self.assertEqual(len(node.possible_moves), len(node.children))
+        self.assertEqual(1, node.child_moves.count(node.possible_moves[3]))
@@ -0,0 +1,44 @@
+"""
+test_root_parallel.py
+Tests for root parallel search, merging the stats of trees searched in worker processes.
+"""
+from typing import Dict
+from unittest import TestCase
+
+from fog_of_war.fog_of_war_chess import FOWChess
+from node import Node
+from root_parallel import MoveStats, RootParallelSearch, merge_move_stats, root_move_stats
+from tests.random_search import RandomSearch
+
+
+class TestRootParallel(TestCase):
+    """Root parallel search tests"""
+
+    def test_root_move_stats(self):
+        """Test root children's stats are keyed by the move reaching them"""
+        root: Node = RandomSearch().simulate(FOWChess.new_game(), 30)
+        stats: Dict[int, MoveStats] = root_move_stats(root)
+        self.assertEqual(set(root.child_moves), set(stats))
+        for move, child in zip(root.child_moves, root.children):
+            self.assertEqual(MoveStats(child.visits, child.score), stats[move])
+
+    def test_merge(self):
+        """Test each move's visits and score are summed over workers, including moves only some tried"""
+        merged: Dict[int, MoveStats] = merge_move_stats([{1: MoveStats(3, 1.5), 2: MoveStats(1, -1.0)},
+                                                         {1: MoveStats(2, -0.5), 3: MoveStats(4, 2.0)},
+                                                         {}])
+        self.assertEqual({1: MoveStats(5, 1.0), 2: MoveStats(1, -1.0), 3: MoveStats(4, 2.0)}, merged)
+
+    def test_seeded_search(self):
+        """Test searches with the same seed give the same merged stats and best move"""
+        game: FOWChess = FOWChess.new_game()
+        runs = []
+        for _ in range(2):
+            with RootParallelSearch(RandomSearch, workers=2, seed=12) as search:
+                stats: Dict[int, MoveStats] = search.search(game, 20)
+                runs.append((stats, search.best_move(game, 20)))
+        self.assertEqual(*runs)
+        stats = runs[0][0]
+        # Each worker's first simulation rolls out from the root itself
+        self.assertEqual(2 * 19, sum(visits for visits, _ in stats.values()))
+        self.assertIn(runs[0][1], game.possible_move_codes)
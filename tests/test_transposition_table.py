@@ -0,0 +1,93 @@
+"""
+test_transposition_table.py
+Tests for the TranspositionTable, sharing nodes between move orders.
+"""
+from typing import List
+from unittest import TestCase
+
+from fog_of_war.fog_of_war_chess import FOWChess
+from fog_of_war.move import Move
+from fog_of_war.square import Square
+from node import Node
+from transposition_table import TranspositionTable
+
+
+class TestTranspositionTable(TestCase):
+    """TranspositionTable tests"""
+
+    def setUp(self) -> None:
+        """Set up"""
+        start: FOWChess = FOWChess.new_game()
+        # 20 different positions, one per first move
+        self.games: List[FOWChess] = [start.make_move(code) for code in start.possible_move_codes]
+
+    def test_transposition(self):
+        """Test one position reached by two move orders gets the same node"""
+        table: TranspositionTable = TranspositionTable()
+        knights_first: FOWChess = (FOWChess.new_game()
+                                   .make_move(Move(frm=Square.g1, to=Square.f3))
+                                   .make_move(Move(frm=Square.g8, to=Square.f6))
+                                   .make_move(Move(frm=Square.b1, to=Square.c3)))
+        knights_second: FOWChess = (FOWChess.new_game()
+                                    .make_move(Move(frm=Square.b1, to=Square.c3))
+                                    .make_move(Move(frm=Square.g8, to=Square.f6))
+                                    .make_move(Move(frm=Square.g1, to=Square.f3)))
+        node: Node = table.get_or_create(knights_first, 3, None)
+        self.assertIs(node, table.get_or_create(knights_second, 3, None))
+        self.assertEqual(1, len(table))
+
+    def test_draw_state(self):
+        """Test move orders to one position with different halfmove clocks share the first one's node"""
+        table: TranspositionTable = TranspositionTable()
+        pawn_last: FOWChess = (FOWChess.new_game()
+                               .make_move(Move(frm=Square.g1, to=Square.f3))
+                               .make_move(Move(frm=Square.g8, to=Square.f6))
+                               .make_move(Move(frm=Square.e2, to=Square.e3)))
+        knight_last: FOWChess = (FOWChess.new_game()
+                                 .make_move(Move(frm=Square.e2, to=Square.e3))
+                                 .make_move(Move(frm=Square.g8, to=Square.f6))
+                                 .make_move(Move(frm=Square.g1, to=Square.f3)))
+        self.assertEqual((0, 2), (pawn_last.halfmove_clock, knight_last.halfmove_clock))
+        self.assertEqual(pawn_last, knight_last)
+        node: Node = table.get_or_create(pawn_last, 3, None)
+        self.assertIs(node, table.get_or_create(knight_last, 3, None))
+        self.assertEqual(0, node.game.halfmove_clock)
+
+    def test_eviction(self):
+        """Test a full table evicts a batch of nodes, lowest priority first, for both replacement policies"""
+        for replacement, expected_evicted in ((TranspositionTable.REPLACE_LEAST_VISITS, self.games[:3]),
+                                              (TranspositionTable.REPLACE_DEEPEST, self.games[7:10])):
+            table: TranspositionTable = TranspositionTable(max_size=10, replacement=replacement, evict_fraction=0.3)
+            for i, game in enumerate(self.games[:10]):
+                node: Node = table.get_or_create(game, i, None)
+                node.visits = i
+            self.assertEqual(10, len(table))
+            self.assertEqual(0, table.evictions)
+
+            table.get_or_create(self.games[10], 0, None)
+            self.assertEqual(3, table.evictions)
+            self.assertEqual(8, len(table))
+            for game in self.games[:11]:
+                self.assertEqual(game not in expected_evicted, game in table)
+
+    def test_hit_rate(self):
+        """Test hits and misses are counted by every lookup"""
+        table: TranspositionTable = TranspositionTable()
+        self.assertEqual(0.0, table.hit_rate)
+        for game in self.games[:4]:
+            table.get_or_create(game, 1, None)
+        table.get_or_create(self.games[0], 1, None)
+        self.assertIsNotNone(table.get(self.games[1]))
+        self.assertIsNone(table.get(self.games[5]))
+        self.assertEqual((2, 5), (table.hits, table.misses))
+        self.assertAlmostEqual(2 / 7, table.hit_rate)
+
+    def test_clear(self):
+        """Test clear empties the table and resets its stats"""
+        table: TranspositionTable = TranspositionTable(max_size=2)
+        for game in self.games[:3]:
+            table.get_or_create(game, 1, None)
+        table.clear()
+        self.assertEqual(0, len(table))
+        self.assertNotIn(self.games[0], table)
+        self.assertEqual((0, 0, 0), (table.hits, table.misses, table.evictions))
@@ -0,0 +1,59 @@
+"""
+test_tree_parallel.py
+Tests for tree parallel search, simulations from several workers on one tree.
+"""
+from multiprocessing import shared_memory
+from typing import Dict
+from unittest import TestCase
+
+from array_tree import ArrayNode
+from fog_of_war.fog_of_war_chess import FOWChess
+from root_parallel import MoveStats
+from tree_parallel import TreeParallelSearch
+from tests.random_search import RandomSearch
+
+
+class TestTreeParallel(TestCase):
+    """TreeParallelSearch tests"""
+
+    def setUp(self) -> None:
+        """Set up"""
+        self.game: FOWChess = FOWChess.new_game()
+
+    def assert_backed_up(self, root: ArrayNode, simulations: int) -> None:
+        """
+        Every simulation is counted once at the root, and no virtual loss is left:
+        a node's visits and score are its own rollout's plus its children's.
+        virtual_loss is 0.5, so a loss left behind would leave a score that isn't a whole result.
+        """
+        self.assertEqual(simulations, root.visits)
+        nodes = [root]
+        while nodes:
+            node: ArrayNode = nodes.pop()
+            children = node.children
+            if not children:
+                continue
+            self.assertEqual(node.visits, 1 + sum(child.visits for child in children))
+            self.assertIn(node.score - sum(child.score for child in children), (-1.0, 0.0, 1.0))
+            nodes += children
+
+    def test_threads(self):
+        """Test threads searching one tree back up every simulation"""
+        with TreeParallelSearch(RandomSearch, workers=3, search_kwargs={"array_tree": True},
+                                virtual_loss=0.5) as search:
+            stats: Dict[int, MoveStats] = search.search(self.game, 15)
+            self.assertEqual(3 * 15 - 1, sum(visits for visits, _ in stats.values()))
+            self.assert_backed_up(search.search_object.array_tree.root, 3 * 15)
+
+    def test_processes(self):
+        """Test processes searching one shared tree back up every simulation, and close frees its memory"""
+        search: TreeParallelSearch = TreeParallelSearch(RandomSearch, workers=2, mode=TreeParallelSearch.PROCESSES,
+                                                        virtual_loss=0.5, max_nodes=20_000, seed=13)
+        try:
+            stats: Dict[int, MoveStats] = search.search(self.game, 15)
+            self.assertEqual(2 * 15 - 1, sum(visits for visits, _ in stats.values()))
+            self.assert_backed_up(search.tree.root, 2 * 15)
+            name: str = search.tree._shm.name
+        finally:
+            search.close()
+        self.assertRaises(FileNotFoundError, shared_memory.SharedMemory, name=name)
@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+from heapq import nsmallest
+from math import ceil
+from typing import Callable, Dict
+
+from fog_of_war import move as mv, fog_of_war_chess as fow
+from node import Node
+
+
+class TranspositionTable:
+    """
+    Bounded map from game states to the Node already made for them.
+    Lets positions reached by different move orders share one Node (and its stats),
+    so tree search runs over a DAG instead of a tree.
+
+    Keyed by FOWChess, which hashes by its Zobrist key and checks full equality,
+    so a key collision can't merge different positions.
+    Equality doesn't include the halfmove clock or position history, a node's draws are
+    decided by the game of the path that first reached it.
+    """
+    REPLACE_LEAST_VISITS = "visits"  # Evict the least visited nodes first
+    REPLACE_DEEPEST = "depth"  # Evict the deepest nodes first
+
+    _PRIORITIES: Dict[str, Callable[[Node], int]] = {
+        REPLACE_LEAST_VISITS: lambda node: node.visits,
+        REPLACE_DEEPEST: lambda node: -node.depth,
+    }
+
+    def __init__(self,
+                 max_size: int = 1_000_000,
+                 replacement: str = REPLACE_LEAST_VISITS,
+                 evict_fraction: float = 0.1) -> None:
+        if replacement not in self._PRIORITIES:
+            raise ValueError(f"replacement must be one of {list(self._PRIORITIES)}")
+        if max_size < 1 or not 0 < evict_fraction <= 1:
+            raise ValueError("max_size must be positive and evict_fraction in (0, 1]")
+
+        self.max_size: int = max_size
+        self.replacement: str = replacement
+        # Evicting in batches keeps eviction's cost per store low
+        self._evict_count: int = ceil(max_size * evict_fraction)
+        self._table: Dict[fow.FOWChess, Node] = {}
+
+        self.hits: int = 0
+        self.misses: int = 0
+        self.evictions: int = 0
+
+    def __len__(self) -> int:
+        return len(self._table)
+
+    def __contains__(self, game: fow.FOWChess) -> bool:
+        return game in self._table
+
+    @property
+    def hit_rate(self) -> float:
+        """Fraction of lookups that found an existing node"""
+        lookups: int = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def get(self, game: fow.FOWChess) -> Node | None:
+        """Node stored for game, or None. Counts towards the hit rate."""
+        node: Node | None = self._table.get(game)
+        if node is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return node
+
+    def store(self, node: Node) -> None:
+        """Store node under its game state, evicting nodes first if the table is full."""
+        if len(self._table) >= self.max_size and node.game not in self._table:
+            self._evict()
+        self._table[node.game] = node
+
+    def get_or_create(self, game: fow.FOWChess, depth: int, move: mv.Move | int | None) -> Node:
+        """The node stored for game, or a new stored Node if there isn't one."""
+        node: Node | None = self.get(game)
+        if node is None:
+            node = Node(game, depth, move)
+            self.store(node)
+        return node
+
+    def clear(self) -> None:
+        """Drop all nodes and reset the stats."""
+        self._table.clear()
+        self.hits = self.misses = self.evictions = 0
+
+    def _evict(self) -> None:
+        """
+        Remove the lowest priority nodes from the table.
+        They stay in the tree, they just can't be found by a transposition anymore.
+        """
+        priority: Callable[[Node], int] = self._PRIORITIES[self.replacement]
+        evicted = nsmallest(self._evict_count, self._table.items(), key=lambda item: priority(item[1]))
+        for game, _ in evicted:
+            del self._table[game]
+        self.evictions += len(evicted)
@@ -0,0 +1,130 @@
+from __future__ import annotations
+
+from concurrent.futures import ThreadPoolExecutor
+import multiprocessing as mp
+import os
+import random
+from typing import Any, Dict, Optional, Type
+
+from abstract_tree_seach import AbstractTreeSearch
+from array_tree import ArrayNode, SharedArrayTree
+from fog_of_war.fog_of_war_chess import FOWChess
+from node import TreeNode
+from root_parallel import MoveStats, root_move_stats
+
+
+# Each worker process's search, sharing the tree made by TreeParallelSearch
+_worker_search: Optional[AbstractTreeSearch] = None
+
+
+def _init_worker(search_class: Type[AbstractTreeSearch],
+                 search_kwargs: Dict[str, Any],
+                 virtual_loss: float,
+                 tree: SharedArrayTree,
+                 lock) -> None:
+    global _worker_search
+    _worker_search = search_class(**search_kwargs)
+    _worker_search.virtual_loss = virtual_loss
+    _worker_search.share_tree(tree, lock)
+
+
+def _run_simulations(search: AbstractTreeSearch, root: TreeNode, simulations: int) -> None:
+    for _ in range(simulations):
+        search.mcts(root)
+
+
+def _run_shared_simulations(game: FOWChess, simulations: int, seed: int) -> None:
+    """Run simulations in a worker process, on the shared tree rooted at game"""
+    random.seed(seed)
+    tree: SharedArrayTree = _worker_search.array_tree
+    tree.set_root_game(game)
+    _run_simulations(_worker_search, ArrayNode(tree, 0), simulations)
+
+
+class TreeParallelSearch:
+    """
+    Tree parallel MCTS. Workers run simulations on one shared tree at once,
+    and virtual loss on the nodes they're descending through spreads them over different paths.
+    Gives one deeper tree per move, rather than merging several shallow ones (see root_parallel).
+    Simulations are run with AbstractTreeSearch.mcts, search_class's simulate isn't used.
+
+    THREADS: threads share one search (made with search_kwargs) and its tree.
+    Only rollouts run in parallel, the tree is changed holding the search's lock,
+    so this helps on free threaded builds or with rollouts that release the GIL.
+
+    PROCESSES: each worker process has its own search, sharing a SharedArrayTree
+    of at most max_nodes nodes and a lock. search_class must be importable by the workers.
+
+    Workers are started once and reused for every search, call close()
+    (or use as a context manager) to stop them.
+    """
+    THREADS = "thread"
+    PROCESSES = "process"
+
+    def __init__(self,
+                 search_class: Type[AbstractTreeSearch],
+                 workers: int | None = None,
+                 search_kwargs: Dict[str, Any] | None = None,
+                 mode: str = THREADS,
+                 virtual_loss: float = 1.0,
+                 max_nodes: int = 1_000_000,
+                 seed: int | None = None,
+                 start_method: str | None = None) -> None:
+        if virtual_loss <= 0:
+            raise ValueError("virtual_loss must be positive")
+        self.workers: int = workers or os.cpu_count() or 1
+        self.mode: str = mode
+        self._seeds: random.Random = random.Random(seed)
+
+        if mode == self.THREADS:
+            self.search_object: AbstractTreeSearch = search_class(**(search_kwargs or {}))
+            self.search_object.virtual_loss = virtual_loss
+            self._threads = ThreadPoolExecutor(self.workers)
+        elif mode == self.PROCESSES:
+            context = mp.get_context(start_method)
+            self.tree: SharedArrayTree = SharedArrayTree(max_nodes)
+            self._processes = context.Pool(self.workers,
+                                           initializer=_init_worker,
+                                           initargs=(search_class, search_kwargs or {},
+                                                     virtual_loss, self.tree, context.Lock()))
+        else:
+            raise ValueError(f"mode must be {self.THREADS!r} or {self.PROCESSES!r}")
+
+    def __enter__(self) -> TreeParallelSearch:
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Stop the workers"""
+        if self.mode == self.THREADS:
+            self._threads.shutdown()
+        else:
+            self._processes.terminate()
+            self._processes.join()
+            self.tree.close()
+
+    def search(self, game: FOWChess, simulations_per_worker: int = 200) -> Dict[int, MoveStats]:
+        """
+        Run simulations_per_worker simulations from game in every worker, on one tree.
+        Returns the root children's visits and score, keyed by packed move.
+        """
+        if self.mode == self.THREADS:
+            root: TreeNode = self.search_object.new_root(game)
+            futures = [self._threads.submit(_run_simulations, self.search_object, root, simulations_per_worker)
+                       for _ in range(self.workers)]
+            for future in futures:
+                future.result()
+            return root_move_stats(root)
+
+        self.tree.new_root(game)
+        self._processes.starmap(_run_shared_simulations,
+                                [(game, simulations_per_worker, self._seeds.getrandbits(64))
+                                 for _ in range(self.workers)])
+        return root_move_stats(self.tree.root)
+
+    def best_move(self, game: FOWChess, simulations_per_worker: int = 200) -> int:
+        """Packed move with the most visits"""
+        stats: Dict[int, MoveStats] = self.search(game, simulations_per_worker)
+        return max(stats, key=lambda move: stats[move].visits)